@@ -2,7 +2,22 @@
 Jarvis AI Framework - Main Package
 """
 
-from .core.dispatcher import JarvisDispatcher
+_root_agent = None
 
-# Instantiate the main dispatcher agent
-root_agent = JarvisDispatcher() 
\ No newline at end of file
+
+def __getattr__(name):
+    """
+    Creates the main dispatcher agent on first access (`jarvis.root_agent`), so
+    importing a submodule (e.g. the sandbox worker) does not load the ADK stack.
+    """
+    global _root_agent
+    if name == "JarvisDispatcher":
+        from .core.dispatcher import JarvisDispatcher
+        return JarvisDispatcher
+    if name == "root_agent":
+        if _root_agent is None:
+            from .core.dispatcher import JarvisDispatcher
+            # Instantiate the main dispatcher agent
+            _root_agent = JarvisDispatcher()
+        return _root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -61,7 +61,7 @@ class CodingAgent(LlmAgent):
 
     # --- Tool Interface Definition (Implicit via Registration) ---
     # By registering 'code_execution_tool', the agent expects a tool with
-    # the name 'execute_python_code' and its defined signature (code: str) -> str.
+    # the name 'execute_python_code' and its defined signature (code: str) -> dict.
     # The actual tool object is imported and passed during initialization.
 
     # The main logic will likely be handled by the LlmAgent's default invoke/run
@@ -6,14 +6,17 @@ import json # json 모듈 임포트
 from google.adk.agents import BaseAgent
 # from google.adk.models import LlmConfig # 제거
 from ..models.input import ParsedInput
+from ..core.llm_client import get_llm_client_registry
+from ..core.cache import BaseCache, create_cache, hash_key
 # 필요시 추가 임포트 (예: Vertex AI 클라이언트)
 # from google.generativeai.types import GenerationConfig # 필요 시
-from google.genai.types import Content, Part, GenerateContentResponse
+from google.genai.types import Content, Part, GenerateContentResponse, GenerateContentConfig
 import re # 정규 표현식 사용
+import unicodedata
 import google.genai as genai
 import asyncio # asyncio 임포트 추가
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from google.api_core import retry_async
 from google.api_core import exceptions as api_exceptions
 from dotenv import load_dotenv
@@ -21,6 +24,15 @@ from pydantic import Field
 from google.api_core.retry import Retry, if_transient_error # if_transient_error 추가
 from google.api_core.retry_async import AsyncRetry # AsyncRetry 임포트
 
+# 로컬(오프라인) 언어 감지: langdetect가 설치되어 있지 않으면 LLM 감지 경로만 사용
+try:
+    from langdetect import DetectorFactory, detect_langs
+    from langdetect.lang_detect_exception import LangDetectException
+    DetectorFactory.seed = 0 # 감지 결과를 결정적으로 만들기 위해 시드 고정
+    LANGDETECT_AVAILABLE = True
+except ImportError:
+    LANGDETECT_AVAILABLE = False
+
 # API 키 설정 (환경 변수 사용)
 # 모듈 수준 configure는 dispatcher.py에서 처리하므로 여기서는 제거 또는 주석 처리
 # try:
@@ -34,6 +46,75 @@ from google.api_core.retry_async import AsyncRetry # AsyncRetry 임포트
 # except Exception as e:
 #     print(f"Error configuring Genai API key: {e}")
 
+# 파싱 모드: 'fused'는 한 번의 구조화된(JSON) LLM 호출로 언어/번역/의도/엔티티/도메인을 모두 얻고,
+# 'multi_call'은 기존의 단계별(언어 감지 -> 번역 -> 분석) 호출 경로입니다.
+PARSE_MODE_FUSED = "fused"
+PARSE_MODE_MULTI_CALL = "multi_call"
+DEFAULT_PARSE_MODE = os.getenv("INPUT_PARSER_MODE", PARSE_MODE_FUSED)
+PARSER_MODEL_ID = 'gemini-2.0-flash-exp'
+
+# 로컬 언어 감지 신뢰도 임계값과 최소 입력 길이 (이보다 낮으면 LLM 감지로 폴백)
+LOCAL_LANG_DETECT_THRESHOLD = float(os.getenv("LOCAL_LANG_DETECT_THRESHOLD", "0.90"))
+LOCAL_LANG_DETECT_MIN_CHARS = 4
+
+# ParsedInput 캐시 설정 (backend: memory | sqlite | none)
+PARSE_CACHE_BACKEND = os.getenv("PARSE_CACHE_BACKEND", "memory")
+PARSE_CACHE_MAX_SIZE = int(os.getenv("PARSE_CACHE_MAX_SIZE", "2048"))
+PARSE_CACHE_TTL = float(os.getenv("PARSE_CACHE_TTL", "3600"))
+PARSE_CACHE_PATH = os.getenv("PARSE_CACHE_PATH", ".cache/jarvis_cache.sqlite3")
+
+# 의도/도메인 분석 지침 (fused / multi_call 경로에서 공유)
+INTENT_GUIDELINES = (
+    "Available intents include: code_generation, question_answering, greeting, self_description, statement, request_joke, etc. " # 의도 예시 추가
+    "Crucially, ONLY use the 'translation' intent if the user explicitly asks TO TRANSLATE something. " # 강조 및 명확화
+    "For simple statements of fact or self-description (like 'I am a student'), use 'statement' or 'self_description', NOT 'translation'." # 구체적 예시 및 지침 추가
+)
+DOMAIN_GUIDELINES = (
+    "Use the following domain guidelines: "
+    "'coding' for software development tasks, "
+    "'finance' for financial queries, "
+    "'geography' for location-based questions, "
+    "'weather' for weather requests, "
+    "'general' for common greetings, chit-chat, or topics not covered by other domains. "
+)
+
+def _strip_json_fence(response_text: str) -> str:
+    """LLM 응답에서 ```json ... ``` 블록 표기를 제거합니다."""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:].strip()
+    elif response_text.startswith("```"):
+        response_text = response_text[3:].strip()
+    if response_text.endswith("```"):
+        response_text = response_text[:-3].strip()
+    return response_text
+
+def normalize_input_text(user_input: str) -> str:
+    """
+    캐시 키용 정규화: 유니코드 NFKC와 공백 축약만 적용.
+    대소문자나 문장부호는 의미(고유명사, 질문/명령 구분)와 번역 결과를 바꿀 수 있으므로 유지합니다.
+    """
+    text = unicodedata.normalize("NFKC", user_input)
+    return " ".join(text.split())
+
+def parse_cache_key(user_input: str) -> str:
+    """정규화된 입력 텍스트의 해시로 ParsedInput 캐시 키를 만듭니다."""
+    return hash_key("parsed_input", normalize_input_text(user_input))
+
+def _create_parse_cache() -> Optional[BaseCache]:
+    """환경 변수 설정에 따라 ParsedInput 캐시를 생성합니다. 실패 시 캐시 없이 동작합니다."""
+    try:
+        return create_cache(
+            PARSE_CACHE_BACKEND,
+            max_size=PARSE_CACHE_MAX_SIZE,
+            default_ttl=PARSE_CACHE_TTL,
+            path=PARSE_CACHE_PATH,
+            table="parsed_input",
+        )
+    except Exception as e:
+        print(f"Warning: Could not create parse cache ({PARSE_CACHE_BACKEND}): {e}. Caching disabled.")
+        return None
+
 class InputParserAgent(BaseAgent):
     """
     사용자 입력을 받아 언어 감지, 번역, 의도/엔티티/도메인 분석을 수행하는 에이전트
@@ -41,6 +122,9 @@ class InputParserAgent(BaseAgent):
     """
     # 필요한 경우 자체 필드 정의 (예: 사용할 모델 이름 등)
     model_name: str = Field(default="gemini-pro") # 사용할 모델 이름 필드 추가
+    parse_mode: str = Field(default=DEFAULT_PARSE_MODE) # 'fused' (단일 호출) 또는 'multi_call' (기존 단계별 호출)
+    local_language_detection: bool = Field(default=True) # langdetect 기반 로컬 언어 감지 사용 여부
+    parse_cache: Optional[BaseCache] = Field(default_factory=_create_parse_cache, exclude=True) # ParsedInput 캐시 (None이면 비활성)
     # Pydantic 필드로 llm 선언 추가 (Client 객체로 변경)
     llm: Optional[genai.Client] = None # genai.Client 타입으로 변경
     # instruction: str = Field(default="...") # 필요시 자체 instruction 필드 추가
@@ -50,8 +134,9 @@ class InputParserAgent(BaseAgent):
         Initializes the InputParserAgent.
 
         Args:
-            api_key: Optional Google Generative AI API key. If not provided,
-                     it will try to load from the GOOGLE_API_KEY environment variable.
+            api_key: Optional Google Generative AI API key. If provided, a dedicated client
+                     is created with it; otherwise the process-wide shared client
+                     (GEMINI_API_KEY) is used, created lazily on the first LLM call.
             **kwargs: Additional keyword arguments to pass to the LlmAgent.
         """
         super().__init__(
@@ -60,56 +145,181 @@ class InputParserAgent(BaseAgent):
             **kwargs,
         )
 
-        # LLM 클라이언트 초기화 (BaseAgent는 llm 객체를 자동으로 만들지 않음)
+        # LLM 클라이언트: 기본적으로 공유 레지스트리의 클라이언트를 첫 호출 시 사용 (커넥션 재사용)
         self.llm = None
-        # API 키 로드 (모듈 수준 configure에 의존하지 않고 직접 로드 및 사용)
-        load_dotenv() 
-        api_key_input = os.getenv("GEMINI_API_KEY")
-        if not api_key_input:
-            print("Warning: GEMINI_API_KEY not found for InputParserAgent.")
-        else:
+        load_dotenv()
+        if api_key:
             try:
-                # Client 생성 시 API 키 명시적 전달
-                self.llm = genai.Client(api_key=api_key_input)
-                print(f"InputParserAgent initialized with genai.Client using provided API key.")
+                # 명시적으로 전달된 API 키는 전용 Client로 사용
+                self.llm = genai.Client(api_key=api_key)
+                print(f"InputParserAgent initialized with a dedicated genai.Client using the provided API key.")
             except Exception as e:
                 print(f"Error initializing Genai client for InputParserAgent with API key: {e}")
+        elif not os.getenv("GEMINI_API_KEY"):
+            print("Warning: GEMINI_API_KEY not found for InputParserAgent.")
 
     async def process_input(self, user_input: str) -> ParsedInput:
         """
         사용자 입력을 처리하여 ParsedInput 객체를 반환합니다.
+        정규화된 입력이 캐시에 있으면 LLM 호출 없이 캐시된 결과를 반환합니다.
         """
-        original_language = "en" # 기본값 영어
-        english_text = user_input # 기본값은 원본 텍스트
-        intent = None # 기본값
-        entities = None # 기본값
-        domain = None # 기본값
+        cache_key = parse_cache_key(user_input) if self.parse_cache is not None else None
+        if cache_key is not None:
+            try:
+                cached = self.parse_cache.get(cache_key)
+            except Exception as e:
+                print(f"Warning: Parse cache lookup failed: {e}")
+                cached = None
+            if cached is not None:
+                print("DEBUG: Parse cache hit.")
+                parsed_input = ParsedInput.model_validate({**cached, "original_text": user_input})
+                if parsed_input.original_language == "en":
+                    parsed_input.english_text = user_input
+                return parsed_input
+
+        parsed_input = await self._parse(user_input)
+
+        # 분석에 실패한 결과(intent 없음)는 캐시하지 않음
+        if cache_key is not None and parsed_input.intent is not None:
+            try:
+                self.parse_cache.set(cache_key, parsed_input.model_dump())
+            except Exception as e:
+                print(f"Warning: Parse cache store failed: {e}")
+        return parsed_input
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """ParsedInput 캐시의 hit/miss 통계를 반환합니다."""
+        if self.parse_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, "size": len(self.parse_cache), **self.parse_cache.stats.as_dict()}
+
+    async def _parse(self, user_input: str) -> ParsedInput:
+        """
+        캐시를 거치지 않고 입력을 파싱합니다.
+        먼저 로컬 감지기로 언어를 판별하고, 영어로 확신되는 입력은 번역 없이 분석 호출만 수행합니다.
+        그 외에는 parse_mode가 'fused'이면 단일 구조화 호출을 먼저 시도하고,
+        실패 시 기존 multi_call 경로로 폴백합니다.
+        """
+        detected_language = self._detect_language_locally(user_input) if self.local_language_detection else None
+
+        if detected_language == "en":
+            print("DEBUG: Input is confidently English (local detection). Skipping translation.")
+            intent, entities, domain = await self._analyze_english_text(user_input)
+            return ParsedInput(
+                original_text=user_input,
+                original_language="en",
+                english_text=user_input,
+                intent=intent,
+                entities=entities,
+                domain=domain
+            )
 
-        # --- 언어 감지 (이전 단계에서 구현) ---
+        if self.parse_mode == PARSE_MODE_FUSED:
+            parsed_input = await self._process_input_fused(user_input, detected_language)
+            if parsed_input is not None:
+                return parsed_input
+            print("Warning: Fused parse failed. Falling back to multi-call parse.")
+        return await self._process_input_multi_call(user_input, detected_language)
+
+    def _detect_language_locally(self, user_input: str) -> Optional[str]:
+        """
+        langdetect로 입력 언어를 로컬에서 감지합니다.
+        신뢰도가 LOCAL_LANG_DETECT_THRESHOLD 이상이면 ISO 639-1 코드를, 아니면 None을 반환합니다.
+        """
+        if not LANGDETECT_AVAILABLE:
+            return None
+        if len(user_input.strip()) < LOCAL_LANG_DETECT_MIN_CHARS:
+            return None
         try:
-            lang_detection_prompt = (
-                f"Analyze the following text and identify its primary language. "
-                f"Respond with ONLY the two-letter ISO 639-1 code for that language. "
-                f"For example, respond 'en' for English, 'ko' for Korean, 'fr' for French. "
-                f"Do not include any other text, explanation, or formatting. Just the code.\\n\\n"
-                f"Text: {user_input}"
+            candidates = detect_langs(user_input)
+        except LangDetectException as e:
+            print(f"DEBUG: Local language detection failed: {e}")
+            return None
+        if not candidates:
+            return None
+        best = candidates[0]
+        # langdetect는 'zh-cn' 같은 지역 코드를 반환하므로 두 글자 코드로 정규화
+        language = best.lang.split("-")[0].lower()
+        if best.prob >= LOCAL_LANG_DETECT_THRESHOLD and re.fullmatch(r'[a-z]{2}', language):
+            print(f"DEBUG: Detected language locally: {language} (p={best.prob:.2f})")
+            return language
+        print(f"DEBUG: Local language detection not confident ({language}, p={best.prob:.2f}). Using LLM.")
+        return None
+
+    async def _process_input_fused(self, user_input: str, detected_language: Optional[str] = None) -> Optional[ParsedInput]:
+        """
+        한 번의 JSON 모드 LLM 호출로 언어 감지, 영어 번역, 의도/엔티티/도메인 분석을 수행합니다.
+        detected_language가 주어지면 (로컬 감지 결과) LLM이 반환한 언어 대신 사용합니다.
+        응답이 유효하지 않으면 None을 반환하여 호출자가 multi_call 경로로 폴백하도록 합니다.
+        """
+        fused_prompt = (
+            "Analyze the following text. Identify its primary language, translate it to English, "
+            "identify the primary intent, extract key entities, and determine the main domain. "
+            "Respond ONLY with a JSON object containing the keys 'language', 'english_text', 'intent', 'entities', and 'domain'. "
+            "'language' must be the two-letter ISO 639-1 code of the original text (e.g. 'en', 'ko', 'fr'). "
+            "'english_text' must be the English translation of the text, or the text unchanged if it is already English. "
+            "The value for 'entities' should be a JSON object itself or null. "
+            + INTENT_GUIDELINES + " "
+            + DOMAIN_GUIDELINES
+            + "\n\nText: " + user_input
+        )
+        response_text = ""
+        try:
+            response_text = await self._call_llm(
+                fused_prompt,
+                model_id=PARSER_MODEL_ID,
+                config=GenerateContentConfig(response_mime_type="application/json"),
             )
-            # model = genai.GenerativeModel('gemini-2.0-flash-exp') # 이전
-            # response = await model.generate_content_async(lang_detection_prompt) # 이전
-            response_text = await self._call_llm(lang_detection_prompt, model_id='gemini-2.0-flash-exp') # _call_llm 사용
-            final_response_text = response_text.strip().lower()
-            match = re.search(r'\b([a-z]{2})\b', final_response_text)
-            if match:
-                original_language = match.group(1)
-                print(f"DEBUG: Detected language: {original_language}")
-            else:
-                 print(f"Warning: Could not extract language code from response: {final_response_text}")
+            parsed = json.loads(_strip_json_fence(response_text))
+            if not isinstance(parsed, dict):
+                print(f"Warning: Fused parse response is not a JSON object: {response_text}")
+                return None
+
+            language = detected_language or str(parsed.get("language") or "").strip().lower()
+            match = re.fullmatch(r'[a-z]{2}', language)
+            if not match:
+                print(f"Warning: Fused parse returned invalid language code: {language!r}")
+                return None
+
+            english_text = parsed.get("english_text")
+            if language == "en" or not isinstance(english_text, str) or not english_text.strip():
+                if language != "en":
+                    print("Warning: Fused parse returned empty translation. Using original text.")
+                english_text = user_input
+
+            entities = parsed.get("entities")
+            if not isinstance(entities, dict):
+                entities = None
+
+            print(f"DEBUG: Fused parse result - Language: {language}, Intent: {parsed.get('intent')}, Domain: {parsed.get('domain')}")
+            return ParsedInput(
+                original_text=user_input,
+                original_language=language,
+                english_text=english_text.strip(),
+                intent=parsed.get("intent"),
+                entities=entities,
+                domain=parsed.get("domain"),
+            )
+        except json.JSONDecodeError as e:
+            print(f"Error parsing fused JSON response: {e}. Response text: {response_text}")
         except Exception as e:
-            print(f"Error during language detection (using genai client): {e}")
-            pass
-        
-        # API 호출 사이에 지연 추가
-        await asyncio.sleep(2)
+            print(f"Error during fused input parsing: {e}")
+        return None
+
+    async def _process_input_multi_call(self, user_input: str, detected_language: Optional[str] = None) -> ParsedInput:
+        """
+        기존 단계별 경로: 언어 감지, 번역, 의도/엔티티/도메인 분석을 각각의 LLM 호출로 수행합니다.
+        detected_language가 주어지면 (로컬 감지 결과) LLM 언어 감지 호출을 건너뜁니다.
+        """
+        original_language = "en" # 기본값 영어
+        english_text = user_input # 기본값은 원본 텍스트
+
+        # --- 언어 감지 (로컬 감지 결과가 없을 때만 LLM 호출) ---
+        if detected_language:
+            original_language = detected_language
+            print(f"DEBUG: Using locally detected language: {original_language}")
+        else:
+            original_language = await self._detect_language_with_llm(user_input)
 
         # --- 2.4. 영어 번역 (original_language가 'en'이 아닌 경우) ---
         if original_language != "en":
@@ -120,7 +330,7 @@ class InputParserAgent(BaseAgent):
                 )
                 # model = genai.GenerativeModel('gemini-2.0-flash-exp') # 이전
                 # response = await model.generate_content_async(translation_prompt) # 이전
-                translated_text = await self._call_llm(translation_prompt, model_id='gemini-2.0-flash-exp') # _call_llm 사용
+                translated_text = await self._call_llm(translation_prompt, model_id=PARSER_MODEL_ID) # _call_llm 사용
                 if translated_text:
                     english_text = translated_text # 번역 결과 저장
                     print(f"DEBUG: Translated to English: {english_text[:50]}...")
@@ -129,31 +339,60 @@ class InputParserAgent(BaseAgent):
             except Exception as e:
                 print(f"Error during translation (using genai client): {e}")
                 pass
-            
-            # API 호출 사이에 지연 추가 (번역 수행 시)
-            await asyncio.sleep(2)
         else:
              print("DEBUG: Input is already in English.")
 
-        # --- 2.5. 의도/엔티티/도메인 분석 기능 구현 (english_text 사용) ---
+        # --- 2.5. 의도/엔티티/도메인 분석 (english_text 사용) ---
+        intent, entities, domain = await self._analyze_english_text(english_text)
+
+        # --- 2.6. ParsedInput 객체 생성 및 반환 ---
+        return ParsedInput(
+            original_text=user_input,
+            original_language=original_language,
+            english_text=english_text,
+            intent=intent, # 분석 결과 또는 None
+            entities=entities, # 분석 결과 또는 None
+            domain=domain # 분석 결과 또는 None
+        ) 
+
+    async def _detect_language_with_llm(self, user_input: str) -> str:
+        """LLM에 입력 언어를 질의하여 ISO 639-1 코드를 반환합니다. 실패 시 'en'을 반환합니다."""
+        original_language = "en" # 기본값 영어
+        try:
+            lang_detection_prompt = (
+                f"Analyze the following text and identify its primary language. "
+                f"Respond with ONLY the two-letter ISO 639-1 code for that language. "
+                f"For example, respond 'en' for English, 'ko' for Korean, 'fr' for French. "
+                f"Do not include any other text, explanation, or formatting. Just the code.\\n\\n"
+                f"Text: {user_input}"
+            )
+            response_text = await self._call_llm(lang_detection_prompt, model_id=PARSER_MODEL_ID) # _call_llm 사용
+            final_response_text = response_text.strip().lower()
+            match = re.search(r'\b([a-z]{2})\b', final_response_text)
+            if match:
+                original_language = match.group(1)
+                print(f"DEBUG: Detected language: {original_language}")
+            else:
+                 print(f"Warning: Could not extract language code from response: {final_response_text}")
+        except Exception as e:
+            print(f"Error during language detection (using genai client): {e}")
+        return original_language
+
+    async def _analyze_english_text(self, english_text: str) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[str]]:
+        """영어 텍스트의 의도/엔티티/도메인을 분석합니다. 실패 시 (None, None, None)을 반환합니다."""
+        intent = None # 기본값
+        entities = None # 기본값
+        domain = None # 기본값
+        response_text = ""
         try:
             # 프롬프트 부분을 나누어 정의 (일반 문자열 사용)
             prompt_intro = (
                 "Analyze the following English text. Identify the primary intent, extract key entities, and determine the main domain. "
                 "Respond ONLY with a JSON object containing the keys 'intent', 'entities', and 'domain'. "
                 "The value for 'entities' should be a JSON object itself or null. "
-                "Available intents include: code_generation, question_answering, greeting, self_description, statement, request_joke, etc. " # 의도 예시 추가
-                "Crucially, ONLY use the 'translation' intent if the user explicitly asks TO TRANSLATE something. " # 강조 및 명확화
-                "For simple statements of fact or self-description (like 'I am a student'), use 'statement' or 'self_description', NOT 'translation'." # 구체적 예시 및 지침 추가
-            )
-            prompt_domain_guidelines = (
-                "Use the following domain guidelines: "
-                "'coding' for software development tasks, "
-                "'finance' for financial queries, "
-                "'geography' for location-based questions, "
-                "'weather' for weather requests, "
-                "'general' for common greetings, chit-chat, or topics not covered by other domains. "
+                + INTENT_GUIDELINES
             )
+            prompt_domain_guidelines = DOMAIN_GUIDELINES
             prompt_example = (
                 "Example format: "
                 # Correctly escaped JSON example within a standard Python string
@@ -164,16 +403,11 @@ class InputParserAgent(BaseAgent):
             # 프롬프트 결합 (필요한 부분만 f-string 사용)
             analysis_prompt = prompt_intro + prompt_domain_guidelines + prompt_example + prompt_text_part + english_text
 
-            # model = genai.GenerativeModel('gemini-2.0-flash-exp') # 이전
-            # response = await model.generate_content_async(analysis_prompt) # 이전
-            response_text = await self._call_llm(analysis_prompt, model_id='gemini-2.0-flash-exp') # _call_llm 사용
+            response_text = await self._call_llm(analysis_prompt, model_id=PARSER_MODEL_ID) # _call_llm 사용
             
             # 응답에서 JSON 추출 시도
             # LLM 응답에서 ```json ... ``` 블록 제거
-            if response_text.startswith("```json"):
-                response_text = response_text[7:].strip()
-            if response_text.endswith("```"):
-                response_text = response_text[:-3].strip()
+            response_text = _strip_json_fence(response_text)
 
             parsed_analysis = json.loads(response_text)
 
@@ -188,33 +422,28 @@ class InputParserAgent(BaseAgent):
         except Exception as e:
             print(f"Error during intent/entity/domain analysis: {e}")
             # 오류 발생 시 기본값(None) 유지
-            pass
-
-        # --- 2.6. ParsedInput 객체 생성 및 반환 ---
-        return ParsedInput(
-            original_text=user_input,
-            original_language=original_language,
-            english_text=english_text,
-            intent=intent, # 분석 결과 또는 None
-            entities=entities, # 분석 결과 또는 None
-            domain=domain # 분석 결과 또는 None
-        ) 
+        return intent, entities, domain
 
     # _call_llm 메서드에서 self.llm 사용 확인
     @AsyncRetry(retry=if_transient_error, initial=1.0, maximum=10.0, multiplier=2.0) # AsyncRetry 사용
-    async def _call_llm(self, prompt: str, model_id: str = "gemini-pro") -> str:
-        """LLM 호출 (재시도 포함) - client.aio.models.generate_content 사용"""
-        if not self.llm:
+    async def _call_llm(self, prompt: str, model_id: str = "gemini-pro", config: Optional[GenerateContentConfig] = None) -> str:
+        """LLM 호출 (재시도 포함) - client.aio.models.generate_content 사용
+        config가 주어지면 (예: JSON 응답 모드) generate_content에 그대로 전달합니다."""
+        registry = get_llm_client_registry()
+        client = self.llm or registry.get_client()
+        if not client:
             logging.error("LLM client not initialized in InputParserAgent.")
             return "Error: LLM not available."
         try:
             # 새로운 SDK 방식 (dispatcher.py 와 동일하게)
             logging.debug(f"Calling InputParser LLM ({model_id}) with prompt: {prompt[:100]}...")
-            # 수정: aio.models 사용
-            response = await self.llm.aio.models.generate_content(
-                model=model_id, # 사용할 모델 ID
+            # 공유 레지스트리 경유: 모델별 동시성 제한 + 레이트 리미터 (할당량 소진 시에만 대기)
+            response = await registry.generate_content(
+                model_id, # 사용할 모델 ID
                 # prompt를 Content 객체 리스트로 변환
-                contents=[Content(parts=[Part(text=prompt)])]
+                contents=[Content(parts=[Part(text=prompt)])],
+                config=config,
+                client=client
             )
             # response 처리 수정: response.text 직접 사용
             if hasattr(response, 'text'):
@@ -1,64 +1,262 @@
 # src/jarvis/components/response_generator.py
+import asyncio
 import logging
-from typing import Any, Optional
+import os
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 # Import the specific translation function for direct use
-from ..tools.translate_tool import translate_text
+from ..tools.translate_tool import lookup_translation, translate_text, translate_text_stream
+from ..core.request_context import RequestContext
 
 logger = logging.getLogger(__name__)
 
+# Segmented translation: the answer is split at paragraph/sentence boundaries and the
+# segments are translated concurrently (bounded), then emitted in their original order.
+TRANSLATION_SEGMENT_MAX_CHARS = int(os.getenv("TRANSLATION_SEGMENT_MAX_CHARS", "600"))
+TRANSLATION_MAX_CONCURRENCY = int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "4"))
+
+_PARAGRAPH_BOUNDARY = re.compile(r"(\n[ \t]*\n\s*)")
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。！？])(\s+)")
+
+# Code-aware translation: fenced code blocks are never translated, and inline code and
+# URLs inside prose are swapped for placeholders that the translation must preserve.
+_FENCED_CODE_BLOCK = re.compile(r"^[ \t]*(`{3,}|~{3,})[^\n]*\n.*?(?:^[ \t]*\1[ \t]*$|\Z)", re.MULTILINE | re.DOTALL)
+_INLINE_PROTECTED = re.compile(r"`[^`\n]+`|https?://[^\s<>()\[\]`]+[^\s<>()\[\]`.,;:!?'\"]")
+_PLACEHOLDER = "⟦{}⟧"
+_PLACEHOLDER_PATTERN = re.compile(r"⟦(\d+)⟧")
+_WORD_CHARACTER = re.compile(r"[^\W\d_]")
+
+
+def split_code_blocks(text: str) -> List[Tuple[str, bool]]:
+    """Splits Markdown into (block, is_code) pairs; fenced code blocks (``` or ~~~) are code."""
+    blocks: List[Tuple[str, bool]] = []
+    position = 0
+    for match in _FENCED_CODE_BLOCK.finditer(text):
+        if match.start() > position:
+            blocks.append((text[position:match.start()], False))
+        blocks.append((match.group(0), True))
+        position = match.end()
+    if position < len(text):
+        blocks.append((text[position:], False))
+    return blocks
+
+
+def protect_inline_code(text: str) -> Tuple[str, List[str]]:
+    """Replaces inline code spans and URLs with numbered placeholders. Returns (masked text, originals)."""
+    protected: List[str] = []
+
+    def replace(match: "re.Match[str]") -> str:
+        protected.append(match.group(0))
+        return _PLACEHOLDER.format(len(protected) - 1)
+
+    return _INLINE_PROTECTED.sub(replace, text), protected
+
+
+def restore_inline_code(text: str, protected: List[str]) -> Optional[str]:
+    """Puts the protected spans back. None if the translation dropped or invented a placeholder."""
+    found = [int(number) for number in _PLACEHOLDER_PATTERN.findall(text)]
+    if sorted(found) != list(range(len(protected))):
+        return None
+    return _PLACEHOLDER_PATTERN.sub(lambda match: protected[int(match.group(1))], text)
+
+
+def segment_text(text: str, max_chars: int = TRANSLATION_SEGMENT_MAX_CHARS) -> List[Tuple[str, str]]:
+    """
+    Splits text into (segment, separator) pairs at paragraph and sentence boundaries.
+
+    Consecutive sentences of a paragraph are grouped into one segment up to
+    `max_chars`; paragraphs never share a segment. The separator is the
+    whitespace that followed the segment, so joining every segment + separator
+    reproduces the original text.
+    """
+    segments: List[Tuple[str, str]] = []
+
+    def flush(buffer: str, extra_separator: str = "") -> None:
+        content = buffer.rstrip()
+        separator = buffer[len(content):] + extra_separator
+        if content:
+            segments.append((content, separator))
+        elif segments:
+            previous, previous_separator = segments[-1]
+            segments[-1] = (previous, previous_separator + separator)
+        elif separator:
+            segments.append(("", separator))
+
+    parts = _PARAGRAPH_BOUNDARY.split(text)
+    for index in range(0, len(parts), 2):
+        paragraph = parts[index]
+        paragraph_separator = parts[index + 1] if index + 1 < len(parts) else ""
+        sentences = _SENTENCE_BOUNDARY.split(paragraph)
+        buffer = ""
+        for sentence_index in range(0, len(sentences), 2):
+            sentence = sentences[sentence_index] + (sentences[sentence_index + 1] if sentence_index + 1 < len(sentences) else "")
+            if buffer.strip() and len(buffer) + len(sentence) > max_chars:
+                flush(buffer)
+                buffer = ""
+            buffer += sentence
+        flush(buffer, paragraph_separator)
+    return segments
+
+
+def segment_markdown(text: str, max_chars: int = TRANSLATION_SEGMENT_MAX_CHARS) -> List[Tuple[str, str, bool]]:
+    """
+    Splits Markdown into (segment, separator, translatable) triples.
+
+    Fenced code blocks are kept whole and marked untranslatable; prose is split
+    with `segment_text`. Prose segments without any words once inline code and
+    URLs are removed (e.g. a bare URL) are untranslatable as well.
+    """
+    segments: List[Tuple[str, str, bool]] = []
+    for block, is_code in split_code_blocks(text):
+        if is_code:
+            segments.append((block, "", False))
+            continue
+        for segment, separator in segment_text(block, max_chars):
+            masked, _ = protect_inline_code(segment)
+            segments.append((segment, separator, bool(_WORD_CHARACTER.search(_PLACEHOLDER_PATTERN.sub("", masked)))))
+    return segments
+
 class ResponseGenerator:
     """
     Processes results from agents and generates the final user-facing response,
     handling translation back to the original language.
     """
 
-    def __init__(self):
+    def __init__(self, max_concurrency: int = TRANSLATION_MAX_CONCURRENCY, segment_max_chars: int = TRANSLATION_SEGMENT_MAX_CHARS):
         """Initializes the ResponseGenerator."""
+        self.max_concurrency = max(1, max_concurrency)
+        self.segment_max_chars = segment_max_chars
         # If translate_tool is needed, it could be initialized here or passed
         # self.translator = translate_tool # Example
         logger.info("ResponseGenerator initialized.")
         # We might need an LLM client here later for advanced formatting/summarization.
         # self.llm_client = ...
 
-    async def generate_response(self, english_result: Any, original_language: Optional[str]) -> str:
+    def _format_result(self, english_result: Any) -> str:
+        """Formats the agent result (assumed to be in English) into a string."""
+        if isinstance(english_result, str):
+            return english_result
+        if english_result is None:
+            return "I received an empty response from the agent."
+        # Basic conversion for non-string results
+        try:
+            formatted_english_response = str(english_result)
+            logger.debug(f"Converted non-string result to string: {formatted_english_response[:100]}...")
+            return formatted_english_response
+        except Exception as e:
+            logger.error(f"Error converting agent result to string: {e}", exc_info=True)
+            return "I encountered an issue processing the result."
+
+    async def generate_response_stream(self, english_result: Any, original_language: Optional[str], request_context: Optional[RequestContext] = None) -> AsyncIterator[str]:
         """
-        Generates the final response string for the user.
+        Streams the final response for the user chunk by chunk.
+
+        English responses are yielded as a single chunk. Other languages are
+        split into sentence/paragraph segments that are translated concurrently
+        (at most `max_concurrency` at a time) and emitted in order; the first
+        segment is streamed token by token so users see output immediately.
 
         Args:
             english_result: The result received from the agent (assumed to be in English).
             original_language: The original language code of the user's request (e.g., 'ko', 'en').
+                Falls back to request_context.original_language when not given.
+            request_context: The state of the request being answered (used for the language fallback and logging).
 
-        Returns:
-            The final response string, translated to the original language if necessary.
+        Yields:
+            Consecutive pieces of the final response; joined they form the full response.
         """
-        logger.info(f"Generating response for result (type: {type(english_result)}), original language: {original_language}")
+        if original_language is None and request_context is not None:
+            original_language = request_context.original_language
+        request_id = request_context.request_id if request_context else "-"
+        logger.info(f"[{request_id}] Generating response for result (type: {type(english_result)}), original language: {original_language}")
 
-        # 1. Format the English result into a string (basic implementation)
-        if isinstance(english_result, str):
-            formatted_english_response = english_result
-        elif english_result is None:
-            formatted_english_response = "I received an empty response from the agent."
-        else:
-            # Basic conversion for non-string results
-            try:
-                formatted_english_response = str(english_result)
-                logger.debug(f"Converted non-string result to string: {formatted_english_response[:100]}...")
-            except Exception as e:
-                logger.error(f"Error converting agent result to string: {e}", exc_info=True)
-                formatted_english_response = "I encountered an issue processing the result."
-
-        # 2. Translate if necessary (Placeholder - actual translation logic later)
-        if original_language and original_language != 'en':
-            logger.info(f"Translation needed to {original_language}. (Translation logic placeholder)")
-            # TODO: Implement translation using translate_tool
-            # Example (requires translator setup):
-            # final_response = await self.translator.translate_text(formatted_english_response, target_language=original_language)
-            # For now, return English with a note
-            final_response = f"(In English, as translation is not yet implemented): {formatted_english_response}"
+        # 1. Format the English result into a string
+        formatted_english_response = self._format_result(english_result)
+
+        # 2. Translate if necessary, streaming the translated chunks as they arrive
+        if original_language and original_language != 'en' and formatted_english_response:
+            logger.info(f"[{request_id}] Streaming translation to {original_language}.")
+            async for chunk in self._translate_segmented(formatted_english_response, original_language):
+                yield chunk
         else:
             logger.info("No translation needed or original language is English.")
-            final_response = formatted_english_response
+            yield formatted_english_response
+
+    async def _translate_segmented(self, text: str, target_language: str) -> AsyncIterator[str]:
+        """
+        Translates the prose of a Markdown answer segment by segment. Fenced code
+        blocks, inline code and URLs are emitted untouched. Later segments are
+        translated in the background while earlier ones are emitted; output order
+        always matches the input. Segments whose translation fails (or loses a
+        placeholder) fall back to the English text.
+        """
+        remembered = lookup_translation(text, target_language, 'en')
+        if remembered is not None:
+            # Whole answer already in the translation memory (e.g. a fixed system message)
+            yield remembered
+            return
+
+        segments = segment_markdown(text, self.segment_max_chars)
+        translatable = [index for index, (_, _, should_translate) in enumerate(segments) if should_translate]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
+        async def translate_segment(segment: str) -> str:
+            masked, protected = protect_inline_code(segment)
+            async with semaphore:
+                translated = await translate_text(masked, target_language=target_language, source_language='en')
+            restored = restore_inline_code(translated, protected)
+            if restored is None:
+                logger.warning("Translation changed inline code placeholders. Keeping the English segment.")
+                return segment
+            return restored
+
+        # The first prose segment is streamed token by token unless it contains protected spans
+        # (a placeholder could be split across chunks); everything else starts now, concurrently.
+        streamed_index = None
+        if translatable and not protect_inline_code(segments[translatable[0]][0])[1]:
+            streamed_index = translatable[0]
+        tasks: Dict[int, "asyncio.Task[str]"] = {
+            index: asyncio.create_task(translate_segment(segments[index][0]))
+            for index in translatable
+            if index != streamed_index
+        }
+        translated_chars = sum(len(segments[index][0]) for index in translatable)
+        logger.info(
+            f"Translating {len(translatable)} of {len(segments)} segments to {target_language} "
+            f"({translated_chars}/{len(text)} chars, max concurrency {self.max_concurrency})."
+        )
+        try:
+            for index, (segment, separator, _) in enumerate(segments):
+                if index == streamed_index:
+                    async with semaphore:
+                        async for chunk in translate_text_stream(segment, target_language=target_language, source_language='en'):
+                            yield chunk
+                elif index in tasks:
+                    yield await tasks[index]
+                elif segment:
+                    yield segment
+                if separator:
+                    yield separator
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+    async def generate_response(self, english_result: Any, original_language: Optional[str], request_context: Optional[RequestContext] = None) -> str:
+        """
+        Generates the final response string for the user.
+
+        Args:
+            english_result: The result received from the agent (assumed to be in English).
+            original_language: The original language code of the user's request (e.g., 'ko', 'en').
+                Falls back to request_context.original_language when not given.
+            request_context: The state of the request being answered (used for the language fallback and logging).
+
+        Returns:
+            The final response string, translated to the original language if necessary.
+        """
+        chunks = [chunk async for chunk in self.generate_response_stream(english_result, original_language, request_context=request_context)]
+        final_response = "".join(chunks)
         logger.info(f"Final generated response: {final_response[:100]}...")
-        return final_response 
\ No newline at end of file
+        return final_response
@@ -0,0 +1,370 @@
+# src/jarvis/core/cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLiteCache counts its rows once per this many writes (capped at a tenth of max_size)
+SQLITE_CACHE_SIZE_CHECK_INTERVAL = int(os.getenv("SQLITE_CACHE_SIZE_CHECK_INTERVAL", "64"))
+
+
+def hash_key(*parts: Any) -> str:
+    """Builds a content-addressed cache key (sha256) from the given parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")  # unit separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+class CacheStats:
+    """Hit/miss counters shared by all cache backends."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class BaseCache(ABC):
+    """Interface for pluggable key/value caches with optional per-entry TTL."""
+
+    def __init__(self, default_ttl: Optional[float] = None):
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the cached value, or `default` if missing or expired."""
+
+    def get_with_expiry(self, key: str, default: Any = None) -> Tuple[Any, Optional[float]]:
+        """Like get, but also returns the entry's expiry time (epoch seconds; None if it never expires or is unknown)."""
+        return self.get(key, default), None
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value. `ttl` (seconds) overrides the cache's default TTL."""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Removes a key. Returns True if it was present."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes every entry."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class LRUCache(BaseCache):
+    """Thread-safe in-process LRU cache with optional TTL."""
+
+    def __init__(self, max_size: int = 1024, default_ttl: Optional[float] = None):
+        super().__init__(default_ttl)
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_with_expiry(key, default)[0]
+
+    def get_with_expiry(self, key: str, default: Any = None) -> Tuple[Any, Optional[float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default, None
+            value, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                del self._data[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default, None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value, expires_at
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, self._expires_at(ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(BaseCache):
+    """
+    On-disk cache backed by SQLite (WAL mode), shareable between processes.
+    Values must be JSON-serializable.
+
+    The row count (a full scan) is checked every `size_check_interval` writes of
+    this process rather than on every write, so between checks the table can
+    exceed `max_size` by fewer rows than that interval (at most a tenth of
+    `max_size`). Expired rows are removed first when the table is pruned.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "cache",
+        max_size: int = 100_000,
+        default_ttl: Optional[float] = None,
+        size_check_interval: int = SQLITE_CACHE_SIZE_CHECK_INTERVAL,
+    ):
+        super().__init__(default_ttl)
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.max_size = max_size
+        self.size_check_interval = max(1, min(size_check_interval, max_size // 10))
+        self._writes_since_size_check = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+        logger.info(f"SQLiteCache '{table}' opened at {path}")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_with_expiry(key, default)[0]
+
+    def get_with_expiry(self, key: str, default: Any = None) -> Tuple[Any, Optional[float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return default, None
+            raw_value, expires_at = row
+            if expires_at is not None and now > expires_at:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default, None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.hits += 1
+        return json.loads(raw_value), expires_at
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raw_value = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, raw_value, self._expires_at(ttl), time.time()),
+            )
+            self._writes_since_size_check += 1
+            if self._writes_since_size_check >= self.size_check_interval:
+                self._writes_since_size_check = 0
+                self._enforce_max_size()
+
+    def _enforce_max_size(self) -> None:
+        """Prunes expired rows, then the least recently accessed ones beyond max_size. Call with _lock held."""
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count <= self.max_size:
+            return
+        expired = self._conn.execute(
+            f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        ).rowcount
+        self.stats.expirations += expired
+        overflow = count - expired - self.max_size
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.stats.evictions += overflow
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class TieredCache(BaseCache):
+    """
+    A fast in-memory cache in front of an optional persistent one.
+
+    Reads check the memory tier first and promote persistent hits into it for
+    the rest of their lifetime; writes go to both tiers, so entries survive
+    restarts while hot keys stay in memory.
+    """
+
+    def __init__(self, memory: BaseCache, persistent: Optional[BaseCache] = None, default_ttl: Optional[float] = None):
+        super().__init__(default_ttl)
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_with_expiry(key, default)[0]
+
+    def get_with_expiry(self, key: str, default: Any = None) -> Tuple[Any, Optional[float]]:
+        missing = object()
+        value, expires_at = self.memory.get_with_expiry(key, missing)
+        if value is missing and self.persistent is not None:
+            value, expires_at = self.persistent.get_with_expiry(key, missing)
+            if value is not missing:
+                self._promote(key, value, expires_at)
+        if value is missing:
+            self.stats.misses += 1
+            return default, None
+        self.stats.hits += 1
+        return value, expires_at
+
+    def _promote(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        """Copies a persistent hit into memory, expiring when the persistent entry does."""
+        if expires_at is None:
+            self.memory.set(key, value)
+            return
+        remaining = expires_at - time.time()
+        if remaining > 0:
+            self.memory.set(key, value, remaining)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl)
+        if self.persistent is not None:
+            self.persistent.set(key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        deleted = self.memory.delete(key)
+        if self.persistent is not None:
+            deleted = self.persistent.delete(key) or deleted
+        return deleted
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def __len__(self) -> int:
+        return len(self.persistent) if self.persistent is not None else len(self.memory)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async work by key: the first caller runs `factory`,
+    callers arriving while it is in flight await the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+        self.shared = 0  # calls served by another caller's in-flight work
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(factory())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        else:
+            self.shared += 1
+        # Shielded so one caller's cancellation does not cancel the work the others wait for
+        return await asyncio.shield(call)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+def create_cache(
+    backend: str,
+    max_size: int = 1024,
+    default_ttl: Optional[float] = None,
+    path: Optional[str] = None,
+    table: str = "cache",
+) -> Optional[BaseCache]:
+    """
+    Builds a cache from configuration.
+
+    Args:
+        backend: 'memory' (LRUCache), 'sqlite' (SQLiteCache), 'tiered' (LRUCache in front
+            of SQLiteCache) or 'none' (caching disabled).
+        max_size: Maximum number of entries.
+        default_ttl: Default time-to-live in seconds (None or 0 means no expiry).
+        path: SQLite database file (required for the 'sqlite' and 'tiered' backends).
+        table: SQLite table name, so several caches can share one file.
+
+    Returns:
+        The cache instance, or None if caching is disabled.
+    """
+    backend = (backend or "none").lower()
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return LRUCache(max_size=max_size, default_ttl=default_ttl)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("The 'sqlite' cache backend requires a path.")
+        return SQLiteCache(path, table=table, max_size=max_size, default_ttl=default_ttl)
+    if backend == "tiered":
+        if not path:
+            raise ValueError("The 'tiered' cache backend requires a path.")
+        return TieredCache(
+            LRUCache(max_size=max_size, default_ttl=default_ttl),
+            SQLiteCache(path, table=table, max_size=max_size * 10, default_ttl=default_ttl),
+            default_ttl=default_ttl,
+        )
+    raise ValueError(f"Unknown cache backend: {backend!r}")
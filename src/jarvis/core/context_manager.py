@@ -1,24 +1,456 @@
 # src/jarvis/core/context_manager.py
+import asyncio
 import logging
-from collections import defaultdict, deque
-from typing import Dict, List, Tuple, Optional
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set, Tuple, Optional
+
+from .history_backend import HistoryBackend, StoredSummary, create_history_backend
+from .rate_limiter import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
 # Type alias for a message tuple: (user_input, ai_response, original_language)
 MessageType = Tuple[str, str, Optional[str]]
 
+# Session store limits (0 disables a limit)
+CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", "20"))
+CONTEXT_MAX_SESSIONS = int(os.getenv("CONTEXT_MAX_SESSIONS", "10000"))
+CONTEXT_MAX_BYTES = int(os.getenv("CONTEXT_MAX_BYTES", str(256 * 1024 * 1024)))
+CONTEXT_SESSION_IDLE_TTL = float(os.getenv("CONTEXT_SESSION_IDLE_TTL", "86400"))
+CONTEXT_SWEEP_INTERVAL = float(os.getenv("CONTEXT_SWEEP_INTERVAL", "60"))
+
+# Persistent history backend (memory | sqlite)
+CONTEXT_BACKEND = os.getenv("CONTEXT_BACKEND", "memory")
+CONTEXT_DB_PATH = os.getenv("CONTEXT_DB_PATH", ".cache/jarvis_context.sqlite3")
+
+# Prompt size limits in estimated tokens (0 disables): total formatted context, and any single turn
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_MAX_TURN_TOKENS = int(os.getenv("CONTEXT_MAX_TURN_TOKENS", "1000"))
+
+# Rolling summarization: once this many turns are unsummarized, older ones are folded into
+# the session summary in the background, keeping the newest CONTEXT_SUMMARY_KEEP_TURNS raw (0 disables)
+CONTEXT_SUMMARIZE_AFTER_TURNS = int(os.getenv("CONTEXT_SUMMARIZE_AFTER_TURNS", "10"))
+CONTEXT_SUMMARY_KEEP_TURNS = int(os.getenv("CONTEXT_SUMMARY_KEEP_TURNS", "4"))
+
+# (previous summary, rendered turns to fold in) -> new summary, or None on failure
+Summarizer = Callable[[Optional[str], List[str]], Awaitable[Optional[str]]]
+
+
+# Distinct max_history values memoized per session
+_MAX_RENDERED_WINDOWS = 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text to about `max_tokens` tokens and appends a marker with the number of omitted tokens."""
+    total_tokens = estimate_tokens(text)
+    if max_tokens <= 0 or total_tokens <= max_tokens:
+        return text
+    return f"{text[:max_tokens * 4].rstrip()} …[truncated {total_tokens - max_tokens} tokens]"
+
+
+def render_turn(message: MessageType, max_tokens: int = 0) -> str:
+    """
+    Formats one turn the way it appears in LLM prompts. If the turn is longer than
+    `max_tokens`, the user input and AI response are truncated (with markers) so that
+    together they fit; the shorter side keeps as much as possible.
+    """
+    user_input, ai_response, _ = message
+    if max_tokens > 0 and estimate_tokens(user_input) + estimate_tokens(ai_response) > max_tokens:
+        user_share = min(estimate_tokens(user_input), max(max_tokens // 2, max_tokens - estimate_tokens(ai_response)))
+        user_input = truncate_to_tokens(user_input, user_share)
+        ai_response = truncate_to_tokens(ai_response, max(1, max_tokens - user_share))
+    return f"User: {user_input}\nAI: {ai_response}"
+
+
+def message_nbytes(message: MessageType) -> int:
+    """Approximate resident size of a stored message (tuple plus its strings)."""
+    return sys.getsizeof(message) + sum(sys.getsizeof(part) for part in message if part is not None)
+
+
+class SessionHistory(deque):
+    """
+    Bounded history of one session. Tracks its approximate size in bytes
+    (`nbytes`) as messages are appended or dropped by `maxlen`.
+
+    Each turn is rendered (truncated to `max_turn_tokens`) and token-counted once
+    when appended. The prompt text of the last `max_history` turns is memoized
+    per `max_history` and updated incrementally on append, so `render()` on the
+    read path is a dictionary lookup.
+
+    `summary` holds the rolling summary of turns up to the absolute turn number
+    `summarized_through`; turns are numbered by `appended_total`, so the boundary
+    stays correct when `maxlen` drops old turns. A history loaded from a backend
+    takes both from the backend (see restore_summary).
+    """
+
+    def __init__(self, iterable: Iterable[MessageType] = (), maxlen: Optional[int] = None, max_turn_tokens: int = CONTEXT_MAX_TURN_TOKENS):
+        super().__init__(maxlen=maxlen)
+        self.nbytes = 0
+        self.max_turn_tokens = max_turn_tokens
+        self._rendered_turns: deque = deque(maxlen=maxlen)
+        self._turn_tokens: deque = deque(maxlen=maxlen)
+        self._windows: Dict[int, str] = {}
+        self._budget_windows: Dict[Tuple[int, int], str] = {}
+        self.appended_total = 0
+        self.summary: Optional[str] = None
+        self.summarized_through = 0
+        for message in iterable:
+            self.append(message)
+
+    def append(self, message: MessageType) -> None:
+        previous_length = len(self)
+        if self.maxlen is not None and previous_length == self.maxlen and self.maxlen > 0:
+            self.nbytes -= message_nbytes(self[0])
+        rendered = render_turn(message, self.max_turn_tokens)
+        self._budget_windows.clear()
+        # Slide every memoized window forward by one turn
+        for window_size, window in self._windows.items():
+            turns_in_full_window = min(window_size, self.maxlen) if self.maxlen else window_size
+            if not window:
+                self._windows[window_size] = rendered
+            elif previous_length >= turns_in_full_window:
+                if turns_in_full_window == 1:
+                    self._windows[window_size] = rendered
+                else:
+                    dropped = self._rendered_turns[previous_length - turns_in_full_window]
+                    self._windows[window_size] = f"{window[len(dropped) + 1:]}\n{rendered}"
+            else:
+                self._windows[window_size] = f"{window}\n{rendered}"
+        super().append(message)
+        self._rendered_turns.append(rendered)
+        self._turn_tokens.append(estimate_tokens(rendered))
+        self.nbytes += message_nbytes(message)
+        self.appended_total += 1
+
+    def clear(self) -> None:
+        super().clear()
+        self._rendered_turns.clear()
+        self._turn_tokens.clear()
+        self._windows.clear()
+        self._budget_windows.clear()
+        self.nbytes = 0
+        self.appended_total = 0
+        self.summary = None
+        self.summarized_through = 0
+
+    @property
+    def unsummarized_count(self) -> int:
+        """Number of stored turns not yet covered by the summary."""
+        return min(len(self), self.appended_total - self.summarized_through)
+
+    def turns_to_summarize(self, keep_recent: int) -> Tuple[List[str], int]:
+        """
+        Returns the rendered unsummarized turns except the newest `keep_recent`,
+        and the absolute turn number the summary will cover once they are folded in.
+        """
+        unsummarized = self.unsummarized_count
+        count = max(0, unsummarized - keep_recent)
+        start = len(self) - unsummarized
+        turns = list(self._rendered_turns)[start:start + count]
+        return turns, self.appended_total - unsummarized + count
+
+    def apply_summary(self, summary: str, summarized_through: int) -> None:
+        """Stores a new rolling summary covering turns up to `summarized_through`."""
+        if summarized_through > self.summarized_through:
+            self.summary = summary
+            self.summarized_through = summarized_through
+
+    def restore_summary(self, summary: Optional[str], summarized_through: int, appended_total: int) -> None:
+        """Restores the persisted summary and turn numbering after the newest turns were loaded."""
+        self.appended_total = max(appended_total, len(self))
+        if summary:
+            self.summary = summary
+            self.summarized_through = min(summarized_through, self.appended_total)
+
+    def render(self, max_history: int) -> str:
+        """Returns the last `max_history` turns as prompt text ('User: ...' / 'AI: ...' lines)."""
+        window = self._windows.get(max_history)
+        if window is None:
+            turns = list(self._rendered_turns)[-max_history:] if max_history > 0 else list(self._rendered_turns)
+            window = "\n".join(turns)
+            if len(self._windows) >= _MAX_RENDERED_WINDOWS:
+                self._windows.clear()
+            if max_history > 0:
+                self._windows[max_history] = window
+        return window
+
+    def render_within_budget(self, max_history: int, token_budget: int) -> str:
+        """
+        Returns the newest turns (at most `max_history`) whose token counts fit
+        `token_budget`. If even the newest turn does not fit, it is truncated to the budget.
+        """
+        if token_budget <= 0:
+            return self.render(max_history)
+        turn_count = min(max_history, len(self)) if max_history > 0 else len(self)
+        token_counts = list(self._turn_tokens)[len(self) - turn_count:]
+        if sum(token_counts) <= token_budget:
+            return self.render(max_history)  # whole window fits: memoized path
+
+        key = (max_history, token_budget)
+        window = self._budget_windows.get(key)
+        if window is None:
+            used = 0
+            fitting = 0
+            for tokens in reversed(token_counts):
+                if used + tokens > token_budget:
+                    break
+                used += tokens
+                fitting += 1
+            if fitting:
+                window = "\n".join(list(self._rendered_turns)[len(self) - fitting:])
+            else:
+                window = render_turn(self[-1], token_budget)
+            if len(self._budget_windows) >= _MAX_RENDERED_WINDOWS:
+                self._budget_windows.clear()
+            self._budget_windows[key] = window
+        return window
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens of all stored (rendered) turns."""
+        return sum(self._turn_tokens)
+
+
+class SessionStore(OrderedDict):
+    """
+    Session id -> SessionHistory mapping bounded by session count, total bytes
+    and idle time.
+
+    Entries are kept in least-recently-used order; once a limit is exceeded the
+    least recently used sessions are evicted. Idle sessions are expired lazily on
+    access and by `sweep()`, which runs at most every `sweep_interval` seconds
+    on writes. Like the previous defaultdict, a missing key creates an empty history.
+    """
+
+    def __init__(
+        self,
+        history_factory: Callable[[], SessionHistory],
+        max_sessions: int = CONTEXT_MAX_SESSIONS,
+        max_bytes: int = CONTEXT_MAX_BYTES,
+        idle_ttl: float = CONTEXT_SESSION_IDLE_TTL,
+        sweep_interval: float = CONTEXT_SWEEP_INTERVAL,
+    ):
+        super().__init__()
+        self.history_factory = history_factory
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.resident_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._last_access: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+
+    def __missing__(self, session_id: str) -> SessionHistory:
+        history = self.history_factory()
+        with self._lock:
+            OrderedDict.__setitem__(self, session_id, history)
+            self._last_access[session_id] = time.monotonic()
+            self._enforce_limits(protect=session_id)
+        return history
+
+    def __delitem__(self, session_id: str) -> None:
+        with self._lock:
+            history = OrderedDict.pop(self, session_id)
+            self._last_access.pop(session_id, None)
+            self.resident_bytes -= history.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            OrderedDict.clear(self)
+            self._last_access.clear()
+            self.resident_bytes = 0
+
+    def _is_expired(self, session_id: str, now: float) -> bool:
+        return bool(self.idle_ttl) and now - self._last_access.get(session_id, now) > self.idle_ttl
+
+    def get_history(self, session_id: str) -> Optional[SessionHistory]:
+        """Returns the session's history and marks it as recently used. None if unknown or expired."""
+        with self._lock:
+            history = OrderedDict.get(self, session_id)
+            if history is None:
+                return None
+            now = time.monotonic()
+            if self._is_expired(session_id, now):
+                del self[session_id]
+                self.expirations += 1
+                return None
+            self.move_to_end(session_id)
+            self._last_access[session_id] = now
+            return history
+
+    def put_history(self, session_id: str, history: SessionHistory) -> SessionHistory:
+        """Inserts a (loaded) history as the most recently used session and enforces the limits."""
+        with self._lock:
+            if OrderedDict.get(self, session_id) is not None:
+                del self[session_id]
+            OrderedDict.__setitem__(self, session_id, history)
+            self._last_access[session_id] = time.monotonic()
+            self.resident_bytes += history.nbytes
+            self._enforce_limits(protect=session_id)
+            return history
+
+    def append_message(self, session_id: str, message: MessageType) -> SessionHistory:
+        """Appends a message to the session (creating it if needed) and enforces the limits."""
+        with self._lock:
+            history = self.get_history(session_id)
+            if history is None:
+                history = self[session_id]
+            previous_nbytes = history.nbytes
+            history.append(message)
+            self.resident_bytes += history.nbytes - previous_nbytes
+            self._enforce_limits(protect=session_id)
+            if self.sweep_interval and time.monotonic() - self._last_sweep >= self.sweep_interval:
+                self.sweep()
+            return history
+
+    def _enforce_limits(self, protect: Optional[str] = None) -> None:
+        """Evicts least recently used sessions (never `protect`) until within the count and byte limits."""
+        while len(self) > 1 and (
+            (self.max_sessions and len(self) > self.max_sessions)
+            or (self.max_bytes and self.resident_bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self))
+            if oldest == protect:
+                break
+            del self[oldest]
+            self.evictions += 1
+            logger.debug(f"Evicted session {oldest} (sessions: {len(self)}, bytes: {self.resident_bytes}).")
+
+    def sweep(self) -> int:
+        """Removes sessions idle for longer than `idle_ttl`. Returns the number removed."""
+        with self._lock:
+            now = time.monotonic()
+            self._last_sweep = now
+            if not self.idle_ttl:
+                return 0
+            expired = 0
+            # LRU order: the first non-expired session ends the scan
+            while len(self):
+                oldest = next(iter(self))
+                if not self._is_expired(oldest, now):
+                    break
+                del self[oldest]
+                expired += 1
+            self.expirations += expired
+            if expired:
+                logger.info(f"Expired {expired} idle sessions.")
+            return expired
+
+    def stats(self) -> Dict[str, Any]:
+        """Gauges and counters for monitoring."""
+        return {
+            "sessions": len(self),
+            "resident_bytes": self.resident_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def _create_history_backend(max_turns: int) -> Optional[HistoryBackend]:
+    """Creates the history backend configured by CONTEXT_BACKEND. Falls back to memory only on failure."""
+    try:
+        return create_history_backend(CONTEXT_BACKEND, path=CONTEXT_DB_PATH, max_turns=max_turns)
+    except Exception as e:
+        logger.error(f"Could not create history backend ({CONTEXT_BACKEND}): {e}. History will not be persisted.")
+        return None
+
+
 class ContextManager:
     """
     Manages conversation history for different sessions.
-    Stores history in memory.
+    Stores history in memory, bounded by a SessionStore (session count, bytes, idle TTL).
+    With a persistent backend the store acts as a hot cache: writes go to both,
+    and sessions missing from memory are loaded from the backend.
+    With a summarizer, older turns of long sessions are compacted into a rolling
+    summary by a background task, off the request path.
     """
-    def __init__(self):
-        # Use defaultdict with deque for efficient history management (max length)
+    def __init__(
+        self,
+        max_turns: int = CONTEXT_MAX_TURNS,
+        max_sessions: int = CONTEXT_MAX_SESSIONS,
+        max_bytes: int = CONTEXT_MAX_BYTES,
+        idle_ttl: float = CONTEXT_SESSION_IDLE_TTL,
+        sweep_interval: float = CONTEXT_SWEEP_INTERVAL,
+        backend: Optional[HistoryBackend] = None,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        max_turn_tokens: int = CONTEXT_MAX_TURN_TOKENS,
+        summarizer: Optional[Summarizer] = None,
+        summarize_after: int = CONTEXT_SUMMARIZE_AFTER_TURNS,
+        summary_keep_turns: int = CONTEXT_SUMMARY_KEEP_TURNS,
+    ):
+        # Bounded LRU store of per-session deques (max_turns per session)
         # Stores tuples of (user_input, ai_response, original_language)
-        self.session_histories: Dict[str, deque[MessageType]] = defaultdict(lambda: deque(maxlen=20)) # Default max 20 turns
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_turn_tokens = max_turn_tokens
+        self.summarizer = summarizer
+        # Compaction must start before maxlen drops unsummarized turns
+        self.summarize_after = min(summarize_after, max_turns) if max_turns else summarize_after
+        self.summary_keep_turns = summary_keep_turns
+        self._summary_tasks: Dict[str, "asyncio.Task[None]"] = {}
+        self.session_histories: SessionStore = SessionStore(
+            lambda: SessionHistory(maxlen=self.max_turns, max_turn_tokens=self.max_turn_tokens),
+            max_sessions=max_sessions,
+            max_bytes=max_bytes,
+            idle_ttl=idle_ttl,
+            sweep_interval=sweep_interval,
+        )
+        # Durable storage (None: memory only, see CONTEXT_BACKEND)
+        self.backend = backend if backend is not None else _create_history_backend(max_turns)
         logger.info("ContextManager initialized.")
 
+    def _get_history(self, session_id: str) -> Optional[SessionHistory]:
+        """Returns the session's history from memory, loading it from the backend on a miss."""
+        if self.backend is None:
+            return self.session_histories.get_history(session_id)
+        cached = self.session_histories.get_history(session_id) is not None
+        return self._merge_loaded(session_id, *self._read_backend(session_id, cached))
+
+    def _load_session(self, session_id: str) -> Tuple[List[MessageType], Optional[StoredSummary]]:
+        """A session's newest turns and its stored summary (backend only; safe in a worker thread)."""
+        return self.backend.load(session_id, self.max_turns), self.backend.load_summary(session_id)
+
+    def _read_backend(self, session_id: str, cached: bool) -> Tuple[Set[str], Optional[Tuple[List[MessageType], Optional[StoredSummary]]]]:
+        """
+        Backend reads for one session: sessions other worker processes have written
+        to since the last call, and the session's turns and summary unless the cached
+        copy is current. Touches only the backend, so it can run in a worker thread.
+        """
+        changed = self.backend.changed_sessions()
+        loaded = None
+        if not cached or session_id in changed:
+            loaded = self._load_session(session_id)
+        return changed, loaded
+
+    def _merge_loaded(
+        self,
+        session_id: str,
+        changed: Set[str],
+        loaded: Optional[Tuple[List[MessageType], Optional[StoredSummary]]],
+    ) -> Optional[SessionHistory]:
+        """Applies the result of _read_backend to the in-memory store and returns the session's history."""
+        # Drop cached sessions that other worker processes have written to since
+        for stale_session_id in changed:
+            if stale_session_id in self.session_histories:
+                del self.session_histories[stale_session_id]
+        history = self.session_histories.get_history(session_id)
+        if history is None and loaded is not None and loaded[0]:
+            messages, stored_summary = loaded
+            history = SessionHistory(messages, maxlen=self.max_turns, max_turn_tokens=self.max_turn_tokens)
+            if stored_summary is not None:
+                history.restore_summary(*stored_summary)
+            history = self.session_histories.put_history(session_id, history)
+        return history
+
     def add_message(self, session_id: str, user_input: str, ai_response: str, original_language: Optional[str] = None):
         """
         Adds a user input and its corresponding AI response to the session history.
@@ -34,47 +466,132 @@ class ContextManager:
             return
 
         message: MessageType = (user_input, ai_response, original_language)
-        self.session_histories[session_id].append(message)
-        logger.debug(f"Added message to session {session_id}. History size: {len(self.session_histories[session_id])}")
+        if self.backend is not None:
+            self._get_history(session_id)  # warm the cache so the in-memory window is complete
+            self.backend.append(session_id, message)
+        history = self.session_histories.append_message(session_id, message)
+        logger.debug(f"Added message to session {session_id}. History size: {len(history)}")
+        self._schedule_summary(session_id, history)
+
+    def _schedule_summary(self, session_id: str, history: SessionHistory) -> None:
+        """Starts background compaction once enough turns are unsummarized (one task per session)."""
+        if self.summarizer is None or self.summarize_after <= 0 or history.unsummarized_count < self.summarize_after:
+            return
+        if session_id in self._summary_tasks:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (synchronous caller); retried on the next async add_message
+        turns, summarized_through = history.turns_to_summarize(self.summary_keep_turns)
+        if not turns:
+            return
+        self._summary_tasks[session_id] = loop.create_task(self._summarize(session_id, history, turns, summarized_through))
+
+    async def _summarize(self, session_id: str, history: SessionHistory, turns: List[str], summarized_through: int) -> None:
+        try:
+            summary = await self.summarizer(history.summary, turns)
+            # Skip if the session was cleared or evicted while summarizing
+            if summary and self.session_histories.get(session_id) is history:
+                history.apply_summary(summary, summarized_through)
+                if self.backend is not None and history.summarized_through == summarized_through:
+                    self.backend.save_summary(session_id, summary, summarized_through)  # restored when the session is loaded again
+                logger.info(f"Compacted {len(turns)} turns of session {session_id} into its summary.")
+        except Exception as e:
+            logger.error(f"Failed to summarize session {session_id}: {e}", exc_info=True)
+        finally:
+            self._summary_tasks.pop(session_id, None)
 
-    def get_formatted_context(self, session_id: str, max_history: int = 5) -> str:
+    async def wait_for_summaries(self) -> None:
+        """Waits for in-flight background summarizations (e.g. on shutdown)."""
+        tasks = list(self._summary_tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_formatted_context(self, session_id: str, max_history: int = 5, token_budget: Optional[int] = None) -> str:
         """
         Retrieves and formats the recent conversation history for a given session.
 
         Args:
             session_id: The unique identifier for the session.
             max_history: The maximum number of recent conversation turns to include.
+            token_budget: Maximum estimated tokens of the returned context; the newest
+                turns that fit are included. Defaults to the manager's token_budget (0: unlimited).
 
         Returns:
             A formatted string containing the recent conversation history,
             suitable for including in an LLM prompt. Returns an empty string
             if the session ID is not found or has no history.
         """
-        if session_id not in self.session_histories:
-            logger.warning(f"No history found for session_id: {session_id}")
-            return ""
+        return self._format_history(session_id, self._get_history(session_id), max_history, token_budget)
 
-        history = self.session_histories[session_id]
-        # Get the last 'max_history' items. Deque stores items in insertion order.
-        recent_history = list(history)[-max_history:]
+    async def get_formatted_context_async(self, session_id: str, max_history: int = 5, token_budget: Optional[int] = None) -> str:
+        """
+        Like get_formatted_context, but the backend is read in a worker thread
+        (asyncio.to_thread), so the SQLite query does not block the event loop and
+        can overlap other work (e.g. input parsing). The loaded turns are merged
+        into the in-memory store back on the loop.
+        """
+        if self.backend is None:
+            return self.get_formatted_context(session_id, max_history, token_budget)
+        cached = self.session_histories.get_history(session_id) is not None
+        changed, loaded = await asyncio.to_thread(self._read_backend, session_id, cached)
+        history = self._merge_loaded(session_id, changed, loaded)
+        if history is None and loaded is None:  # evicted from memory while the backend was read
+            loaded = await asyncio.to_thread(self._load_session, session_id)
+            history = self._merge_loaded(session_id, set(), loaded)
+        return self._format_history(session_id, history, max_history, token_budget)
 
-        if not recent_history:
+    def _format_history(self, session_id: str, history: Optional[SessionHistory], max_history: int, token_budget: Optional[int]) -> str:
+        """Formats a session's history for a prompt (see get_formatted_context)."""
+        if history is None:
+            logger.warning(f"No history found for session_id: {session_id}")
             return ""
 
-        formatted_context = ""
-        for user_input, ai_response, _ in recent_history:
-            formatted_context += f"User: {user_input}\n"
-            formatted_context += f"AI: {ai_response}\n"
+        if not history:
+            return ""
 
-        logger.debug(f"Retrieved formatted context for session {session_id} (last {len(recent_history)} turns).")
-        # Remove the trailing newline for cleaner integration
+        if token_budget is None:
+            token_budget = self.token_budget
+        if history.summary:
+            # Rolling summary of compacted turns, followed by the newest turns it does not cover
+            summary_text = f"Summary of earlier conversation: {history.summary}"
+            recent_turns = history.unsummarized_count
+            if max_history > 0:
+                recent_turns = min(max_history, recent_turns)
+            recent_budget = max(1, token_budget - estimate_tokens(summary_text)) if token_budget > 0 else 0
+            recent_context = history.render_within_budget(recent_turns, recent_budget) if recent_turns else ""
+            formatted_context = f"{summary_text}\n{recent_context}" if recent_context else summary_text
+        else:
+            # Pre-rendered window of the last 'max_history' turns (maintained by SessionHistory.append)
+            formatted_context = history.render_within_budget(max_history, token_budget)
+        logger.debug(f"Retrieved formatted context for session {session_id} (last {max_history} turns at most).")
         return formatted_context.strip()
 
     def clear_history(self, session_id: str):
         """Clears the conversation history for a specific session."""
-        if session_id in self.session_histories:
-            self.session_histories[session_id].clear()
+        persisted = self.backend is not None and bool(self.backend.load(session_id, 1))
+        if session_id in self.session_histories or persisted:
+            if session_id in self.session_histories:
+                del self.session_histories[session_id]
+            if self.backend is not None:
+                self.backend.delete(session_id)
             logger.info(f"Cleared history for session_id: {session_id}")
-            del self.session_histories[session_id] # Remove entry from defaultdict if empty
         else:
-            logger.warning(f"Attempted to clear history for non-existent session_id: {session_id}") 
\ No newline at end of file
+            logger.warning(f"Attempted to clear history for non-existent session_id: {session_id}")
+
+    def sweep_sessions(self) -> int:
+        """Expires idle sessions now. Returns the number removed."""
+        return self.session_histories.sweep()
+
+    def stats(self) -> Dict[str, Any]:
+        """Resident session/byte gauges and eviction counters."""
+        stats = self.session_histories.stats()
+        if self.backend is not None and hasattr(self.backend, "stats"):
+            stats["backend"] = self.backend.stats()
+        return stats
+
+    def close(self) -> None:
+        """Flushes pending writes and closes the persistent backend."""
+        if self.backend is not None:
+            self.backend.close()
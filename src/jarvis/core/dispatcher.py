@@ -14,6 +14,7 @@ from typing import Optional, List, Dict, Any, AsyncGenerator, TypedDict, Union #
 import google.genai as genai # ADK 코드에서 사용하는 google.genai 임포트
 # from google.generativeai.types import GenerateContentResponse # 경로 변경
 from google.genai.types import GenerateContentResponse # google.genai 경로 사용
+import asyncio # 투기적 라우팅 파이프라인용
 import logging # 로깅 추가
 import os # 환경 변수 사용 위해 추가
 import dotenv # .env 파일 로드 위해 추가
@@ -35,9 +36,14 @@ from ..agents.qa_agent import KnowledgeQA_Agent
 
 # Import available tools and specific tools
 from ..tools import available_tools, translate_tool, web_search_tool, code_execution_tool # Added tool imports
+from ..tools.code_execution_tool import SANDBOX_SESSION_STATE_KEY # 세션별 코드 실행 상태 키
 from google.adk.tools import BaseTool # Import BaseTool for type hinting
 
 from ..core.context_manager import ContextManager # ContextManager 임포트
+from ..core.summarizer import summarize_conversation # 긴 세션의 오래된 대화를 백그라운드에서 요약
+from ..core.request_context import RequestContext # 요청 단위 상태 (공유 디스패처 상태 대체)
+from ..core.llm_client import get_llm_client_registry # 공유 LLM 클라이언트 (커넥션 풀/모델별 동시성 제한/레이트 리밋)
+from ..core.routing import RoutingCache, EmbeddingRouter, IntentRoutingTable, NO_AGENT, ROUTING_STRATEGY, ROUTING_STRATEGY_EMBEDDING # 위임 결정 캐시 / 로컬 라우터
 
 logger = logging.getLogger(__name__) # 로거 설정
 
@@ -71,6 +77,12 @@ DEFAULT_INSTRUCTION = (
 # Agent Hub URL 설정 (환경 변수 또는 기본값)
 AGENT_HUB_DISCOVER_URL = os.getenv("AGENT_HUB_DISCOVER_URL", "http://localhost:8001/discover") # Agent Hub URL 추가
 
+# 투기적 파이프라인: 입력 파싱과 동시에 원문으로 위임 LLM 호출 및 대화 이력 조회를 시작
+SPECULATIVE_ROUTING = os.getenv("DISPATCHER_SPECULATIVE_ROUTING", "false").lower() in ("1", "true", "yes")
+
+# 스트리밍 응답: 최종 응답(번역 포함)을 생성되는 대로 partial Event로 전달
+STREAM_RESPONSES = os.getenv("DISPATCHER_STREAM_RESPONSES", "false").lower() in ("1", "true", "yes")
+
 class DelegationInfo(TypedDict):
     """하위 에이전트 호출에 필요한 정보를 담는 타입 딕셔너리"""
     agent_name: str
@@ -79,6 +91,14 @@ class DelegationInfo(TypedDict):
     required_tools: List[BaseTool]
     conversation_history: Optional[str] # 추가: 대화 이력
 
+
+def _event_text(event: Event) -> str:
+    """Text parts of an ADK event joined together ('' if it has none)."""
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+
+
 class JarvisDispatcher(LlmAgent):
     """
     Central dispatcher for the Jarvis AI Framework.
@@ -92,10 +112,15 @@ class JarvisDispatcher(LlmAgent):
     # context_manager: ContextManager = Field(default_factory=ContextManager) # 주석 처리
     llm_clients: Dict[str, Any] = Field(default_factory=dict, exclude=True)
     agent_tool_map: Dict[str, List[BaseTool]] = Field(default_factory=dict) # Added agent_tool_map
-    current_parsed_input: Optional[ParsedInput] = None
-    current_original_language: Optional[str] = None
     http_client: httpx.AsyncClient = Field(default=None, exclude=True) # HTTP 클라이언트 필드 추가
-    context_manager: ContextManager = Field(default_factory=ContextManager) # ContextManager 추가
+    context_manager: ContextManager = Field(default_factory=lambda: ContextManager(summarizer=summarize_conversation)) # ContextManager 추가 (롤링 요약 포함)
+    routing_cache: RoutingCache = Field(default_factory=RoutingCache, exclude=True) # (intent, domain) -> 위임 결정 캐시
+    routing_strategy: str = Field(default=ROUTING_STRATEGY) # 'llm' 또는 'embedding' (로컬 유사도 라우팅 후 LLM 폴백)
+    embedding_router: EmbeddingRouter = Field(default_factory=EmbeddingRouter, exclude=True)
+    intent_routing_table: IntentRoutingTable = Field(default_factory=IntentRoutingTable, exclude=True) # config/routing_table.json 규칙 (핫 리로드)
+    speculative_routing: bool = Field(default=SPECULATIVE_ROUTING) # 파싱/이력 조회/위임 결정을 병렬로 실행
+    stream_responses: bool = Field(default=STREAM_RESPONSES) # 최종 응답을 partial Event로 스트리밍
+    speculation_stats: Dict[str, int] = Field(default_factory=lambda: {"started": 0, "used": 0, "cancelled": 0, "fallback": 0}, exclude=True)
 
     def __init__(self, **kwargs):
         """
@@ -161,14 +186,13 @@ class JarvisDispatcher(LlmAgent):
                 logger.error(f"Cannot initialize LLM client for {model_name}: GEMINI_API_KEY is missing.")
                 self.llm_clients[model_name] = None
                 return
-            try:
-                # Client() 생성 시 API 키 명시적 전달
-                client = genai.Client(api_key=API_KEY)
-                self.llm_clients[model_name] = client
-                logger.info(f"Successfully initialized LLM client (genai.Client) with API key, associated with key: {model_name}, Type: {type(client)}")
-            except Exception as e:
-                logger.error(f"Failed to initialize LLM client (genai.Client) with API key, associated with key {model_name}: {e}")
-                self.llm_clients[model_name] = None
+            # 모델별로 Client를 새로 만들지 않고 프로세스 공유 클라이언트(커넥션 재사용)를 사용
+            client = get_llm_client_registry().get_client()
+            self.llm_clients[model_name] = client
+            if client is not None:
+                logger.info(f"Using shared LLM client (genai.Client) for model key: {model_name}, Type: {type(client)}")
+            else:
+                logger.error(f"Shared LLM client is not available for model key {model_name}.")
 
     def get_llm_client(self, model_name: str) -> Any:
         """지정된 모델 이름에 대한 초기화된 LLM 클라이언트를 반환합니다."""
@@ -203,22 +227,40 @@ class JarvisDispatcher(LlmAgent):
         # Assign the newly built list to self.tools
         self.tools = updated_tools
 
+        # The agent set changed, so cached routing decisions and agent vectors may no longer be valid
+        self.routing_cache.invalidate()
+        self.embedding_router.invalidate()
+
         # Log the registration
         if is_overwriting:
             logger.warning(f"Agent with name '{agent.name}' overwritten.")
         logger.info(f"Agent '{agent.name}' (type: {type(agent)}, model: {getattr(agent, 'model', 'N/A')}) registered/updated. Current tools: {[getattr(t, 'name', 'N/A') for t in self.tools]}")
 
-    async def process_request(self, user_input: str, session_id: Optional[str] = None) -> Union[DelegationInfo, str]:
+    async def process_request(self, user_input: str, session_id: Optional[str] = None, request_context: Optional[RequestContext] = None) -> Union[DelegationInfo, str]:
         """
         사용자 입력을 받아 파싱하고, 위임할 에이전트 및 관련 정보를 결정합니다.
         반환값: 위임이 필요하면 DelegationInfo, 아니면 에러 또는 정보 메시지 문자열.
         session_id 추가.
+        파싱 결과와 원본 언어는 공유 인스턴스가 아닌 request_context에 기록됩니다 (동시 요청 간 경합 방지).
         """
+        if request_context is None:
+            request_context = RequestContext(user_input=user_input, session_id=session_id)
+        speculative_task: Optional[asyncio.Task] = None
+        history_task: Optional[asyncio.Task] = None
+        # 결정 시작 시점의 라우팅 캐시 세대: 그 사이 에이전트 구성이 바뀌면 이 결정은 캐시하지 않음
+        routing_generation = self.routing_cache.generation
         try:
             # 1. Parse Input
             if not self.input_parser:
                 logger.error("Input parser not initialized!")
                 return "Error: Input parser not available."
+
+            # 투기적 모드: 파싱이 진행되는 동안 원문 기반 위임 결정과 대화 이력 조회를 미리 시작
+            if self.speculative_routing:
+                speculative_task = self._start_speculative_routing(user_input)
+                if session_id:
+                    history_task = asyncio.create_task(self._get_conversation_history_async(session_id))
+
             try:
                 parsed_input = await self.input_parser.process_input(user_input)
             except Exception as e:
@@ -229,98 +271,103 @@ class JarvisDispatcher(LlmAgent):
                 logger.error("Input parsing returned None or empty. Cannot proceed.")
                 return "Error: Input parsing failed to produce results."
 
-            self.current_parsed_input = parsed_input
-            self.current_original_language = parsed_input.original_language
+            request_context.set_parsed_input(parsed_input)
             llm_input_text = parsed_input.english_text
             logger.info(f"Dispatcher deciding delegation for: {llm_input_text[:100]}...")
 
             # --- Get Conversation History ---
             conversation_history = None
-            if session_id:
-                try:
-                    conversation_history = self.context_manager.get_formatted_context(session_id)
-                    logger.debug(f"Retrieved conversation history for session {session_id}:\n{conversation_history[:200]}...")
-                except Exception as e:
-                    logger.error(f"Error retrieving conversation history for session {session_id}: {e}", exc_info=True)
-                    # Proceed without history if context retrieval fails
+            if history_task is not None:
+                conversation_history = await history_task
+            elif session_id:
+                conversation_history = self._get_conversation_history(session_id)
             else:
                 logger.warning("No session_id provided to process_request, cannot retrieve conversation history.")
             # --- End Get History ---
 
-            # 2. Prepare Prompt
-            try:
-                tool_descriptions = "\n".join([
-                    f"- {getattr(tool, 'name', 'N/A')}: {getattr(tool, 'description', 'N/A')}"
-                    for tool in self.tools
-                ])
-                prompt = f"{self.instruction}\n{tool_descriptions}\n\nUser Request: {llm_input_text}"
-                logger.debug(f"Dispatcher Prompt:\n{prompt}")
-            except Exception as e:
-                logger.error(f"Error preparing dispatcher prompt: {e}", exc_info=True)
-                return "Error: Internal error preparing request."
+            # 2. Routing Table / Routing Cache Lookup / Local Routing (결정되면 위임 LLM 호출 생략)
+            routing_decision = self._route_with_table(parsed_input)
 
-            # 3. Call LLM for Delegation
-            dispatcher_llm_client = self.get_llm_client(self.model)
-            if not dispatcher_llm_client:
-                logger.error(f"LLM client for dispatcher (model key: {self.model}) not initialized!")
-                return "Error: LLM client not available for dispatcher."
+            if routing_decision is None:
+                routing_decision = self.routing_cache.get(parsed_input)
+                if routing_decision is not None and routing_decision != NO_AGENT and routing_decision not in self.sub_agents:
+                    logger.warning(f"Routing cache returned unknown agent '{routing_decision}'. Ignoring cached decision.")
+                    routing_decision = None
 
-            delegated_agent_name = "NO_AGENT"
-            try:
-                logger.info(f"Calling dispatcher's LLM (model={self.model}) via Client for delegation decision.")
-                response = await dispatcher_llm_client.aio.models.generate_content(
-                    model=self.model,
-                    contents=[Content(parts=[Part(text=prompt)])]
-                )
-                logger.debug(f"Raw Delegation LLM Response type: {type(response)}")
-                logger.debug(f"Raw Delegation LLM Response: {response}")
-
-                if response and hasattr(response, 'text'):
-                    potential_agent_name = response.text.strip()
-                    if potential_agent_name in self.sub_agents:
-                        delegated_agent_name = potential_agent_name
-                        logger.info(f"Dispatcher LLM decided to delegate to internal agent: {delegated_agent_name}")
-                    elif potential_agent_name == "NO_AGENT":
-                        logger.info("Dispatcher LLM indicated no suitable internal agent found. Checking A2A...")
-                        try:
-                            # Ensure intent and domain exist before using them
-                            intent = getattr(self.current_parsed_input, 'intent', 'unknown')
-                            domain = getattr(self.current_parsed_input, 'domain', 'unknown')
-                            needed_capability = f"Handle intent '{intent}' in domain '{domain}'"
-                            discovered_agents = await self._discover_a2a_agents(needed_capability)
-
-                            if discovered_agents:
-                                logger.info(f"Discovered {len(discovered_agents)} potential A2A agents. Selecting the first one.")
-                                selected_a2a_agent_card = discovered_agents[0]
-                                agent_name_to_call = selected_a2a_agent_card.get('name', 'Unknown A2A Agent')
-                                logger.info(f"Attempting to call A2A agent: {agent_name_to_call}")
-                                a2a_result = await self._call_a2a_agent(selected_a2a_agent_card, llm_input_text)
-                                return a2a_result # Return A2A result directly
-                            else:
-                                logger.info("No suitable A2A agents discovered.")
-                                delegated_agent_name = "NO_AGENT" # Explicitly set NO_AGENT
-                        except Exception as a2a_e:
-                            logger.error(f"Error during A2A discovery or call process: {a2a_e}", exc_info=True)
-                            delegated_agent_name = "NO_AGENT" # If A2A fails, fall back
-                    else:
-                        logger.warning(f"Dispatcher LLM returned an unknown agent name: '{potential_agent_name}'. Treating as NO_AGENT.")
-                        delegated_agent_name = "NO_AGENT"
+                if routing_decision is not None:
+                    logger.info(f"Routing cache hit: '{routing_decision}' (intent={parsed_input.intent}, domain={parsed_input.domain}). Skipping delegation LLM call.")
                 else:
-                    logger.error(f"Failed to get valid text response from delegation LLM. Response: {response}")
-                    delegated_agent_name = "NO_AGENT"
-            except Exception as llm_e:
-                logger.error(f"Error during LLM delegation call: {llm_e}", exc_info=True)
-                delegated_agent_name = "NO_AGENT" # If LLM fails, consider it NO_AGENT
-
-            # 4. Return Result (Internal Delegation or Fallback)
-            if delegated_agent_name != "NO_AGENT" and delegated_agent_name in self.sub_agents:
+                    routing_decision = self._route_locally(parsed_input)
+
+            # 투기적 위임 결정 조정: 로컬에서 결정되었으면 취소, 아니면 그 결과를 사용
+            if speculative_task is not None:
+                if routing_decision is not None:
+                    speculative_task.cancel()
+                    self.speculation_stats["cancelled"] += 1
+                    logger.info("Routing decided locally. Cancelled speculative delegation call.")
+                else:
+                    routing_decision = await speculative_task
+                    if routing_decision is not None:
+                        self.speculation_stats["used"] += 1
+                        logger.info(f"Using speculative delegation decision: '{routing_decision}'.")
+                        self.routing_cache.set(parsed_input, routing_decision, generation=routing_generation)
+                    else:
+                        self.speculation_stats["fallback"] += 1
+                        logger.warning("Speculative delegation call failed. Falling back to sequential delegation.")
+
+            if routing_decision is None:
+                # 3. Prepare Prompt
+                prompt = self._build_delegation_prompt(llm_input_text)
+                if prompt is None:
+                    return "Error: Internal error preparing request."
+
+                # 4. Call LLM for Delegation
+                dispatcher_llm_client = self.get_llm_client(self.model)
+                if not dispatcher_llm_client:
+                    logger.error(f"LLM client for dispatcher (model key: {self.model}) not initialized!")
+                    return "Error: LLM client not available for dispatcher."
+
+                routing_decision = await self._decide_delegation_with_llm(dispatcher_llm_client, prompt)
+                if routing_decision is not None:
+                    self.routing_cache.set(parsed_input, routing_decision, generation=routing_generation)
+
+            request_context.routing_decision = routing_decision
+            delegated_agent_name = NO_AGENT
+            if routing_decision in self.sub_agents:
+                delegated_agent_name = routing_decision
+                logger.info(f"Dispatcher decided to delegate to internal agent: {delegated_agent_name}")
+            elif routing_decision == NO_AGENT:
+                logger.info("No suitable internal agent found. Checking A2A...")
+                try:
+                    # Ensure intent and domain exist before using them
+                    intent = getattr(parsed_input, 'intent', 'unknown')
+                    domain = getattr(parsed_input, 'domain', 'unknown')
+                    needed_capability = f"Handle intent '{intent}' in domain '{domain}'"
+                    discovered_agents = await self._discover_a2a_agents(needed_capability)
+
+                    if discovered_agents:
+                        logger.info(f"Discovered {len(discovered_agents)} potential A2A agents. Selecting the first one.")
+                        selected_a2a_agent_card = discovered_agents[0]
+                        agent_name_to_call = selected_a2a_agent_card.get('name', 'Unknown A2A Agent')
+                        logger.info(f"Attempting to call A2A agent: {agent_name_to_call}")
+                        a2a_result = await self._call_a2a_agent(selected_a2a_agent_card, llm_input_text)
+                        return a2a_result # Return A2A result directly
+                    else:
+                        logger.info("No suitable A2A agents discovered.")
+                        delegated_agent_name = NO_AGENT # Explicitly set NO_AGENT
+                except Exception as a2a_e:
+                    logger.error(f"Error during A2A discovery or call process: {a2a_e}", exc_info=True)
+                    delegated_agent_name = NO_AGENT # If A2A fails, fall back
+
+            # 5. Return Result (Internal Delegation or Fallback)
+            if delegated_agent_name != NO_AGENT and delegated_agent_name in self.sub_agents:
                 try:
                     required_tools = self.agent_tool_map.get(delegated_agent_name, [])
                     logger.info(f"Preparing delegation info for internal agent '{delegated_agent_name}' with tools: {[getattr(t, 'name', 'Unnamed Tool') for t in required_tools]}")
                     delegation_info: DelegationInfo = {
                         "agent_name": delegated_agent_name,
                         "input_text": llm_input_text,
-                        "original_language": self.current_original_language,
+                        "original_language": request_context.original_language,
                         "required_tools": required_tools,
                         "conversation_history": conversation_history
                     }
@@ -338,6 +385,132 @@ class JarvisDispatcher(LlmAgent):
             # Catch-all for the entire method
             logger.error(f"Unexpected error in process_request: {outer_e}", exc_info=True)
             return "Error: An unexpected internal error occurred while processing your request."
+        finally:
+            # 조기 반환(파싱 실패 등) 시 남은 투기적 작업 정리
+            for task in (speculative_task, history_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def _get_conversation_history(self, session_id: str) -> Optional[str]:
+        """세션의 대화 이력을 조회합니다. 실패 시 None (이력 없이 진행)."""
+        try:
+            conversation_history = self.context_manager.get_formatted_context(session_id)
+            logger.debug(f"Retrieved conversation history for session {session_id}:\n{conversation_history[:200]}...")
+            return conversation_history
+        except Exception as e:
+            logger.error(f"Error retrieving conversation history for session {session_id}: {e}", exc_info=True)
+            return None
+
+    async def _get_conversation_history_async(self, session_id: str) -> Optional[str]:
+        """
+        _get_conversation_history의 비동기 버전. 백엔드(SQLite) 조회는 워커 스레드에서 수행되고,
+        ContextManager의 메모리 상태는 이벤트 루프에서만 갱신됩니다. 실패 시 None.
+        """
+        try:
+            conversation_history = await self.context_manager.get_formatted_context_async(session_id)
+            logger.debug(f"Retrieved conversation history for session {session_id}:\n{conversation_history[:200]}...")
+            return conversation_history
+        except Exception as e:
+            logger.error(f"Error retrieving conversation history for session {session_id}: {e}", exc_info=True)
+            return None
+
+    def _build_delegation_prompt(self, request_text: str) -> Optional[str]:
+        """위임 결정 프롬프트(지시문 + 에이전트 설명 + 요청)를 생성합니다. 실패 시 None."""
+        try:
+            tool_descriptions = "\n".join([
+                f"- {getattr(tool, 'name', 'N/A')}: {getattr(tool, 'description', 'N/A')}"
+                for tool in self.tools
+            ])
+            prompt = f"{self.instruction}\n{tool_descriptions}\n\nUser Request: {request_text}"
+            logger.debug(f"Dispatcher Prompt:\n{prompt}")
+            return prompt
+        except Exception as e:
+            logger.error(f"Error preparing dispatcher prompt: {e}", exc_info=True)
+            return None
+
+    def _start_speculative_routing(self, user_input: str) -> Optional[asyncio.Task]:
+        """
+        파싱 결과를 기다리지 않고 원문으로 위임 LLM 호출을 시작합니다.
+        원문이 영어가 아니어도 에이전트 선택에는 충분하며, 로컬 라우팅으로 결정되면 취소됩니다.
+        """
+        prompt = self._build_delegation_prompt(user_input)
+        llm_client = self.get_llm_client(self.model)
+        if prompt is None or not llm_client:
+            return None
+        self.speculation_stats["started"] += 1
+        return asyncio.create_task(self._decide_delegation_with_llm(llm_client, prompt))
+
+    def _route_with_table(self, parsed_input: ParsedInput) -> Optional[str]:
+        """
+        선언적 라우팅 테이블(intent/domain 규칙)로 위임 대상을 결정합니다.
+        일치하는 규칙이 없으면 None을 반환합니다.
+        """
+        try:
+            routing_decision = self.intent_routing_table.resolve(parsed_input, self.sub_agents)
+        except Exception as e:
+            logger.error(f"Error during routing table lookup: {e}", exc_info=True)
+            return None
+        if routing_decision is not None:
+            logger.info(f"Routing table matched '{routing_decision}' (intent={parsed_input.intent}, domain={parsed_input.domain}). Skipping delegation LLM call.")
+        return routing_decision
+
+    def routing_stats(self) -> Dict[str, Any]:
+        """라우팅 단계별 지표 (테이블 해석률, 캐시 적중률)를 반환합니다."""
+        return {
+            "routing_table": self.intent_routing_table.stats(),
+            "routing_cache": self.routing_cache.stats(),
+            "speculation": dict(self.speculation_stats),
+        }
+
+    def _route_locally(self, parsed_input: ParsedInput) -> Optional[str]:
+        """
+        LLM 호출 없이 위임 대상을 결정합니다 (routing_strategy가 'embedding'인 경우 유사도 라우터 사용).
+        확신할 수 없으면 None을 반환하여 LLM 위임 결정으로 폴백합니다.
+        """
+        if self.routing_strategy != ROUTING_STRATEGY_EMBEDDING:
+            return None
+        try:
+            if not self.embedding_router.is_built:
+                self.embedding_router.build(self.sub_agents)
+            agent_name, score = self.embedding_router.route(parsed_input.english_text)
+        except Exception as e:
+            logger.error(f"Error during embedding routing: {e}", exc_info=True)
+            return None
+        if agent_name in self.sub_agents:
+            logger.info(f"Embedding router selected '{agent_name}' (score={score:.2f}). Skipping delegation LLM call.")
+            return agent_name
+        logger.info(f"Embedding router not confident (best score={score:.2f}). Falling back to LLM.")
+        return None
+
+    async def _decide_delegation_with_llm(self, llm_client: Any, prompt: str) -> Optional[str]:
+        """
+        위임 결정 LLM을 호출합니다.
+        반환값: 등록된 에이전트 이름, NO_AGENT, 또는 결정 실패(알 수 없는 이름/호출 오류) 시 None.
+        """
+        try:
+            logger.info(f"Calling dispatcher's LLM (model={self.model}) via Client for delegation decision.")
+            response = await get_llm_client_registry().generate_content(
+                self.model,
+                contents=[Content(parts=[Part(text=prompt)])],
+                client=llm_client
+            )
+            logger.debug(f"Raw Delegation LLM Response type: {type(response)}")
+            logger.debug(f"Raw Delegation LLM Response: {response}")
+
+            if response and hasattr(response, 'text'):
+                potential_agent_name = response.text.strip()
+                if potential_agent_name in self.sub_agents:
+                    logger.info(f"Dispatcher LLM decided to delegate to internal agent: {potential_agent_name}")
+                    return potential_agent_name
+                if potential_agent_name == NO_AGENT:
+                    logger.info("Dispatcher LLM indicated no suitable internal agent found.")
+                    return NO_AGENT
+                logger.warning(f"Dispatcher LLM returned an unknown agent name: '{potential_agent_name}'. Treating as NO_AGENT.")
+            else:
+                logger.error(f"Failed to get valid text response from delegation LLM. Response: {response}")
+        except Exception as llm_e:
+            logger.error(f"Error during LLM delegation call: {llm_e}", exc_info=True)
+        return None
 
     @override
     async def invoke(self, ctx: InvocationContext):
@@ -348,28 +521,33 @@ class JarvisDispatcher(LlmAgent):
     ) -> AsyncGenerator[Event, None]:
         """
         Runner로부터 호출받아 process_request 실행 후,
-        하위 에이전트 호출 위임 또는 최종 메시지 반환.
+        하위 에이전트를 실행하거나 최종 메시지 반환. 하위 에이전트의 최종 답변도
+        디스패처 자신의 응답과 같은 경로로 원래 언어로 번역(스트리밍)되고 대화 이력에 저장됩니다.
+        요청 단위 상태는 RequestContext로 전달하며, 하위 에이전트는 공유 인스턴스를 변경하지 않고
+        호출마다 설정된 복사본(tools/instruction)으로 실행합니다.
         Adds error handling.
         """
         user_input = None
         session_id = ctx.session.id if ctx.session else None
+        if session_id:
+            # 코드 실행 도구는 ToolContext.state에서 이 키로 대화별 인터프리터 상태를 찾음
+            ctx.session.state[SANDBOX_SESSION_STATE_KEY] = session_id
+        request_context = RequestContext(session_id=session_id)
         final_response_message = "Error: An unexpected error occurred." # Default error message
-        original_tools = None
-        original_instruction = None
-        sub_agent_to_restore = None # Use a different variable to track which agent needs restoration
 
         try:
             # Extract user input
             if ctx.user_content and hasattr(ctx.user_content, 'parts') and ctx.user_content.parts:
                 if hasattr(ctx.user_content.parts[0], 'text'):
                     user_input = ctx.user_content.parts[0].text
+            request_context.user_input = user_input
 
             if not user_input:
                 logger.warning("_run_async_impl called without user input text in context.")
                 final_response_message = "Error: Could not get user input from context."
             else:
                 # Process the request to get delegation info or a direct response string
-                result = await self.process_request(user_input, session_id=session_id)
+                result = await self.process_request(user_input, session_id=session_id, request_context=request_context)
 
                 if isinstance(result, dict) and "agent_name" in result:
                     # --- Handle Delegation ---
@@ -380,50 +558,30 @@ class JarvisDispatcher(LlmAgent):
                         logger.error(f"Delegation target agent '{agent_name}' not found in sub_agents.")
                         final_response_message = f"Error: Could not find agent {agent_name} to delegate to."
                     else:
-                        sub_agent = self.sub_agents[agent_name]
-                        sub_agent_to_restore = sub_agent # Mark this agent for potential restoration
-                        original_tools = sub_agent.tools
-                        original_instruction = getattr(sub_agent, 'instruction', None)
-
                         try:
-                            # Temporarily modify sub-agent for the call
                             logger.info(f"Dispatcher delegating to sub-agent: {agent_name}")
-                            # --- Tool Injection Point ---
-                            original_tools = sub_agent.tools # Store original tools
-                            required_tools_from_info = delegation_info["required_tools"]
-                            sub_agent.tools = required_tools_from_info
-                            logger.debug(f"Temporarily injected tools into {agent_name}: {[getattr(t, 'name', 'Unnamed Tool') for t in sub_agent.tools]}")
-                            # --- End Tool Injection ---
-
-                            context_prompt = "\n\n---\nContext:\n"
-                            if delegation_info["conversation_history"]:
-                                context_prompt += f'Conversation History:\n{delegation_info["conversation_history"]}\n'
-                            context_prompt += f'Original Language: {delegation_info["original_language"]}\n---'
-
-                            base_instruction = original_instruction if original_instruction is not None else ""
-                            temp_instruction = base_instruction + context_prompt
-
-                            if hasattr(sub_agent, 'instruction'):
-                                setattr(sub_agent, 'instruction', temp_instruction)
-                                logger.debug(f"Temporarily updated instruction for {agent_name}")
-                            else:
-                                logger.warning(f"Agent {agent_name} does not have an 'instruction' attribute to update.")
-
-                            # Yield the delegation event to the Runner
-                            logger.info(f"Yielding delegation event for {agent_name} to Runner.")
-                            yield Event(
-                                author=self.name,
-                                content=Content(parts=[Part(text=f"[System] Delegating to {agent_name}. Runner should invoke.")])
-                            )
-                            # If delegation event yields successfully, the generator finishes here.
-                            # The runner will handle the actual sub-agent call.
-                            logger.debug(f"Delegation event yielded for {agent_name}. Exiting _run_async_impl generator.")
-                            return # Exit generator
+                            delegated_agent = self._configure_sub_agent(self.sub_agents[agent_name], delegation_info)
+                            request_context.delegated_agent = delegated_agent
+
+                            # Run the per-invocation agent copy here and pass its tool events on to the Runner.
+                            # 하위 에이전트의 최종 텍스트(영어)는 아래 응답 생성 경로에서 원래 언어로 번역/스트리밍됨
+                            delegated_texts: List[str] = []
+                            async for sub_event in delegated_agent.run_async(ctx):
+                                sub_text = _event_text(sub_event)
+                                if sub_text and sub_event.partial:
+                                    continue # 영어 원문 부분 스트림은 번역된 스트림으로 대체
+                                if sub_text and sub_event.is_final_response():
+                                    delegated_texts.append(sub_text)
+                                    if sub_event.actions.state_delta or sub_event.actions.artifact_delta:
+                                        yield sub_event.model_copy(update={"content": None}) # 상태 변경은 유지
+                                    continue
+                                yield sub_event
+                            logger.debug(f"Delegation to {agent_name} finished (request {request_context.request_id}, {request_context.elapsed():.2f}s).")
+                            final_response_message = "\n\n".join(delegated_texts) or f"Error: Agent {agent_name} returned no response."
 
                         except Exception as delegation_prep_error:
-                             logger.error(f"Error during delegation prep or event yield for {agent_name}: {delegation_prep_error}", exc_info=True)
+                             logger.error(f"Error during delegation to {agent_name}: {delegation_prep_error}", exc_info=True)
                              final_response_message = f"Error: Internal error while preparing delegation for agent {agent_name}."
-                             # Fall through to finally block for cleanup, then yield error
 
                 elif isinstance(result, str):
                     # --- Handle Direct Response from process_request (e.g., error, A2A result, fallback) ---
@@ -438,40 +596,31 @@ class JarvisDispatcher(LlmAgent):
             # Catch any unexpected errors in the main try block
             logger.error(f"Unexpected error in _run_async_impl: {outer_e}", exc_info=True)
             final_response_message = "Error: An unexpected error occurred during execution." # Overwrite default error
-        finally:
-            # --- Restore Sub-Agent State ---
-            # This block executes regardless of whether delegation happened or an error occurred within this generator's scope.
-            # CRITICAL NOTE: This restoration happens when *this generator* finishes, which might be *before* the Runner invokes the sub-agent.
-            # The effectiveness of the temporary tool injection relies on the Runner acting immediately on the yielded agent state.
-            if sub_agent_to_restore:
-                try:
-                    # Check if original_tools was actually assigned before attempting restoration
-                    if 'original_tools' in locals() and original_tools is not None:
-                         logger.debug(f"Attempting to restore original tools for {sub_agent_to_restore.name}")
-                         sub_agent_to_restore.tools = original_tools
-                    else:
-                         logger.warning(f"Cannot restore original tools for {sub_agent_to_restore.name}: 'original_tools' not defined in this scope (likely due to early exit or error before assignment).")
-
-                    # Restore instruction similarly
-                    if hasattr(sub_agent_to_restore, 'instruction'):
-                        if 'original_instruction' in locals() and original_instruction is not None:
-                            setattr(sub_agent_to_restore, 'instruction', original_instruction)
-                            logger.debug(f"Restored original instruction for {sub_agent_to_restore.name}")
-                        # else: # No warning needed if instruction wasn't modified
-                except Exception as restore_e:
-                     logger.error(f"Error restoring state for {sub_agent_to_restore.name}: {restore_e}", exc_info=True)
-            # --- End Restore ---
 
         # --- Generate and Yield Final Response/Error Event ---
-        # This section is reached ONLY IF:
-        # 1. Delegation didn't happen (process_request returned string or error).
-        # 2. An error occurred during the try block of _run_async_impl.
+        # final_response_message is one of:
+        # 1. The delegated sub-agent's final (English) answer.
+        # 2. A direct response from process_request (A2A result, fallback or error).
+        # 3. An error from the try block of _run_async_impl.
+        original_language = request_context.original_language # Set by process_request
         final_ai_response_text = "Error: Failed to generate final response." # Fallback
         try:
             logger.info(f"Generating final response/error message: {final_response_message[:100]}...")
-            processed_final_response = await self.response_generator.generate_response(
-                final_response_message, self.current_original_language # Use the language set by process_request
-            )
+            if self.stream_responses:
+                # Yield partial events as chunks (e.g. translated tokens) arrive, then the full text as the final event
+                streamed_chunks: List[str] = []
+                async for chunk in self.response_generator.generate_response_stream(
+                    final_response_message, original_language, request_context=request_context
+                ):
+                    if not chunk:
+                        continue
+                    streamed_chunks.append(chunk)
+                    yield Event(author=self.name, partial=True, content=Content(parts=[Part(text=chunk)]))
+                processed_final_response = "".join(streamed_chunks)
+            else:
+                processed_final_response = await self.response_generator.generate_response(
+                    final_response_message, original_language, request_context=request_context
+                )
             final_ai_response_text = processed_final_response # Store the successfully generated response
 
             # --- Save context BEFORE yielding the final response ---
@@ -481,7 +630,7 @@ class JarvisDispatcher(LlmAgent):
                         session_id=session_id,
                         user_input=user_input, # Use the input extracted at the beginning
                         ai_response=final_ai_response_text,
-                        original_language=self.current_original_language
+                        original_language=original_language
                     )
                 except Exception as cm_e:
                     logger.error(f"Failed to save context for session {session_id}: {cm_e}", exc_info=True)
@@ -500,7 +649,7 @@ class JarvisDispatcher(LlmAgent):
                         session_id=session_id,
                         user_input=user_input,
                         ai_response=final_ai_response_text, # Save the error message as AI response
-                        original_language=self.current_original_language
+                        original_language=original_language
                     )
                 except Exception as cm_e:
                     logger.error(f"Failed to save context (after generation error) for session {session_id}: {cm_e}", exc_info=True)
@@ -508,6 +657,31 @@ class JarvisDispatcher(LlmAgent):
 
             yield Event(author=self.name, content=Content(parts=[Part(text=final_ai_response_text)]))
 
+    def _configure_sub_agent(self, sub_agent: Agent, delegation_info: DelegationInfo) -> Agent:
+        """
+        위임 정보(필요 툴, 대화 이력, 원본 언어)를 반영한 하위 에이전트의 호출 단위 복사본을 생성합니다.
+        공유 인스턴스는 변경하지 않으므로 동시 요청 간 툴/지시문이 섞이지 않습니다.
+        """
+        update: Dict[str, Any] = {"tools": list(delegation_info["required_tools"])}
+
+        context_prompt = "\n\n---\nContext:\n"
+        if delegation_info["conversation_history"]:
+            context_prompt += f'Conversation History:\n{delegation_info["conversation_history"]}\n'
+        context_prompt += f'Original Language: {delegation_info["original_language"]}\n---'
+
+        if hasattr(sub_agent, 'instruction'):
+            base_instruction = getattr(sub_agent, 'instruction', None) or ""
+            update["instruction"] = base_instruction + context_prompt
+        else:
+            logger.warning("Agent %s does not have an 'instruction' attribute to update.", sub_agent.name)
+
+        logger.debug(
+            "Configured per-invocation copy of %s with tools: %s",
+            sub_agent.name,
+            [getattr(t, 'name', 'Unnamed Tool') for t in update['tools']],
+        )
+        return sub_agent.model_copy(update=update)
+
     # --- A2A Discovery and Call Methods ---
     async def _discover_a2a_agents(self, capability: str) -> List[Dict[str, Any]]:
         """Agent Hub에서 주어진 능력을 가진 에이전트를 검색합니다."""
@@ -0,0 +1,367 @@
+# src/jarvis/core/history_backend.py
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_input, ai_response, original_language) — same layout as context_manager.MessageType
+StoredMessage = Tuple[str, str, Optional[str]]
+# (rolling summary or None, turns it covers, turns appended to the session in total); see load_summary
+StoredSummary = Tuple[Optional[str], int, int]
+
+# Write-behind settings for the SQLite backend
+CONTEXT_FLUSH_INTERVAL = float(os.getenv("CONTEXT_FLUSH_INTERVAL", "0.05"))
+CONTEXT_FLUSH_MAX_BATCH = int(os.getenv("CONTEXT_FLUSH_MAX_BATCH", "256"))
+
+_APPEND = "append"
+_DELETE = "delete"
+_SUMMARY = "summary"
+
+
+class HistoryBackend(ABC):
+    """Durable storage for conversation turns behind ContextManager's in-memory session store."""
+
+    @abstractmethod
+    def append(self, session_id: str, message: StoredMessage) -> None:
+        """Stores a turn. May return before the turn is durable (see flush)."""
+
+    @abstractmethod
+    def load(self, session_id: str, limit: int) -> List[StoredMessage]:
+        """Returns the newest `limit` turns of a session, oldest first."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Removes every turn of a session."""
+
+    def save_summary(self, session_id: str, summary: str, summarized_through: int) -> None:
+        """Stores a session's rolling summary of its turns up to number `summarized_through` (1-based, in append order)."""
+
+    def load_summary(self, session_id: str) -> Optional[StoredSummary]:
+        """
+        Returns the session's stored summary and turn numbering, or None if this
+        backend does not keep summaries. Turns are numbered by append order, so
+        `summarized_through` stays meaningful after old turns are trimmed.
+        """
+        return None
+
+    def changed_sessions(self) -> Set[str]:
+        """Sessions modified by other processes since the last call (their cached copies are stale)."""
+        return set()
+
+    def flush(self) -> None:
+        """Blocks until every accepted write is committed."""
+
+    def close(self) -> None:
+        """Flushes and releases resources."""
+
+
+class SQLiteHistoryBackend(HistoryBackend):
+    """
+    Conversation turns in a SQLite database in WAL mode, shareable by several worker processes.
+
+    Writes are queued and committed by a background thread in batches (group commit):
+    one transaction per `flush_interval` or `max_batch` writes. With WAL and
+    synchronous=NORMAL a commit does not fsync; the WAL is synced at checkpoints,
+    so a crash can lose the most recent batches but never corrupts the database.
+    Each session keeps at most `max_turns` rows.
+
+    Queued writes are also kept in a per-session pending buffer that `load` merges
+    with the committed rows, so reads see this process's writes without waiting
+    for the writer thread.
+
+    Rolling summaries live in `session_summaries`, one row per session with the
+    summary, the turn number it covers and the session's total appended turns.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_turns: int = 20,
+        flush_interval: float = CONTEXT_FLUSH_INTERVAL,
+        max_batch: int = CONTEXT_FLUSH_MAX_BATCH,
+    ):
+        self.path = path
+        self.max_turns = max_turns
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.commits = 0
+        self.written = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._read_conn = self._connect()
+        self._read_conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_turns ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, user_input TEXT NOT NULL, "
+            "ai_response TEXT NOT NULL, original_language TEXT, created_at REAL NOT NULL)"
+        )
+        self._read_conn.execute(
+            "CREATE INDEX IF NOT EXISTS conversation_turns_session ON conversation_turns (session_id, id)"
+        )
+        self._read_conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_summaries ("
+            "session_id TEXT PRIMARY KEY, summary TEXT, summarized_through INTEGER NOT NULL DEFAULT 0, "
+            "turn_count INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+        )
+        self._read_lock = threading.Lock()
+        # Change tracking for turns written by other processes
+        self._data_version = self._read_conn.execute("PRAGMA data_version").fetchone()[0]
+        self._watermark = self._read_conn.execute("SELECT COALESCE(MAX(id), 0) FROM conversation_turns").fetchone()[0]
+        self._own_row_ids: Set[int] = set()
+        self._own_lock = threading.Lock()
+        # Queued but uncommitted writes per session, oldest first (None marks a delete).
+        # _commit_lock covers COMMIT plus the matching removal, and a read's buffer
+        # snapshot plus SELECT, so a read never sees a turn twice or not at all.
+        self._pending: Dict[str, List[Optional[StoredMessage]]] = {}
+        self._pending_summaries: Dict[str, Tuple[str, int]] = {}  # queued save_summary calls, newest per session
+        self._pending_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Any]]]" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="context-history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)  # commit the write-behind buffer on interpreter shutdown
+        logger.info(f"SQLiteHistoryBackend opened at {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- writes (write-behind) ---
+
+    def append(self, session_id: str, message: StoredMessage) -> None:
+        if self._closed:
+            logger.error("Cannot store message: history backend is closed.")
+            return
+        with self._pending_lock:
+            self._pending.setdefault(session_id, []).append(message)
+        self._queue.put((_APPEND, session_id, message))
+
+    def delete(self, session_id: str) -> None:
+        if self._closed:
+            return
+        with self._pending_lock:
+            self._pending.setdefault(session_id, []).append(None)
+            self._pending_summaries.pop(session_id, None)
+        self._queue.put((_DELETE, session_id, None))
+
+    def save_summary(self, session_id: str, summary: str, summarized_through: int) -> None:
+        if self._closed:
+            return
+        with self._pending_lock:
+            self._pending_summaries[session_id] = (summary, summarized_through)
+        self._queue.put((_SUMMARY, session_id, (summary, summarized_through)))
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._read_lock:
+            self._read_conn.close()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather more writes until the batch is full or the flush interval elapses
+            while len(batch) < self.max_batch and batch[-1] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+            operations = [operation for operation in batch if operation is not None]
+            try:
+                if operations:
+                    self._commit(conn, operations)
+            except Exception as e:
+                logger.error(f"Failed to persist {len(operations)} conversation writes: {e}", exc_info=True)
+                self._release_pending(operations)  # lost writes are no longer served from the buffer
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, operations: List[Tuple[str, str, Any]]) -> None:
+        now = time.time()
+        row_ids = []
+        touched = set()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for kind, session_id, message in operations:
+                if kind == _APPEND:
+                    cursor = conn.execute(
+                        "INSERT INTO conversation_turns (session_id, user_input, ai_response, original_language, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (session_id, message[0], message[1], message[2], now),
+                    )
+                    row_ids.append(cursor.lastrowid)
+                    touched.add(session_id)
+                    # Sessions stored before summaries existed start from their current row count
+                    conn.execute(
+                        "INSERT INTO session_summaries (session_id, turn_count, updated_at) "
+                        "VALUES (?, (SELECT COUNT(*) FROM conversation_turns WHERE session_id = ?), ?) "
+                        "ON CONFLICT(session_id) DO UPDATE SET turn_count = turn_count + 1, updated_at = excluded.updated_at",
+                        (session_id, session_id, now),
+                    )
+                elif kind == _SUMMARY:
+                    conn.execute(
+                        "INSERT INTO session_summaries (session_id, summary, summarized_through, turn_count, updated_at) "
+                        "VALUES (?, ?, ?, (SELECT COUNT(*) FROM conversation_turns WHERE session_id = ?), ?) "
+                        "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary, "
+                        "summarized_through = excluded.summarized_through, updated_at = excluded.updated_at",
+                        (session_id, message[0], message[1], session_id, now),
+                    )
+                else:
+                    conn.execute("DELETE FROM conversation_turns WHERE session_id = ?", (session_id,))
+                    conn.execute("DELETE FROM session_summaries WHERE session_id = ?", (session_id,))
+                    touched.discard(session_id)
+            if self.max_turns:
+                for session_id in touched:
+                    conn.execute(
+                        "DELETE FROM conversation_turns WHERE session_id = ? AND id <= "
+                        "(SELECT id FROM conversation_turns WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (session_id, session_id, self.max_turns),
+                    )
+            # Registered before COMMIT so changed_sessions() never mistakes them for another process's rows
+            with self._own_lock:
+                self._own_row_ids.update(row_ids)
+            with self._commit_lock:
+                conn.execute("COMMIT")
+                self._release_pending(operations)
+        except Exception:
+            conn.execute("ROLLBACK")
+            with self._own_lock:
+                self._own_row_ids.difference_update(row_ids)
+            raise
+        self.commits += 1
+        self.written += len(operations)
+
+    def _release_pending(self, operations: List[Tuple[str, str, Any]]) -> None:
+        """Drops written (or failed) operations from the front of their sessions' pending buffers."""
+        with self._pending_lock:
+            for kind, session_id, value in operations:
+                if kind == _SUMMARY:
+                    if self._pending_summaries.get(session_id) == value:
+                        del self._pending_summaries[session_id]
+                    continue
+                pending = self._pending.get(session_id)
+                if pending:
+                    pending.pop(0)
+                    if not pending:
+                        del self._pending[session_id]
+
+    # --- reads ---
+
+    def load(self, session_id: str, limit: int) -> List[StoredMessage]:
+        if limit <= 0:
+            return []
+        with self._commit_lock:
+            with self._pending_lock:
+                pending = list(self._pending.get(session_id, ()))
+            if None in pending:
+                # A queued delete hides every earlier turn, committed or not
+                rows = []
+                pending = pending[len(pending) - pending[::-1].index(None):]
+            else:
+                with self._read_lock:
+                    rows = self._read_conn.execute(
+                        "SELECT user_input, ai_response, original_language FROM conversation_turns "
+                        "WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                        (session_id, limit),
+                    ).fetchall()
+        # Read-your-writes: turns still in the write-behind buffer follow the committed ones
+        return ([tuple(row) for row in reversed(rows)] + pending)[-limit:]
+
+    def load_summary(self, session_id: str) -> Optional[StoredSummary]:
+        with self._commit_lock:
+            with self._pending_lock:
+                pending = list(self._pending.get(session_id, ()))
+                pending_summary = self._pending_summaries.get(session_id)
+            row = None
+            if None in pending:
+                # A queued delete resets the session: only turns queued after it count
+                pending = pending[len(pending) - pending[::-1].index(None):]
+            else:
+                with self._read_lock:
+                    row = self._read_conn.execute(
+                        "SELECT summary, summarized_through, turn_count FROM session_summaries WHERE session_id = ?",
+                        (session_id,),
+                    ).fetchone()
+                    if row is None:
+                        count = self._read_conn.execute(
+                            "SELECT COUNT(*) FROM conversation_turns WHERE session_id = ?", (session_id,)
+                        ).fetchone()[0]
+                        row = (None, 0, count)
+        summary, summarized_through, turn_count = row if row is not None else (None, 0, 0)
+        if pending_summary is not None:
+            summary, summarized_through = pending_summary
+        return summary, summarized_through, turn_count + len(pending)
+
+    def changed_sessions(self) -> Set[str]:
+        """
+        Uses PRAGMA data_version (changes when another connection commits) as a
+        cheap check, then lists sessions with new rows not written by this process.
+        """
+        with self._read_lock:
+            data_version = self._read_conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return set()
+            self._data_version = data_version
+            rows = self._read_conn.execute(
+                "SELECT id, session_id FROM conversation_turns WHERE id > ? ORDER BY id", (self._watermark,)
+            ).fetchall()
+        changed = set()
+        with self._own_lock:
+            for row_id, session_id in rows:
+                if row_id in self._own_row_ids:
+                    self._own_row_ids.discard(row_id)
+                else:
+                    changed.add(session_id)
+            if rows:
+                self._watermark = rows[-1][0]
+        return changed
+
+    def stats(self) -> dict:
+        return {"pending_writes": self._queue.unfinished_tasks, "commits": self.commits, "written": self.written}
+
+
+def create_history_backend(backend: str, path: Optional[str] = None, max_turns: int = 20) -> Optional[HistoryBackend]:
+    """
+    Builds a history backend from configuration.
+
+    Args:
+        backend: 'memory' (no persistence) or 'sqlite'.
+        path: SQLite database file (required for 'sqlite').
+        max_turns: Turns kept per session.
+
+    Returns:
+        The backend instance, or None for in-memory only.
+    """
+    backend = (backend or "memory").lower()
+    if backend in ("memory", "none"):
+        return None
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("The 'sqlite' history backend requires a path.")
+        return SQLiteHistoryBackend(path, max_turns=max_turns)
+    raise ValueError(f"Unknown history backend: {backend!r}")
@@ -0,0 +1,253 @@
+# src/jarvis/core/llm_client.py
+import asyncio
+import json
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import google.genai as genai
+from google.genai.types import Content, GenerateContentConfig, HttpOptions
+
+from .rate_limiter import estimate_tokens, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Connection pool / concurrency settings shared by every LLM call site.
+# Per-model concurrency can be overridden with LLM_CONCURRENCY_LIMITS='{"gemini-2.0-flash-exp": 8}'.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP_TIMEOUT_MS = int(os.getenv("LLM_HTTP_TIMEOUT_MS", "0"))  # 0: SDK default
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+
+def _load_concurrency_limits_from_env() -> Dict[str, int]:
+    raw = os.getenv("LLM_CONCURRENCY_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return {model_id: int(limit) for model_id, limit in json.loads(raw).items()}
+    except (ValueError, AttributeError) as e:
+        logger.error(f"Invalid LLM_CONCURRENCY_LIMITS value, using defaults: {e}")
+        return {}
+
+
+def contents_text(contents: List[Content]) -> str:
+    """Concatenates the text parts of `contents` (used for token estimates)."""
+    texts = []
+    for content in contents or []:
+        for part in getattr(content, "parts", None) or []:
+            text = getattr(part, "text", None)
+            if text:
+                texts.append(text)
+    return "\n".join(texts)
+
+
+class _ModelSlots:
+    """Bounded concurrency and in-flight counters for one model."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.waited = 0
+        # asyncio primitives are bound to the loop they are first used on; keep one per loop.
+        self._semaphores: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        entry = self._semaphores.get(id(loop))
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(self.limit))
+            self._semaphores = {key: value for key, value in self._semaphores.items() if not value[0].is_closed()}
+            self._semaphores[id(loop)] = entry
+        return entry[1]
+
+
+class LLMClientRegistry:
+    """
+    Process-wide owner of the genai.Client used by every LLM call site.
+
+    The client is created lazily on first use and reused, so its pooled
+    keep-alive connections (and TLS sessions) are shared by the dispatcher,
+    input parser and tools. Calls made through `generate_content` are also
+    bounded per model and go through the shared rate limiter.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        concurrency_limits: Optional[Dict[str, int]] = None,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+        timeout_ms: int = LLM_HTTP_TIMEOUT_MS,
+    ):
+        self._api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.concurrency_limits = concurrency_limits if concurrency_limits is not None else _load_concurrency_limits_from_env()
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout_ms = timeout_ms
+        self._client: Optional[genai.Client] = None
+        self._client_failed = False
+        self._slots: Dict[str, _ModelSlots] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or os.getenv("GEMINI_API_KEY")
+
+    def is_available(self) -> bool:
+        """True if a client exists or can be created (an API key is configured)."""
+        return self._client is not None or bool(self.api_key)
+
+    def _build_http_options(self) -> Optional[HttpOptions]:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        options: Dict[str, Any] = {"client_args": {"limits": limits}, "async_client_args": {"limits": limits}}
+        if self.timeout_ms > 0:
+            options["timeout"] = self.timeout_ms
+        try:
+            return HttpOptions(**options)
+        except Exception as e:
+            # Older SDKs do not accept client_args; fall back to their default pooling.
+            logger.warning(f"HttpOptions does not support connection pool settings ({e}). Using SDK defaults.")
+            return HttpOptions(timeout=self.timeout_ms) if self.timeout_ms > 0 else None
+
+    def get_client(self) -> Optional[genai.Client]:
+        """Returns the shared client, creating it on first use. None if no API key or creation failed."""
+        if self._client is not None or self._client_failed:
+            return self._client
+        with self._lock:
+            if self._client is None and not self._client_failed:
+                api_key = self.api_key
+                if not api_key:
+                    logger.warning("GEMINI_API_KEY not found. Shared LLM client is not available.")
+                    return None
+                try:
+                    self._client = genai.Client(api_key=api_key, http_options=self._build_http_options())
+                    logger.info("Initialized shared genai.Client with pooled keep-alive connections.")
+                except Exception as e:
+                    logger.error(f"Failed to initialize shared genai.Client: {e}")
+                    self._client_failed = True
+        return self._client
+
+    def set_client(self, client: Optional[genai.Client]) -> None:
+        """Replaces the shared client (e.g. a preconfigured or mock client)."""
+        with self._lock:
+            self._client = client
+            self._client_failed = False
+
+    def _model_slots(self, model_id: str) -> _ModelSlots:
+        with self._lock:
+            slots = self._slots.get(model_id)
+            if slots is None:
+                slots = _ModelSlots(self.concurrency_limits.get(model_id, self.max_concurrency))
+                self._slots[model_id] = slots
+            return slots
+
+    @asynccontextmanager
+    async def slot(self, model_id: str) -> AsyncIterator[None]:
+        """Holds one of the model's concurrency slots for the duration of a call."""
+        slots = self._model_slots(model_id)
+        semaphore = slots.semaphore()
+        if semaphore.locked():
+            slots.waited += 1
+        async with semaphore:
+            slots.in_flight += 1
+            slots.calls += 1
+            slots.peak_in_flight = max(slots.peak_in_flight, slots.in_flight)
+            try:
+                yield
+            finally:
+                slots.in_flight -= 1
+
+    async def generate_content(
+        self,
+        model_id: str,
+        contents: List[Content],
+        config: Optional[GenerateContentConfig] = None,
+        client: Optional[genai.Client] = None,
+    ) -> Any:
+        """
+        Calls `client.aio.models.generate_content` within the model's concurrency
+        bound and rate limits. Uses the shared client unless `client` is given.
+        Raises RuntimeError if no client is available; API errors propagate.
+        """
+        client = client or self.get_client()
+        if client is None:
+            raise RuntimeError("LLM client is not available (GEMINI_API_KEY missing or client initialization failed).")
+        rate_limiter = get_rate_limiter()
+        estimated_tokens = estimate_tokens(contents_text(contents))
+        async with self.slot(model_id):
+            await rate_limiter.acquire(model_id, estimated_tokens)
+            response = await client.aio.models.generate_content(model=model_id, contents=contents, config=config)
+        rate_limiter.record_usage(model_id, estimated_tokens, response)
+        return response
+
+    async def generate_content_stream(
+        self,
+        model_id: str,
+        contents: List[Content],
+        config: Optional[GenerateContentConfig] = None,
+        client: Optional[genai.Client] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of `generate_content`: yields text chunks as the
+        model produces them. The concurrency slot is held until the stream ends.
+        """
+        client = client or self.get_client()
+        if client is None:
+            raise RuntimeError("LLM client is not available (GEMINI_API_KEY missing or client initialization failed).")
+        rate_limiter = get_rate_limiter()
+        estimated_tokens = estimate_tokens(contents_text(contents))
+        last_chunk = None
+        async with self.slot(model_id):
+            await rate_limiter.acquire(model_id, estimated_tokens)
+            stream = await client.aio.models.generate_content_stream(model=model_id, contents=contents, config=config)
+            async for chunk in stream:
+                last_chunk = chunk
+                text = getattr(chunk, "text", None)
+                if text:
+                    yield text
+        if last_chunk is not None:
+            # Usage metadata is cumulative; the last chunk carries the totals.
+            rate_limiter.record_usage(model_id, estimated_tokens, last_chunk)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-model concurrency counters."""
+        with self._lock:
+            return {
+                model_id: {
+                    "limit": slots.limit,
+                    "in_flight": slots.in_flight,
+                    "peak_in_flight": slots.peak_in_flight,
+                    "calls": slots.calls,
+                    "waited": slots.waited,
+                }
+                for model_id, slots in self._slots.items()
+            }
+
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_llm_client_registry() -> LLMClientRegistry:
+    """Returns the process-wide LLMClientRegistry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry()
+    return _registry
@@ -0,0 +1,178 @@
+# src/jarvis/core/rate_limiter.py
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default per-model quotas. Override globally via env vars, or per model with
+# LLM_RATE_LIMITS='{"gemini-1.5-flash-latest": {"rpm": 15, "tpm": 1000000}}'.
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Cheap token estimate (~4 characters per token) used for TPM accounting."""
+    if not text:
+        return 1
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `capacity` tokens per minute.
+    A non-positive limit disables the bucket (never waits).
+    Not thread-safe on its own; ModelRateLimiter guards access with a lock.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.refill_rate = self.capacity / 60.0  # tokens per second
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        if self.refill_rate <= 0:
+            return 0.0
+        self._refill(now)
+        # Requests larger than the bucket can never fit; only wait for a full bucket.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float):
+        # May go negative (debt) when actual usage exceeds the estimate.
+        self.tokens -= amount
+
+
+class ModelRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for a single model."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self.total_wait_seconds = 0.0
+        self.throttled_requests = 0
+
+    def _try_reserve(self, estimated_tokens: int) -> float:
+        """Reserves quota if available and returns 0, otherwise returns the time to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+            if wait <= 0:
+                self.requests.consume(1)
+                self.tokens.consume(min(estimated_tokens, self.tokens.capacity))
+            return wait
+
+    async def acquire(self, estimated_tokens: int = 1):
+        """Waits only while the model's quota is actually exhausted."""
+        throttled = False
+        while True:
+            wait = self._try_reserve(estimated_tokens)
+            if wait <= 0:
+                return
+            if not throttled:
+                throttled = True
+                self.throttled_requests += 1
+            self.total_wait_seconds += wait
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Charges the difference when the real token count exceeds the estimate."""
+        if actual_tokens > estimated_tokens:
+            with self._lock:
+                self.tokens.consume(actual_tokens - estimated_tokens)
+
+
+class LLMRateLimiter:
+    """
+    Process-wide registry of per-model rate limiters.
+    Shared by every LLM call site so concurrent sessions draw from the same quota.
+    """
+
+    def __init__(self, default_rpm: float = DEFAULT_REQUESTS_PER_MINUTE, default_tpm: float = DEFAULT_TOKENS_PER_MINUTE):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self._limits: Dict[str, Tuple[float, float]] = self._load_limits_from_env()
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_limits_from_env() -> Dict[str, Tuple[float, float]]:
+        raw = os.getenv("LLM_RATE_LIMITS")
+        if not raw:
+            return {}
+        try:
+            config = json.loads(raw)
+            return {
+                model_id: (float(limits.get("rpm", DEFAULT_REQUESTS_PER_MINUTE)), float(limits.get("tpm", DEFAULT_TOKENS_PER_MINUTE)))
+                for model_id, limits in config.items()
+            }
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Invalid LLM_RATE_LIMITS value, using defaults: {e}")
+            return {}
+
+    def set_limits(self, model_id: str, requests_per_minute: float, tokens_per_minute: float):
+        """Sets (or replaces) the quota for a model."""
+        with self._lock:
+            self._limits[model_id] = (requests_per_minute, tokens_per_minute)
+            self._limiters.pop(model_id, None)
+        logger.info(f"Rate limits for {model_id}: {requests_per_minute} RPM, {tokens_per_minute} TPM")
+
+    def get_limiter(self, model_id: str) -> ModelRateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(model_id)
+            if limiter is None:
+                rpm, tpm = self._limits.get(model_id, (self.default_rpm, self.default_tpm))
+                limiter = ModelRateLimiter(rpm, tpm)
+                self._limiters[model_id] = limiter
+            return limiter
+
+    async def acquire(self, model_id: str, estimated_tokens: int = 1):
+        """Waits until a request of `estimated_tokens` may be sent to `model_id`."""
+        await self.get_limiter(model_id).acquire(estimated_tokens)
+
+    def record_usage(self, model_id: str, estimated_tokens: int, response) -> None:
+        """Reconciles the estimate with the response's usage metadata, if present."""
+        usage = getattr(response, "usage_metadata", None)
+        actual_tokens = getattr(usage, "total_token_count", None) if usage else None
+        if isinstance(actual_tokens, int):
+            self.get_limiter(model_id).record_usage(estimated_tokens, actual_tokens)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-model throttling counters."""
+        with self._lock:
+            return {
+                model_id: {
+                    "throttled_requests": limiter.throttled_requests,
+                    "total_wait_seconds": round(limiter.total_wait_seconds, 3),
+                }
+                for model_id, limiter in self._limiters.items()
+            }
+
+
+_rate_limiter: Optional[LLMRateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> LLMRateLimiter:
+    """Returns the process-wide LLMRateLimiter, creating it on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = LLMRateLimiter()
+    return _rate_limiter
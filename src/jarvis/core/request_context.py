@@ -0,0 +1,33 @@
+# src/jarvis/core/request_context.py
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from ..models.input import ParsedInput
+
+
+@dataclass
+class RequestContext:
+    """
+    State for a single request, threaded through JarvisDispatcher.process_request,
+    _run_async_impl and ResponseGenerator instead of being stored on the shared
+    dispatcher, so one dispatcher can serve many requests concurrently.
+    """
+
+    user_input: Optional[str] = None
+    session_id: Optional[str] = None
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    parsed_input: Optional[ParsedInput] = None
+    original_language: Optional[str] = None
+    routing_decision: Optional[str] = None
+    delegated_agent: Optional[Any] = None  # per-invocation copy of the sub-agent
+    started_at: float = field(default_factory=time.monotonic)
+
+    def set_parsed_input(self, parsed_input: ParsedInput) -> None:
+        self.parsed_input = parsed_input
+        self.original_language = parsed_input.original_language
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.monotonic() - self.started_at
@@ -0,0 +1,366 @@
+# src/jarvis/core/routing.py
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.input import ParsedInput
+from .cache import LRUCache, hash_key
+
+logger = logging.getLogger(__name__)
+
+NO_AGENT = "NO_AGENT"
+
+ROUTING_CACHE_MAX_SIZE = int(os.getenv("ROUTING_CACHE_MAX_SIZE", "1024"))
+ROUTING_CACHE_TTL = float(os.getenv("ROUTING_CACHE_TTL", "0")) or None
+ROUTING_CACHE_USE_TEXT_FINGERPRINT = os.getenv("ROUTING_CACHE_USE_TEXT_FINGERPRINT", "false").lower() == "true"
+
+
+def text_fingerprint(text: str) -> str:
+    """Order-insensitive fingerprint of the lower-cased word set of a text."""
+    words = sorted(set(text.casefold().split()))
+    return hash_key(*words)
+
+
+class RoutingCache:
+    """
+    Caches delegation decisions (agent name or NO_AGENT) keyed on the parsed
+    intent and domain, optionally narrowed by a fingerprint of the English text.
+
+    Entries are tagged with a generation number; invalidate() bumps the
+    generation so decisions made for a previous set of agents are never reused.
+    """
+
+    def __init__(
+        self,
+        max_size: int = ROUTING_CACHE_MAX_SIZE,
+        ttl: Optional[float] = ROUTING_CACHE_TTL,
+        use_text_fingerprint: bool = ROUTING_CACHE_USE_TEXT_FINGERPRINT,
+    ):
+        self._cache = LRUCache(max_size=max_size, default_ttl=ttl)
+        self.use_text_fingerprint = use_text_fingerprint
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """Current generation; capture it when a routing decision starts and pass it to set()."""
+        with self._lock:
+            return self._generation
+
+    def key_for(self, parsed_input: ParsedInput, generation: Optional[int] = None) -> Optional[str]:
+        """Returns the cache key (for `generation`, default the current one), or None if the input cannot be routed from cache."""
+        intent = (parsed_input.intent or "").strip().lower()
+        domain = (parsed_input.domain or "").strip().lower()
+        fingerprint = text_fingerprint(parsed_input.english_text) if self.use_text_fingerprint else ""
+        if not fingerprint and not (intent and domain):
+            return None
+        if generation is None:
+            generation = self.generation
+        return hash_key("route", generation, intent, domain, fingerprint)
+
+    def get(self, parsed_input: ParsedInput) -> Optional[str]:
+        key = self.key_for(parsed_input)
+        if key is None:
+            return None
+        decision = self._cache.get(key)
+        if decision is not None:
+            logger.debug(f"Routing cache hit: ({parsed_input.intent}, {parsed_input.domain}) -> {decision}")
+        return decision
+
+    def set(self, parsed_input: ParsedInput, decision: str, generation: Optional[int] = None) -> None:
+        """
+        Stores a decision. With `generation` (captured when the decision started),
+        the decision is discarded if invalidate() ran in between, since it may name
+        an agent that is gone or miss one that was added.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                logger.debug(f"Discarding routing decision '{decision}' made for generation {generation} (now {self._generation}).")
+                return
+            key = self.key_for(parsed_input, self._generation)
+            if key is not None:
+                self._cache.set(key, decision)
+
+    def invalidate(self) -> None:
+        """Drops every cached decision (called whenever the agent set changes)."""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+            generation = self._generation
+        logger.info(f"Routing cache invalidated (generation {generation}).")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._cache), "generation": self.generation, **self._cache.stats.as_dict()}
+
+
+# --- Embedding-based local router ---
+
+ROUTING_STRATEGY_LLM = "llm"
+ROUTING_STRATEGY_EMBEDDING = "embedding"
+ROUTING_STRATEGY = os.getenv("ROUTING_STRATEGY", ROUTING_STRATEGY_LLM)
+EMBEDDING_ROUTER_THRESHOLD = float(os.getenv("EMBEDDING_ROUTER_THRESHOLD", "0.30"))
+EMBEDDING_ROUTER_MIN_MARGIN = float(os.getenv("EMBEDDING_ROUTER_MIN_MARGIN", "0.12"))
+AGENT_CARDS_DIR = os.getenv(
+    "AGENT_CARDS_DIR",
+    str(Path(__file__).resolve().parents[3] / "config" / "agent_cards"),
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z])(?=[A-Z])|_")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or please "
+    "the this to was what when where which who why will with you your".split()
+)
+
+SparseVector = Dict[str, float]
+
+
+def _features(text: str) -> Dict[str, int]:
+    """Word unigrams plus character trigrams (prefixed) of a text."""
+    counts: Dict[str, int] = {}
+    for word in _WORD_RE.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        counts[word] = counts.get(word, 0) + 1
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            gram = "3:" + padded[i:i + 3]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def _cosine(a: SparseVector, b: SparseVector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+
+
+class EmbeddingRouter:
+    """
+    Routes requests by nearest-neighbour similarity between the English request
+    and precomputed vectors of each agent's description, skills and examples.
+
+    Vectors are TF-IDF weighted word and character-trigram features, so routing
+    is CPU-only, deterministic and needs no model call. Returns None when the
+    best match is below `threshold` or not clearly ahead of the runner-up, so the
+    caller can fall back to the LLM.
+    """
+
+    def __init__(
+        self,
+        threshold: float = EMBEDDING_ROUTER_THRESHOLD,
+        min_margin: float = EMBEDDING_ROUTER_MIN_MARGIN,
+        cards_dir: Optional[str] = AGENT_CARDS_DIR,
+    ):
+        self.threshold = threshold
+        self.min_margin = min_margin
+        self.cards_dir = cards_dir
+        self._prototypes: List[Tuple[str, SparseVector]] = []
+        self._idf: Dict[str, float] = {}
+        self._default_idf = 1.0
+        self._built = False
+        self._lock = threading.Lock()
+
+    def _load_cards(self) -> Dict[str, Dict[str, Any]]:
+        cards: Dict[str, Dict[str, Any]] = {}
+        if not self.cards_dir or not os.path.isdir(self.cards_dir):
+            return cards
+        for file_name in sorted(os.listdir(self.cards_dir)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.cards_dir, file_name), encoding="utf-8") as f:
+                    card = json.load(f)
+                if card.get("name"):
+                    cards[card["name"]] = card
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not load agent card {file_name}: {e}")
+        return cards
+
+    @staticmethod
+    def _agent_texts(name: str, agent: Any, card: Optional[Dict[str, Any]]) -> List[str]:
+        """Texts describing an agent; each becomes one prototype vector."""
+        texts = [" ".join(_CAMEL_RE.split(name)) + " " + (getattr(agent, "description", "") or "")]
+        if card:
+            texts.append(card.get("description") or "")
+            for skill in card.get("skills", []):
+                texts.append(" ".join([skill.get("name", ""), skill.get("description", ""), " ".join(skill.get("tags", []))]))
+                texts.extend(skill.get("examples", []))
+        return [text for text in texts if text.strip()]
+
+    def build(self, agents: Dict[str, Any]) -> None:
+        """Precomputes prototype vectors for the given agents (name -> agent)."""
+        cards = self._load_cards()
+        raw: List[Tuple[str, Dict[str, int]]] = []
+        for name, agent in agents.items():
+            for text in self._agent_texts(name, agent, cards.get(name)):
+                raw.append((name, _features(text)))
+
+        document_frequency: Dict[str, int] = {}
+        for _, counts in raw:
+            for feature in counts:
+                document_frequency[feature] = document_frequency.get(feature, 0) + 1
+        total = len(raw) or 1
+        idf = {feature: math.log((1 + total) / (1 + df)) + 1.0 for feature, df in document_frequency.items()}
+        default_idf = math.log(1 + total) + 1.0  # unseen features
+
+        prototypes = [(name, self._vectorize(counts, idf, default_idf)) for name, counts in raw]
+        with self._lock:
+            self._idf = idf
+            self._default_idf = default_idf
+            self._prototypes = [(name, vector) for name, vector in prototypes if vector]
+            self._built = True
+        logger.info(f"EmbeddingRouter built {len(self._prototypes)} prototypes for agents: {list(agents)}")
+
+    @staticmethod
+    def _vectorize(counts: Dict[str, int], idf: Dict[str, float], default_idf: float) -> SparseVector:
+        vector = {
+            feature: (1.0 + math.log(count)) * idf.get(feature, default_idf) * (0.5 if feature.startswith("3:") else 1.0)
+            for feature, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {feature: weight / norm for feature, weight in vector.items()} if norm else {}
+
+    def invalidate(self) -> None:
+        """Marks the prototypes stale so the owner rebuilds them before the next lookup."""
+        with self._lock:
+            self._built = False
+
+    @property
+    def is_built(self) -> bool:
+        return self._built
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Best similarity per agent for the given text."""
+        query = self._vectorize(_features(text), self._idf, self._default_idf)
+        best: Dict[str, float] = {}
+        for name, prototype in self._prototypes:
+            score = _cosine(query, prototype)
+            if score > best.get(name, 0.0):
+                best[name] = score
+        return best
+
+    def route(self, text: str) -> Tuple[Optional[str], float]:
+        """Returns (agent_name, score), or (None, score) if not confident enough."""
+        ranked = sorted(self.scores(text).items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None, 0.0
+        best_name, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best_score >= self.threshold and best_score - runner_up >= self.min_margin:
+            return best_name, best_score
+        return None, best_score
+
+
+# --- Declarative intent routing table ---
+
+ROUTING_TABLE_PATH = os.getenv(
+    "ROUTING_TABLE_PATH",
+    str(Path(__file__).resolve().parents[3] / "config" / "routing_table.json"),
+)
+ROUTING_TABLE_RELOAD_INTERVAL = float(os.getenv("ROUTING_TABLE_RELOAD_INTERVAL", "5"))
+
+
+class IntentRoutingTable:
+    """
+    Ordered intent/domain -> agent rules loaded from a JSON file.
+
+    Each rule may specify 'intent' and/or 'domain' (omitted fields match
+    anything) and the target 'agent' (or NO_AGENT). The first matching rule
+    wins. The file is re-read when its modification time changes, checked at
+    most every `reload_interval` seconds, so rules can be edited without a restart.
+    """
+
+    def __init__(self, path: Optional[str] = ROUTING_TABLE_PATH, reload_interval: float = ROUTING_TABLE_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._rules: List[Dict[str, Optional[str]]] = []
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.resolved = 0
+        self.reloads = 0
+        self._maybe_reload(force=True)
+
+    @staticmethod
+    def _normalize(value: Optional[str]) -> Optional[str]:
+        return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+    def load_rules(self, rules: List[Dict[str, Any]]) -> None:
+        """Replaces the rule set (used by file reloads and for programmatic configuration)."""
+        parsed: List[Dict[str, Optional[str]]] = []
+        for rule in rules:
+            agent = rule.get("agent")
+            intent = self._normalize(rule.get("intent"))
+            domain = self._normalize(rule.get("domain"))
+            if not agent or not (intent or domain):
+                logger.warning(f"Ignoring invalid routing rule: {rule}")
+                continue
+            parsed.append({"intent": intent, "domain": domain, "agent": agent})
+        with self._lock:
+            self._rules = parsed
+        logger.info(f"Intent routing table loaded with {len(parsed)} rules.")
+
+    def _maybe_reload(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        if not self.path:
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if self._mtime is not None:
+                logger.warning(f"Routing table {self.path} disappeared. Keeping the last loaded rules.")
+            return
+        if not force and mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                config = json.load(f)
+            self.load_rules(config.get("rules", []))
+            self._mtime = mtime
+            self.reloads += 1
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Failed to load routing table {self.path}: {e}. Keeping the previous rules.")
+
+    def resolve(self, parsed_input: ParsedInput, available_agents: Any) -> Optional[str]:
+        """
+        Returns the agent name (or NO_AGENT) for the parsed input, or None if no
+        rule matches or the matched agent is not among `available_agents`.
+        """
+        self._maybe_reload()
+        self.lookups += 1
+        intent = self._normalize(parsed_input.intent)
+        domain = self._normalize(parsed_input.domain)
+        with self._lock:
+            rules = self._rules
+        for rule in rules:
+            if rule["intent"] and rule["intent"] != intent:
+                continue
+            if rule["domain"] and rule["domain"] != domain:
+                continue
+            agent = rule["agent"]
+            if agent != NO_AGENT and agent not in available_agents:
+                logger.warning(f"Routing rule targets unregistered agent '{agent}'. Skipping.")
+                continue
+            self.resolved += 1
+            return agent
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rules": len(self._rules),
+            "lookups": self.lookups,
+            "resolved": self.resolved,
+            "resolution_rate": round(self.resolved / self.lookups, 4) if self.lookups else 0.0,
+            "reloads": self.reloads,
+        }
@@ -0,0 +1,499 @@
+# src/jarvis/core/sandbox_worker.py
+"""
+Worker side of the restricted code sandbox (see tools/sandbox.py for the pool).
+
+This module is preloaded into the sandbox fork server, so it imports only the
+standard library and RestrictedPython: nothing from the rest of the jarvis
+package (ADK, model clients, the dispatcher) ends up in the worker processes.
+"""
+import contextlib
+import io
+import operator
+import os
+import re
+import reprlib
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+import warnings
+from collections import OrderedDict
+from types import BuiltinFunctionType, CodeType, FunctionType, ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from RestrictedPython import PrintCollector, compile_restricted, safe_builtins, utility_builtins
+from RestrictedPython.Eval import default_guarded_getitem, default_guarded_getiter
+from RestrictedPython.Guards import full_write_guard, guarded_iter_unpack_sequence, guarded_unpack_sequence, safer_getattr
+
+try:
+    import resource  # POSIX only: CPU and address-space limits for the workers
+except ImportError:  # pragma: no cover - e.g. Windows
+    resource = None
+
+# Structured result limits
+SANDBOX_MAX_STDOUT_CHARS = int(os.getenv("SANDBOX_MAX_STDOUT_CHARS", "10000"))
+SANDBOX_MAX_VARIABLES = int(os.getenv("SANDBOX_MAX_VARIABLES", "20"))
+SANDBOX_VARIABLE_MAX_CHARS = int(os.getenv("SANDBOX_VARIABLE_MAX_CHARS", "200"))
+
+# Printed text is sent to the parent in batches of this size / age while the code runs
+_STDOUT_FLUSH_CHARS = 1024
+_STDOUT_FLUSH_INTERVAL = 0.1
+
+# Exit code of a worker that ran out of memory outside the user's code
+MEMORY_EXIT_CODE = 75
+
+# Structured outcome of one execution (see make_result)
+SandboxResult = Dict[str, Any]
+OutputCallback = Callable[[str], None]
+
+_RESTRICTED_LINE = re.compile(r"Line (\d+):")
+_INPLACE_OPERATORS = {
+    "+=": operator.iadd, "-=": operator.isub, "*=": operator.imul, "/=": operator.itruediv,
+    "//=": operator.ifloordiv, "%=": operator.imod, "**=": operator.ipow, "@=": operator.imatmul,
+    "<<=": operator.ilshift, ">>=": operator.irshift, "&=": operator.iand, "^=": operator.ixor, "|=": operator.ior,
+}
+_UNREPORTED_TYPES = (ModuleType, FunctionType, BuiltinFunctionType, type)
+_MAX_SIZED_OBJECTS = 1_000_000  # objects visited when measuring a session's variables
+
+
+def make_result(
+    status: str,
+    stdout: str = "",
+    stdout_truncated: bool = False,
+    variables: Optional[Dict[str, str]] = None,
+    variables_truncated: bool = False,
+    error: Optional[Dict[str, Any]] = None,
+    stderr: str = "",
+    execution_time_ms: float = 0.0,
+    peak_memory_bytes: int = 0,
+    session: Optional[Dict[str, Any]] = None,
+) -> SandboxResult:
+    """
+    Builds the result dict returned for every execution ('success' or 'error').
+    `session` is set for session-scoped runs: {"id", "new", "memory_bytes", "evicted"}.
+    """
+    return {
+        "status": status,
+        "stdout": stdout,
+        "stdout_truncated": stdout_truncated,
+        "variables": variables or {},
+        "variables_truncated": variables_truncated,
+        "error": error,
+        "stderr": stderr,
+        "execution_time_ms": execution_time_ms,
+        "peak_memory_bytes": peak_memory_bytes,
+        "session": session,
+    }
+
+
+def error_result(error_type: str, message: str, stdout: str = "", execution_time_ms: float = 0.0) -> SandboxResult:
+    """Result for failures outside the user's code (timeouts, crashed workers)."""
+    error = {"type": error_type, "message": message, "line": None, "traceback": ""}
+    return make_result("error", stdout=stdout, error=error, execution_time_ms=execution_time_ms)
+
+
+def _error_line(e: BaseException) -> Optional[int]:
+    """Line of the user's code where `e` was raised (or the compile error was found)."""
+    if isinstance(e, SyntaxError):
+        if e.lineno:
+            return e.lineno
+        match = _RESTRICTED_LINE.search(str(e))  # RestrictedPython reports "Line N: ..." messages
+        return int(match.group(1)) if match else None
+    for frame in reversed(traceback.extract_tb(e.__traceback__)):
+        if frame.filename == '<string>':
+            return frame.lineno
+    return None
+
+
+def _exception_info(e: BaseException) -> Dict[str, Any]:
+    return {"type": type(e).__name__, "message": str(e), "line": _error_line(e), "traceback": traceback.format_exc()}
+
+
+def _user_variable_names(namespace: Dict[str, Any]) -> List[str]:
+    """Public data variables of `namespace`: no modules, functions, classes or untouched sandbox globals."""
+    return [
+        name for name, value in namespace.items()
+        if not name.startswith('_')
+        and not isinstance(value, _UNREPORTED_TYPES)
+        and not (name in _BASE_GLOBALS and _BASE_GLOBALS[name] is value)
+    ]
+
+
+def capture_variables(
+    namespace: Dict[str, Any],
+    max_variables: int = SANDBOX_MAX_VARIABLES,
+    max_chars: int = SANDBOX_VARIABLE_MAX_CHARS,
+) -> Tuple[Dict[str, str], bool]:
+    """
+    Size-capped reprs of the public data variables in `namespace` (modules,
+    functions and classes are skipped). Returns (variables, truncated).
+    """
+    short_repr = reprlib.Repr()
+    short_repr.maxstring = short_repr.maxother = max_chars
+    variables: Dict[str, str] = {}
+    names = _user_variable_names(namespace)
+    for name in names[:max_variables]:
+        try:
+            text = short_repr.repr(namespace[name])
+        except Exception as e:
+            text = f"<unrepresentable {type(namespace[name]).__name__}: {e}>"
+        variables[name] = text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+    return variables, len(names) > max_variables
+
+
+class OutputSink:
+    """
+    Receives everything the restricted code prints and keeps up to `max_chars`.
+    With `emit`, pending text is also forwarded in batches while the code runs:
+    by a write once a batch is full, and by the worker's StdoutFlusher so output
+    before a long silent computation is not held back.
+    """
+
+    def __init__(self, emit: Optional[OutputCallback] = None, max_chars: int = SANDBOX_MAX_STDOUT_CHARS):
+        self.emit = emit
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self.truncated = False
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> None:
+        if self.size >= self.max_chars:
+            self.truncated = self.truncated or bool(text)
+            return
+        if self.size + len(text) > self.max_chars:
+            text = text[:self.max_chars - self.size]
+            self.truncated = True
+        self.parts.append(text)
+        self.size += len(text)
+        if self.emit is not None:
+            with self._lock:
+                self._pending.append(text)
+                self._pending_size += len(text)
+            if self._pending_size >= _STDOUT_FLUSH_CHARS:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self.emit is None or not self._pending:
+                return
+            text = "".join(self._pending)
+            self._pending = []
+            self._pending_size = 0
+            self.emit(text)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+
+class StdoutFlusher:
+    """
+    One background thread per worker that flushes the running execution's
+    OutputSink every `_STDOUT_FLUSH_INTERVAL`. It is started once, before the
+    worker's address-space limit is set: a thread started under RLIMIT_AS may
+    not get its stack and malloc arena, which would kill the worker.
+    """
+
+    def __init__(self):
+        self._sink: Optional[OutputSink] = None
+        self._thread = threading.Thread(target=self._run, name="sandbox-stdout", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def attach(self, sink: Optional[OutputSink]) -> None:
+        """Sets the sink to flush (None while no code is running)."""
+        self._sink = sink
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(_STDOUT_FLUSH_INTERVAL)
+            sink = self._sink
+            if sink is not None:
+                sink.flush()
+
+
+class StreamingPrintCollector(PrintCollector):
+    """RestrictedPython's print collector that also forwards printed text to an OutputSink."""
+
+    def __init__(self, sink: OutputSink, _getattr_=None):
+        super().__init__(_getattr_)
+        self._sink = sink
+
+    def write(self, text: str) -> None:
+        super().write(text)  # kept for the `printed` variable
+        self._sink.write(text)
+
+
+def _address_space_bytes() -> int:
+    """Current virtual memory size of this process (Linux), 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _limit_memory(memory_bytes: int) -> None:
+    """Caps the worker's address space at its current size plus `memory_bytes`."""
+    if resource is None or not memory_bytes:
+        return
+    limit = _address_space_bytes() + memory_bytes
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _limit_cpu(cpu_seconds: int) -> None:
+    """
+    Moves the soft RLIMIT_CPU to `cpu_seconds` past the CPU time used so far.
+    The kernel sends SIGXCPU when it is crossed, which terminates the worker.
+    """
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def compile_restricted_code(code: str) -> Union[CodeType, SandboxResult]:
+    """
+    Compiles `code` with RestrictedPython (the expensive AST transform).
+    Returns the code object, or an error result if compilation fails.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", SyntaxWarning)  # e.g. "Prints, but never reads 'printed'"
+            return compile_restricted(code, filename='<string>', mode='exec')
+    except Exception as e:
+        return make_result("error", error=_exception_info(e))
+
+
+def _inplacevar_(op: str, x: Any, y: Any) -> Any:
+    """Augmented assignment (`x += y`) hook required by RestrictedPython."""
+    return _INPLACE_OPERATORS[op](x, y)
+
+
+def restricted_globals() -> Dict[str, Any]:
+    """Globals for restricted code: safe builtins and RestrictedPython's guards (`_print_` is set per run)."""
+    return {
+        "__builtins__": safe_builtins.copy(),
+        **utility_builtins,
+        "_getattr_": safer_getattr,
+        "_getitem_": default_guarded_getitem,
+        "_getiter_": default_guarded_getiter,
+        "_iter_unpack_sequence_": guarded_iter_unpack_sequence,
+        "_unpack_sequence_": guarded_unpack_sequence,
+        "_write_": full_write_guard,
+        "_inplacevar_": _inplacevar_,
+    }
+
+
+_BASE_GLOBALS = restricted_globals()
+
+
+def namespace_size(namespace: Dict[str, Any], max_objects: int = _MAX_SIZED_OBJECTS) -> int:
+    """
+    Approximate memory held by the user variables of `namespace`: sys.getsizeof
+    summed over the objects reachable through containers and instance __dict__s.
+    Stops counting after `max_objects` objects.
+    """
+    seen = set()
+    stack = [namespace[name] for name in _user_variable_names(namespace)]
+    total = 0
+    while stack and len(seen) < max_objects:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _UNREPORTED_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(vars(obj))
+    return total
+
+
+def exec_restricted(
+    byte_code: CodeType,
+    emit: Optional[OutputCallback] = None,
+    namespace: Optional[Dict[str, Any]] = None,
+    flusher: Optional[StdoutFlusher] = None,
+) -> SandboxResult:
+    """
+    Runs restricted bytecode in the current process and returns its structured
+    result. Printed text is also passed to `emit` in batches as it is produced
+    (and by `flusher` at least every `_STDOUT_FLUSH_INTERVAL`, if given).
+
+    The code runs as a module body in `namespace` (globals and locals in one
+    dict, so functions see top-level names). Passing the same dict again
+    continues from the variables left by earlier runs.
+    """
+    if namespace is None:
+        namespace = {}
+    if not namespace:
+        namespace.update(restricted_globals())
+    sink = OutputSink(emit)
+    namespace["_print_"] = lambda _getattr_=None: StreamingPrintCollector(sink, _getattr_)
+    stderr_capture = io.StringIO()
+    error = None
+    if flusher is not None and emit is not None:
+        flusher.attach(sink)
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stderr(stderr_capture):
+            exec(byte_code, namespace)
+    except Exception as e:
+        error = _exception_info(e)
+    finally:
+        execution_time_ms = (time.perf_counter() - started) * 1000
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if flusher is not None:
+            flusher.attach(None)
+        sink.flush()
+    variables, variables_truncated = capture_variables(namespace)
+    result = make_result(
+        "error" if error else "success",
+        stdout=sink.getvalue(),
+        stdout_truncated=sink.truncated,
+        variables=variables,
+        variables_truncated=variables_truncated,
+        error=error,
+        stderr=stderr_capture.getvalue(),
+        execution_time_ms=round(execution_time_ms, 3),
+        peak_memory_bytes=peak_memory,
+    )
+    stderr_capture.close()
+    return result
+
+
+def run_restricted(code: str) -> SandboxResult:
+    """Compiles and runs `code` with RestrictedPython in the current process."""
+    compiled = compile_restricted_code(code)
+    if isinstance(compiled, dict):
+        return compiled
+    return exec_restricted(compiled)
+
+
+class _InterpreterSession:
+    """Variables of one conversation session, kept in a worker between runs."""
+
+    def __init__(self):
+        self.namespace: Dict[str, Any] = {}
+        self.last_used = time.monotonic()
+
+
+def _run_job(
+    job: Tuple[str, str, Optional[str]],
+    conn,
+    emit: OutputCallback,
+    flusher: StdoutFlusher,
+    code_cache: "OrderedDict[str, Union[CodeType, SandboxResult]]",
+    code_cache_size: int,
+    sessions: "OrderedDict[str, _InterpreterSession]",
+    session_idle_ttl: float,
+    session_memory_bytes: int,
+    max_sessions: int,
+) -> None:
+    """Compiles (or looks up) and runs one job, sending its messages to the parent."""
+    source, code_key, session_id = job
+    compiled = code_cache.get(code_key)
+    cached = compiled is not None
+    if cached:
+        code_cache.move_to_end(code_key)
+    else:
+        compiled = compile_restricted_code(source)  # compile errors are cached as well
+        if code_cache_size > 0:
+            code_cache[code_key] = compiled
+            while len(code_cache) > code_cache_size:
+                code_cache.popitem(last=False)
+    conn.send(("compile", {"cached": cached, "size": len(code_cache)}))
+    if isinstance(compiled, dict):
+        conn.send(("result", compiled))  # pickled, so the cached error is never shared
+        return
+    if session_id is None:
+        conn.send(("result", exec_restricted(compiled, emit, flusher=flusher)))
+        return
+
+    # Drop sessions idle for too long, then the least recently used beyond the per-worker limit
+    now = time.monotonic()
+    while sessions and now - next(iter(sessions.values())).last_used > session_idle_ttl:
+        sessions.popitem(last=False)
+    session = sessions.pop(session_id, None)
+    is_new = session is None
+    if is_new:
+        session = _InterpreterSession()
+    while len(sessions) >= max(1, max_sessions):
+        sessions.popitem(last=False)
+
+    result = exec_restricted(compiled, emit, session.namespace, flusher)
+    session.last_used = time.monotonic()
+    session_bytes = namespace_size(session.namespace)
+    evicted = None
+    if session_memory_bytes and session_bytes > session_memory_bytes:
+        evicted = "memory"  # over the per-session cap: the variables are not kept
+    else:
+        sessions[session_id] = session
+    result["session"] = {"id": session_id, "new": is_new, "memory_bytes": session_bytes, "evicted": evicted}
+    conn.send(("result", result))
+
+
+def _worker_main(
+    conn,
+    cpu_seconds: int,
+    memory_bytes: int,
+    session_idle_ttl: float,
+    session_memory_bytes: int,
+    max_sessions: int,
+    code_cache_size: int,
+) -> None:
+    """
+    Worker process loop: receive (source, source hash, session id), compile and
+    run it, send back a ("compile", {"cached", "size"}) message, ("stdout", text)
+    messages while it runs and a final ("result", dict). Compiled code and
+    compile errors are kept in a per-worker LRU cache keyed by the source hash.
+    Runs with a session id continue from that session's variables. None stops the worker.
+
+    Running out of memory outside the user's code (compiling, measuring or
+    sending the result) exits with MEMORY_EXIT_CODE, so the parent can report
+    it as a MemoryError rather than a crash.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the parent
+    flusher = StdoutFlusher()
+    flusher.start()  # before the memory limit; see StdoutFlusher
+    _limit_memory(memory_bytes)
+    sessions: "OrderedDict[str, _InterpreterSession]" = OrderedDict()  # least recently used first
+    code_cache: "OrderedDict[str, Union[CodeType, SandboxResult]]" = OrderedDict()  # least recently used first
+
+    def emit(text: str) -> None:
+        conn.send(("stdout", text))
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        _limit_cpu(cpu_seconds)  # covers the compile as well as the run
+        try:
+            _run_job(
+                job, conn, emit, flusher, code_cache, code_cache_size,
+                sessions, session_idle_ttl, session_memory_bytes, max_sessions,
+            )
+        except MemoryError:
+            os._exit(MEMORY_EXIT_CODE)
+    conn.close()
@@ -0,0 +1,48 @@
+# src/jarvis/core/summarizer.py
+import logging
+import os
+from typing import List, Optional
+
+from google.genai.types import Content, Part
+
+from .llm_client import get_llm_client_registry
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "gemini-1.5-flash-latest")
+CONTEXT_SUMMARY_MAX_WORDS = int(os.getenv("CONTEXT_SUMMARY_MAX_WORDS", "150"))
+
+
+def build_summary_prompt(previous_summary: Optional[str], turns: List[str], max_words: int = CONTEXT_SUMMARY_MAX_WORDS) -> str:
+    """Builds the prompt that folds `turns` into the running summary."""
+    previous = previous_summary or "(none)"
+    conversation = "\n".join(turns)
+    return (
+        "You maintain a running summary of a conversation between a user and an AI assistant. "
+        "Update the summary with the new turns below. Keep facts, user preferences, decisions, "
+        "names, code identifiers and open questions; drop greetings and repetition. "
+        f"Respond ONLY with the updated summary in English, at most {max_words} words.\n\n"
+        f"Current summary:\n{previous}\n\n"
+        f"New turns:\n{conversation}"
+    )
+
+
+async def summarize_conversation(previous_summary: Optional[str], turns: List[str]) -> Optional[str]:
+    """
+    Folds rendered conversation turns into the running summary with an LLM call.
+    Returns the new summary, or None if the LLM is unavailable or the call fails.
+    """
+    registry = get_llm_client_registry()
+    if not registry.is_available():
+        logger.warning("LLM client not available. Skipping conversation summarization.")
+        return None
+    try:
+        response = await registry.generate_content(
+            CONTEXT_SUMMARY_MODEL,
+            contents=[Content(parts=[Part(text=build_summary_prompt(previous_summary, turns))])],
+        )
+        summary = (getattr(response, "text", None) or "").strip()
+        return summary or None
+    except Exception as e:
+        logger.error(f"Conversation summarization failed: {e}")
+        return None
@@ -1,85 +1,80 @@
 # src/jarvis/tools/code_execution_tool.py
-import io
 import logging
-import contextlib
-import traceback
-from google.adk.tools import FunctionTool
-from RestrictedPython import compile_restricted, safe_builtins, utility_builtins
-# from RestrictedPython.PrintCollector import PrintCollector # REMOVED
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+from google.adk.tools import FunctionTool, ToolContext
+
+from .sandbox import error_result, get_sandbox_pool
 
 logger = logging.getLogger(__name__)
 
-async def execute_python_code(code: str) -> str:
+# Session state key holding the sandbox session of the conversation (the dispatcher sets it to the ADK session id)
+SANDBOX_SESSION_STATE_KEY = "sandbox_session_id"
+
+def _session_id(tool_context: Optional[ToolContext]) -> Optional[str]:
+    """Sandbox session of the tool call's conversation, read from the ADK session state."""
+    if tool_context is None:
+        return None
+    session_id = tool_context.state.get(SANDBOX_SESSION_STATE_KEY)
+    if session_id is None:
+        # Not run through the dispatcher: give the conversation its own id, saved with the state delta
+        session_id = uuid.uuid4().hex
+        tool_context.state[SANDBOX_SESSION_STATE_KEY] = session_id
+    return session_id
+
+async def execute_python_code(code: str, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """
     Executes the given Python code snippet in a restricted environment
-    and returns any captured standard error output.
-    Note: Standard output (print) is disabled for security.
-    To get a result, assign it to a variable. The final state of
-    variables is not directly returned, but errors during execution are.
-
-    Uses RestrictedPython library to prevent unsafe operations.
+    and returns a structured result.
+    print() output is captured and returned as `stdout`, and the final
+    values of top-level variables are returned as `variables`, so
+    assigning or printing a result is enough to read it back.
+    Within a conversation, variables and functions defined by earlier calls
+    are kept, so later code can use them without re-running the setup
+    (check `session.new`: if true, earlier state was lost and must be recreated).
+
+    Uses RestrictedPython library to prevent unsafe operations (no imports,
+    no file access, no names starting with "_"). The code runs in a separate
+    sandbox worker process with time and memory limits.
 
     Args:
         code: The Python code string to execute.
 
     Returns:
-        A string containing captured stderr or an error message.
-        If execution is successful with no stderr, returns a success message.
+        A dict with:
+        - status: "success" or "error".
+        - stdout: Printed output (truncated if too long; see stdout_truncated).
+        - variables: Short reprs of the final top-level variables by name.
+        - error: None, or {"type", "message", "line", "traceback"} when the code failed.
+        - execution_time_ms / peak_memory_bytes: Resource usage of the run.
+        - session: None, or {"id", "new", "memory_bytes", "evicted"} for the conversation's interpreter state.
     """
-    logger.info(f"Attempting to execute restricted Python code (print disabled):\n```python\n{code}\n```")
-    local_vars = {}  # Dictionary to store local variables
-    # stdout_capture = io.StringIO() # REMOVED stdout capture
-    stderr_capture = io.StringIO()
-    output = ""
-
-    # Define a safe dictionary for globals - NO print included
-    restricted_globals = {
-        "__builtins__": safe_builtins.copy(),
-        **utility_builtins,
-        # No 'print' or '_print_' key
-    }
-
+    logger.info(f"Attempting to execute restricted Python code:\n```python\n{code}\n```")
     try:
-        logger.debug("Compiling code using compile_restricted...")
-        byte_code = compile_restricted(
-            code,
-            filename='<string>',
-            mode='exec' # Keep exec mode to allow statements
-        )
-        logger.debug("Code compiled successfully in restricted mode.")
-
-        # Execute the compiled byte code, only redirecting stderr
-        with contextlib.redirect_stderr(stderr_capture):
-            logger.debug("Executing compiled code...")
-            exec(byte_code, restricted_globals, local_vars)
-            logger.debug("Code execution finished.")
-
-        # stdout = stdout_capture.getvalue() # REMOVED
-        stderr = stderr_capture.getvalue()
-
-        # No stdout check anymore
-        # if stdout:
-        #     output += f"Stdout:\n{stdout}\n"
-        if stderr:
-            output += f"Stderr:\n{stderr}\n"
-
-        if not output:
-            # Modify success message as there's no stdout expected
-            output = "Code executed successfully (no stderr output)."
-
-        logger.info("Restricted code execution successful (no print). ")
-
+        result = await get_sandbox_pool().execute(code, session_id=_session_id(tool_context))
     except Exception as e:
-        logger.error(f"Error executing restricted Python code: {e}", exc_info=True)
-        error_details = traceback.format_exc()
-        output = f"Error during restricted execution: {type(e).__name__}: {e}\n\nTraceback (may be limited by sandbox):\n{error_details}"
+        logger.error(f"Sandbox failed to execute restricted Python code: {e}", exc_info=True)
+        return error_result("SandboxError", str(e))
 
-    finally:
-        # Ensure streams are closed
-        # stdout_capture.close() # REMOVED
-        stderr_capture.close()
+    if result["status"] == "success":
+        logger.info(f"Restricted code execution successful ({result['execution_time_ms']} ms).")
+    else:
+        logger.error(f"Error executing restricted Python code: {result['error']['type']}: {result['error']['message']}")
+    return result
 
-    return output.strip()
+async def stream_python_code(code: str, session_id: Optional[str] = None) -> AsyncIterator[Union[str, Dict[str, Any]]]:
+    """
+    Like execute_python_code, but yields printed output (str) while the code
+    runs and the structured result (dict) as the last item.
+    """
+    logger.info(f"Streaming execution of restricted Python code:\n```python\n{code}\n```")
+    try:
+        async for item in get_sandbox_pool().stream(code, session_id=session_id):
+            yield item
+    except Exception as e:
+        logger.error(f"Sandbox failed to execute restricted Python code: {e}", exc_info=True)
+        yield error_result("SandboxError", str(e))
 
 # Create the ADK FunctionTool object
 # The description will be taken from the function's docstring.
@@ -87,7 +82,7 @@ code_execution_tool = FunctionTool(func=execute_python_code)
 
 # Example usage (for testing purposes)
 async def main():
-    # Example 1: Simple print (should work)
+    # Example 1: Simple print (captured in stdout)
     print("--- Example 1: Simple Print ---")
     result1 = await execute_python_code("print('Hello from restricted env!')")
     print(f"{result1}\n------------------\n")
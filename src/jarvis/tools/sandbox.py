@@ -0,0 +1,460 @@
+# src/jarvis/tools/sandbox.py
+import asyncio
+import atexit
+import contextlib
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+from ..core import sandbox_worker
+from ..core.cache import CacheStats, hash_key
+from ..core.sandbox_worker import (  # noqa: F401 - re-exported for callers of this module
+    MEMORY_EXIT_CODE,
+    OutputCallback,
+    OutputSink,
+    SandboxResult,
+    StreamingPrintCollector,
+    _worker_main,
+    capture_variables,
+    compile_restricted_code,
+    error_result,
+    exec_restricted,
+    make_result,
+    namespace_size,
+    resource,
+    restricted_globals,
+    run_restricted,
+)
+
+logger = logging.getLogger(__name__)
+
+# Worker pool settings for restricted code execution
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(min(4, os.cpu_count() or 1))))
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "10"))  # wall-clock seconds per execution
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "5"))  # CPU seconds per execution (0: no limit)
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "256"))  # extra address space per worker (0: no limit)
+SANDBOX_START_METHOD = os.getenv("SANDBOX_START_METHOD", "forkserver" if os.name == "posix" else "spawn")
+SANDBOX_CODE_CACHE_SIZE = int(os.getenv("SANDBOX_CODE_CACHE_SIZE", "256"))  # compiled snippets kept per worker (0: no cache)
+SANDBOX_MAX_SOURCE_CHARS = int(os.getenv("SANDBOX_MAX_SOURCE_CHARS", "100000"))  # longer code is rejected unparsed (0: no limit)
+
+# Per-session interpreter state held in the workers
+SANDBOX_SESSION_IDLE_TTL = float(os.getenv("SANDBOX_SESSION_IDLE_TTL", "1800"))  # seconds without use before a session is dropped
+SANDBOX_SESSION_MEMORY_MB = int(os.getenv("SANDBOX_SESSION_MEMORY_MB", "64"))  # variables kept per session (0: no limit)
+SANDBOX_MAX_SESSIONS_PER_WORKER = int(os.getenv("SANDBOX_MAX_SESSIONS_PER_WORKER", "32"))
+
+
+class _SandboxWorker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, *worker_args):
+        self.conn, child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, *worker_args),
+            name="sandbox-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()  # EOF on self.conn now means the worker died
+        self.alive = True
+        self.busy = False
+        self.sessions = 0  # sessions assigned to this worker by the pool
+        self.code_cache_stats = CacheStats()  # compile cache lookups reported by the worker
+        self.code_cache_size = 0
+
+    def execute(
+        self,
+        source: str,
+        code_key: str,
+        timeout: float,
+        on_output: Optional[OutputCallback] = None,
+        session_id: Optional[str] = None,
+    ) -> SandboxResult:
+        """
+        Compiles and runs `source` in the worker (in `session_id`'s state if given),
+        passing printed text to `on_output` as it arrives. Kills the worker on
+        timeout or crash, which also discards every session it held.
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        streamed: List[str] = []
+
+        def elapsed_ms() -> float:
+            return round((time.monotonic() - started) * 1000, 3)
+
+        try:
+            self.conn.send((source, code_key, session_id))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.conn.poll(remaining):
+                    self.kill()
+                    return error_result("TimeoutError", f"execution exceeded the {timeout:g}s time limit", "".join(streamed), elapsed_ms())
+                kind, value = self.conn.recv()
+                if kind == "compile":
+                    if value["cached"]:
+                        self.code_cache_stats.hits += 1
+                    else:
+                        self.code_cache_stats.misses += 1
+                    self.code_cache_size = value["size"]
+                    continue
+                if kind == "stdout":
+                    streamed.append(value)
+                    if on_output is not None:
+                        on_output(value)
+                    continue
+                if value["error"] and value["error"]["type"] == "MemoryError":
+                    self.kill()  # the heap may be fragmented up to the limit; start fresh
+                return value
+        except (EOFError, OSError):
+            self.kill()
+            exitcode = self.process.exitcode
+            if resource is not None and exitcode == -signal.SIGXCPU:
+                return error_result("TimeoutError", "execution exceeded the CPU time limit", "".join(streamed), elapsed_ms())
+            if exitcode == MEMORY_EXIT_CODE:
+                return error_result("MemoryError", "sandbox worker ran out of memory", "".join(streamed), elapsed_ms())
+            return error_result("SandboxError", f"sandbox worker exited unexpectedly (exit code {exitcode})", "".join(streamed), elapsed_ms())
+
+    def stop(self) -> None:
+        """Asks the worker to exit, killing it if it does not."""
+        if self.alive:
+            with contextlib.suppress(OSError):
+                self.conn.send(None)
+            self.process.join(1)
+        self.kill()
+
+    def kill(self) -> None:
+        self.alive = False
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    A pool of pre-started worker processes that run restricted code.
+
+    Each execution is bounded by a wall-clock timeout (enforced by the parent),
+    a CPU time limit (RLIMIT_CPU) and an address-space limit (RLIMIT_AS) in the
+    worker. A worker that times out or dies is killed and replaced. Code and
+    results travel over a pipe per worker, and the async API waits for them in
+    the pool's own bounded thread pool, so running code never blocks the event
+    loop or ties up the loop's default executor.
+
+    Workers start from a fork server with core/sandbox_worker.py preloaded by
+    default: respawns are cheap and no worker inherits the parent's threads,
+    state or imports.
+
+    Snippets are compiled in the workers, under the same limits as the code
+    itself, and each worker keeps an LRU cache of compiled code keyed by the
+    source hash, so retried or repeated snippets skip RestrictedPython's AST
+    transform. The parent only hashes the source (rejecting anything over
+    `max_source_chars` unparsed) and aggregates the cache metrics.
+
+    Runs with a session id keep their variables between calls. A session is
+    pinned to the worker holding its state (the least loaded idle worker when
+    it starts) and waits for that worker if it is busy; async callers wait on
+    the event loop and take a thread only once they hold a worker. Sessions are dropped
+    after `session_idle_ttl` seconds without use, when their variables exceed
+    `session_memory_mb`, or when their worker is restarted.
+    """
+
+    def __init__(
+        self,
+        size: int = SANDBOX_WORKERS,
+        timeout: float = SANDBOX_TIMEOUT,
+        cpu_seconds: int = SANDBOX_CPU_SECONDS,
+        memory_mb: int = SANDBOX_MEMORY_MB,
+        start_method: str = SANDBOX_START_METHOD,
+        code_cache_size: int = SANDBOX_CODE_CACHE_SIZE,
+        max_source_chars: int = SANDBOX_MAX_SOURCE_CHARS,
+        session_idle_ttl: float = SANDBOX_SESSION_IDLE_TTL,
+        session_memory_mb: int = SANDBOX_SESSION_MEMORY_MB,
+        max_sessions_per_worker: int = SANDBOX_MAX_SESSIONS_PER_WORKER,
+    ):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.session_idle_ttl = session_idle_ttl
+        self.session_memory_bytes = session_memory_mb * 1024 * 1024
+        self.max_sessions_per_worker = max_sessions_per_worker
+        self.respawns = 0
+        self.code_cache_size = max(0, code_cache_size)
+        self.max_source_chars = max_source_chars
+        self._retired_code_cache_stats = CacheStats()  # lookups counted by workers since replaced
+        self._context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            # Only the worker module (and RestrictedPython) is imported in the server, not the jarvis package
+            self._context.set_forkserver_preload([sandbox_worker.__name__])
+        self._spawn_lock = threading.Lock()  # one start at a time, so with 'fork' no worker inherits another's pipe
+        self._available = threading.Condition()  # guards worker.busy, _workers, _session_workers and _waiters
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []  # async callers waiting for a worker
+        # session id -> (worker holding its state, last use), least recently used first
+        self._session_workers: "OrderedDict[str, Tuple[_SandboxWorker, float]]" = OrderedDict()
+        self._closed = False
+        self._workers: List[_SandboxWorker] = [self._spawn() for _ in range(self.size)]
+        # One thread per running execution: async callers only submit once they hold a worker
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="sandbox")
+        logger.info(
+            f"SandboxPool started {self.size} workers ({start_method}; timeout {timeout:g}s, "
+            f"cpu {cpu_seconds}s, memory {memory_mb} MiB)."
+        )
+
+    def _spawn(self) -> _SandboxWorker:
+        with self._spawn_lock:
+            return _SandboxWorker(
+                self._context, self.cpu_seconds, self.memory_bytes,
+                self.session_idle_ttl, self.session_memory_bytes, self.max_sessions_per_worker,
+                self.code_cache_size,
+            )
+
+    def _forget_session(self, session_id: str) -> None:
+        worker, _ = self._session_workers.pop(session_id)
+        worker.sessions -= 1
+
+    def _try_acquire(self, session_id: Optional[str]) -> Optional[_SandboxWorker]:
+        """
+        Marks a worker busy and returns it: the session's own worker, or the least
+        loaded idle one. Returns None if that worker is busy. Call with _available held.
+        """
+        now = time.monotonic()
+        while self._session_workers:
+            oldest_id, (_, last_used) = next(iter(self._session_workers.items()))
+            if now - last_used <= self.session_idle_ttl:
+                break
+            self._forget_session(oldest_id)  # the worker drops its state on its own
+        pinned = self._session_workers.get(session_id) if session_id else None
+        if pinned is not None and pinned[0] not in self._workers:
+            self._forget_session(session_id)  # its worker was restarted; the state is gone
+            pinned = None
+        if pinned is not None:
+            worker = pinned[0]
+            if worker.busy:
+                return None
+            self._session_workers[session_id] = (worker, now)
+            self._session_workers.move_to_end(session_id)
+        else:
+            idle = [worker for worker in self._workers if not worker.busy]
+            if not idle:
+                return None
+            worker = min(idle, key=lambda candidate: candidate.sessions)
+            if session_id:
+                self._session_workers[session_id] = (worker, now)
+                worker.sessions += 1
+        worker.busy = True
+        return worker
+
+    def _acquire(self, session_id: Optional[str]) -> Optional[_SandboxWorker]:
+        """Waits (blocking) for a worker for `session_id`; None once the pool is closed."""
+        with self._available:
+            while not self._closed:
+                worker = self._try_acquire(session_id)
+                if worker is not None:
+                    return worker
+                self._available.wait()
+        return None
+
+    async def _acquire_async(self, session_id: Optional[str]) -> Optional[_SandboxWorker]:
+        """Like _acquire, but waits on the event loop instead of a thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._available:
+                if self._closed:
+                    return None
+                worker = self._try_acquire(session_id)
+                if worker is not None:
+                    return worker
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                await waiter[1]
+            finally:
+                with self._available:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+
+    def _wake_waiters(self) -> None:
+        """Wakes every thread and coroutine waiting for a worker. Call with _available held."""
+        self._available.notify_all()
+        waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            with contextlib.suppress(RuntimeError):  # the waiter's loop is already closed
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def _release(self, worker: _SandboxWorker) -> None:
+        """Returns a worker to the pool, replacing it if it was stopped."""
+        replacement = None
+        if not worker.alive and not self._closed:
+            self.respawns += 1
+            logger.warning("Sandbox worker was stopped. Starting a replacement.")
+            replacement = self._spawn()
+        with self._available:
+            index = self._workers.index(worker)
+            if replacement is not None:
+                self._retired_code_cache_stats.hits += worker.code_cache_stats.hits
+                self._retired_code_cache_stats.misses += worker.code_cache_stats.misses
+                self._workers[index] = replacement
+            else:
+                worker.busy = False
+            self._wake_waiters()
+        if self._closed:
+            (replacement or worker).stop()
+
+    def _check_source(self, code: str) -> Optional[SandboxResult]:
+        """Error result for code that is never sent to a worker, else None."""
+        if self._closed:
+            return error_result("SandboxError", "sandbox pool is closed")
+        if self.max_source_chars and len(code) > self.max_source_chars:
+            return error_result("SandboxError", f"code exceeds the {self.max_source_chars} character limit")
+        return None
+
+    def _run_on_worker(
+        self,
+        worker: _SandboxWorker,
+        code: str,
+        timeout: Optional[float],
+        on_output: Optional[OutputCallback],
+        session_id: Optional[str],
+    ) -> SandboxResult:
+        """Runs `code` on an acquired worker (blocking), then releases it."""
+        try:
+            result = worker.execute(code, hash_key("restricted", code), timeout or self.timeout, on_output, session_id)
+            if session_id and not worker.alive:
+                result["session"] = {"id": session_id, "new": False, "memory_bytes": 0, "evicted": "worker_restart"}
+            return result
+        finally:
+            self._release(worker)
+
+    def run(
+        self,
+        code: str,
+        timeout: Optional[float] = None,
+        on_output: Optional[OutputCallback] = None,
+        session_id: Optional[str] = None,
+    ) -> SandboxResult:
+        """
+        Runs `code` in a worker, waiting for one if needed (blocking). With
+        `session_id`, the code continues from that session's earlier variables.
+        Printed text is passed to `on_output` (called from this thread) as it arrives.
+        """
+        error = self._check_source(code)
+        if error is not None:
+            return error
+        worker = self._acquire(session_id)
+        if worker is None:
+            return error_result("SandboxError", "sandbox pool is closed")
+        return self._run_on_worker(worker, code, timeout, on_output, session_id)
+
+    async def _run_async(
+        self,
+        code: str,
+        timeout: Optional[float],
+        on_output: Optional[OutputCallback],
+        session_id: Optional[str],
+    ) -> SandboxResult:
+        """
+        Waits for a worker on the event loop, then runs the code on the pool's
+        thread pool. A session waiting for its busy worker holds no thread, so it
+        never delays runs of other sessions.
+        """
+        error = self._check_source(code)
+        if error is not None:
+            return error
+        worker = await self._acquire_async(session_id)
+        if worker is None:
+            return error_result("SandboxError", "sandbox pool is closed")
+        loop = asyncio.get_running_loop()
+        try:
+            job = loop.run_in_executor(self._executor, self._run_on_worker, worker, code, timeout, on_output, session_id)
+        except RuntimeError:  # the thread pool was shut down by close()
+            self._release(worker)
+            return error_result("SandboxError", "sandbox pool is closed")
+        return await asyncio.shield(job)  # a cancelled caller leaves the run to finish and release the worker
+
+    async def execute(self, code: str, timeout: Optional[float] = None, session_id: Optional[str] = None) -> SandboxResult:
+        """Runs `code` in the pool without blocking the event loop."""
+        return await self._run_async(code, timeout, None, session_id)
+
+    async def stream(
+        self,
+        code: str,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[Union[str, SandboxResult]]:
+        """
+        Runs `code` in the pool and yields printed text (str) while it runs,
+        then the structured result (dict) as the last item.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+        def on_output(text: str) -> None:
+            loop.call_soon_threadsafe(chunks.put_nowait, text)
+
+        job = asyncio.ensure_future(self._run_async(code, timeout, on_output, session_id))
+        job.add_done_callback(lambda _: chunks.put_nowait(None))  # queued after every chunk
+        while True:
+            text = await chunks.get()
+            if text is None:
+                break
+            yield text
+        yield await job
+
+    def close(self) -> None:
+        """Stops the idle workers; busy ones are stopped when their execution returns."""
+        with self._available:
+            if self._closed:
+                return
+            self._closed = True
+            idle = [worker for worker in self._workers if not worker.busy]
+            self._wake_waiters()
+        for worker in idle:
+            worker.stop()
+        self._executor.shutdown(wait=False)  # running executions finish and stop their workers
+
+    def stats(self) -> dict:
+        with self._available:
+            stats = {
+                "workers": self.size,
+                "idle": sum(1 for worker in self._workers if not worker.busy),
+                "respawns": self.respawns,
+                "sessions": len(self._session_workers),
+            }
+            if self.code_cache_size:
+                code_cache_stats = CacheStats()
+                code_cache_stats.hits = self._retired_code_cache_stats.hits + sum(worker.code_cache_stats.hits for worker in self._workers)
+                code_cache_stats.misses = self._retired_code_cache_stats.misses + sum(worker.code_cache_stats.misses for worker in self._workers)
+                stats["code_cache"] = {
+                    "size": sum(worker.code_cache_size for worker in self._workers),
+                    "hits": code_cache_stats.hits,
+                    "misses": code_cache_stats.misses,
+                    "hit_rate": round(code_cache_stats.hit_rate, 4),
+                }
+        return stats
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_sandbox_pool: Optional[SandboxPool] = None
+_sandbox_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Returns the process-wide SandboxPool, starting its workers on first use."""
+    global _sandbox_pool
+    if _sandbox_pool is None:
+        with _sandbox_pool_lock:
+            if _sandbox_pool is None:
+                _sandbox_pool = SandboxPool()
+                atexit.register(_sandbox_pool.close)
+    return _sandbox_pool
@@ -4,10 +4,18 @@ import google.genai as genai # Use the updated alias
 from google.ai import generativelanguage as glm # Import for protos replacement
 from google.ai.generativelanguage import Type as glm_Type # Import Type enum
 from google.cloud import aiplatform # Import necessary for potential future use or consistency
-from google.genai.types import Tool, FunctionDeclaration, Content, Part # Import FunctionDeclaration, Content, Part
+from google.genai.types import Tool, FunctionDeclaration, Content, Part, GenerateContentConfig # Import FunctionDeclaration, Content, Part
+import asyncio
+import json
 import logging
 import os
+import threading
+import unicodedata
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
 from dotenv import load_dotenv
+from ..core.cache import BaseCache, LRUCache, create_cache, hash_key
+from ..core.llm_client import get_llm_client_registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,17 +35,99 @@ except Exception as e:
     logging.error(f"Error configuring generative AI: {e}")
     # Handle configuration error appropriately
 
-# Initialize the genai Client at module level
-API_KEY = os.getenv("GEMINI_API_KEY")
-client = None
-if API_KEY:
+# The genai Client is shared process-wide (see core/llm_client.py) and created lazily on first use
+TRANSLATION_MODEL_NAME = 'gemini-1.5-flash-latest'
+
+# Translation memory (backend: memory | tiered | sqlite | none). 'tiered' keeps an LRU in front of SQLite.
+TRANSLATION_MEMORY_BACKEND = os.getenv("TRANSLATION_MEMORY_BACKEND", "memory")
+TRANSLATION_MEMORY_MAX_SIZE = int(os.getenv("TRANSLATION_MEMORY_MAX_SIZE", "4096"))
+TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", ".cache/jarvis_cache.sqlite3")
+# Pre-seeded translations of fixed system messages, loaded when the memory is created
+TRANSLATION_MEMORY_SEED_PATH = os.getenv(
+    "TRANSLATION_MEMORY_SEED_PATH",
+    str(Path(__file__).resolve().parents[3] / "config" / "translation_memory_seed.json"),
+)
+
+def normalize_translation_text(text: str) -> str:
+    """Normalizes text for translation memory keys: Unicode NFC, no outer whitespace.
+
+    Inner whitespace is kept as is, since indentation and line layout (code blocks, tables) change the translation.
+    """
+    return unicodedata.normalize("NFC", text).strip()
+
+def translation_memory_key(text: str, target_language: str, source_language: str) -> str:
+    """Builds the translation memory key from the language pair and the normalized text hash."""
+    source = (source_language or "auto").strip().lower()
+    return hash_key("translation", source, target_language.strip().lower(), normalize_translation_text(text))
+
+def seed_translation_memory(memory: BaseCache, path: str) -> int:
+    """
+    Loads pre-translated messages from a JSON seed file into the translation memory.
+    Format: {"source_language": "en", "translations": {"ko": {"<english>": "<korean>"}}}.
+    Returns the number of seeded entries (0 if the file is missing or invalid).
+    """
     try:
-        client = genai.Client(api_key=API_KEY)
-        logging.info("Successfully initialized genai.Client with API key.")
-    except Exception as e:
-        logging.error(f"Failed to initialize genai.Client with API key: {e}")
-else:
-    logging.warning("GEMINI_API_KEY not found. genai.Client initialization skipped.")
+        with open(path, "r", encoding="utf-8") as f:
+            seed = json.load(f)
+        source_language = seed.get("source_language", "en")
+        count = 0
+        for target_language, messages in seed.get("translations", {}).items():
+            for text, translated in messages.items():
+                memory.set(translation_memory_key(text, target_language, source_language), translated)
+                count += 1
+    except FileNotFoundError:
+        logging.info(f"Translation memory seed file not found: {path}")
+        return 0
+    except (OSError, ValueError, AttributeError) as e:
+        logging.error(f"Could not load translation memory seed file {path}: {e}")
+        return 0
+    logging.info(f"Seeded translation memory with {count} entries from {path}")
+    return count
+
+_translation_memory: Optional[BaseCache] = None
+_translation_memory_initialized = False
+_translation_memory_lock = threading.Lock()
+
+def get_translation_memory() -> Optional[BaseCache]:
+    """Returns the process-wide translation memory, creating and seeding it on first use. None if disabled."""
+    global _translation_memory, _translation_memory_initialized
+    if _translation_memory_initialized:
+        return _translation_memory
+    with _translation_memory_lock:
+        if not _translation_memory_initialized:
+            try:
+                _translation_memory = create_cache(
+                    TRANSLATION_MEMORY_BACKEND,
+                    max_size=TRANSLATION_MEMORY_MAX_SIZE,
+                    path=TRANSLATION_MEMORY_PATH,
+                    table="translation_memory",
+                )
+            except Exception as e:
+                logging.warning(f"Could not create translation memory ({TRANSLATION_MEMORY_BACKEND}): {e}. Falling back to in-memory.")
+                _translation_memory = LRUCache(max_size=TRANSLATION_MEMORY_MAX_SIZE)
+            if _translation_memory is not None and TRANSLATION_MEMORY_SEED_PATH:
+                seed_translation_memory(_translation_memory, TRANSLATION_MEMORY_SEED_PATH)
+            _translation_memory_initialized = True
+    return _translation_memory
+
+def lookup_translation(text: str, target_language: str, source_language: str) -> Optional[str]:
+    """Returns a remembered translation of text, or None."""
+    memory = get_translation_memory()
+    if memory is None:
+        return None
+    return memory.get(translation_memory_key(text, target_language, source_language))
+
+def remember_translation(text: str, target_language: str, source_language: str, translated_text: str) -> None:
+    """Stores a successful translation in the translation memory."""
+    memory = get_translation_memory()
+    if memory is not None and translated_text:
+        memory.set(translation_memory_key(text, target_language, source_language), translated_text)
+
+def _build_translation_prompt(text: str, target_language: str, source_language: str) -> str:
+    """Builds the translation prompt. An empty or 'auto' source language asks the model to detect it."""
+    if not source_language or source_language.lower() == 'auto':
+        return f"Translate the following text to {target_language}:\n\n{text}"
+    return f"Translate the following text from {source_language} to {target_language}:\n\n{text}"
 
 # Define the translation function (removed default value for source_language)
 async def translate_text(text: str, target_language: str, source_language: str) -> str:
@@ -52,27 +142,30 @@ async def translate_text(text: str, target_language: str, source_language: str)
     Returns:
         The translated text, or the original text if translation fails.
     """
-    # Use the module-level client if available
-    if not client:
+    # Repeated texts (fixed system messages, earlier answers) are served from the translation memory
+    remembered = lookup_translation(text, target_language, source_language)
+    if remembered is not None:
+        logging.info("Translation served from translation memory.")
+        return remembered
+
+    # Use the shared client if available
+    registry = get_llm_client_registry()
+    if not registry.get_client():
         logging.error("genai.Client is not initialized. Cannot perform translation.")
         return text # Return original text if client is not available
 
     try:
         # Choose a model suitable for translation tasks
-        model_name = 'gemini-1.5-flash-latest' # Define the model name to use
+        model_name = TRANSLATION_MODEL_NAME
 
         # Handle source_language explicitly if auto-detection is desired
-        prompt_source_lang = source_language
-        if not source_language or source_language.lower() == 'auto':
-            prompt = f"Translate the following text to {target_language}:\n\n{text}"
-            prompt_source_lang = "auto-detected"
-        else:
-            prompt = f"Translate the following text from {source_language} to {target_language}:\n\n{text}"
+        prompt = _build_translation_prompt(text, target_language, source_language)
+        prompt_source_lang = source_language if source_language and source_language.lower() != 'auto' else "auto-detected"
 
         logging.info(f"Sending translation request to LLM (source: {prompt_source_lang}). Prompt: {prompt[:100]}..." )
-        # Call generate_content using the client instance
-        response = await client.aio.models.generate_content(
-            model=model_name, # Specify the model
+        # The registry bounds per-model concurrency and waits for rate-limit quota
+        response = await registry.generate_content(
+            model_name, # Specify the model
             contents=[Content(parts=[Part(text=prompt)])]
         )
 
@@ -86,6 +179,7 @@ async def translate_text(text: str, target_language: str, source_language: str)
 
         if translated_text:
              logging.info(f"Translation successful. Result: {translated_text[:100]}...")
+             remember_translation(text, target_language, source_language, translated_text)
              return translated_text
         else:
             logging.warning(f"LLM response for translation was empty or invalid. Response: {response}")
@@ -95,11 +189,150 @@ async def translate_text(text: str, target_language: str, source_language: str)
         logging.error(f"Error during translation LLM call: {e}")
         return text # Return original text on error
 
+async def translate_text_stream(text: str, target_language: str, source_language: str) -> AsyncIterator[str]:
+    """Streams the translation of text chunk by chunk as the LLM produces it.
+
+    Not exposed as a tool; used by ResponseGenerator to deliver translated answers incrementally.
+    Yields the original text if translation fails before any output was produced. If the stream
+    fails midway, the already emitted chunks cannot be withdrawn, so the output is completed from
+    a non-streamed translation (or the original text): only its remainder when it continues the
+    emitted prefix, otherwise in full after a paragraph break. Partial output is never remembered.
+    """
+    remembered = lookup_translation(text, target_language, source_language)
+    if remembered is not None:
+        logging.info("Translation served from translation memory.")
+        yield remembered
+        return
+
+    registry = get_llm_client_registry()
+    if not registry.get_client():
+        logging.error("genai.Client is not initialized. Cannot perform translation.")
+        yield text
+        return
+
+    emitted_chunks = []
+    try:
+        prompt = _build_translation_prompt(text, target_language, source_language)
+        logging.info(f"Streaming translation request to LLM (target: {target_language}). Prompt: {prompt[:100]}...")
+        async for chunk in registry.generate_content_stream(
+            TRANSLATION_MODEL_NAME,
+            contents=[Content(parts=[Part(text=prompt)])]
+        ):
+            emitted_chunks.append(chunk)
+            yield chunk
+    except Exception as e:
+        logging.error(f"Error during streaming translation LLM call: {e}")
+        if emitted_chunks:
+            emitted = "".join(emitted_chunks).lstrip()
+            logging.warning("Streaming translation failed after partial output. Completing it from a non-streamed translation.")
+            fallback = await translate_text(text, target_language, source_language)
+            yield fallback[len(emitted):] if fallback.startswith(emitted) else "\n\n" + fallback
+            return
+
+    if emitted_chunks:
+        # Only complete translations are remembered
+        remember_translation(text, target_language, source_language, "".join(emitted_chunks).strip())
+    else:
+        logging.warning("Streaming translation produced no output. Returning original text.")
+        yield text
+
+def _build_batch_translation_prompt(texts: List[str], target_language: str, source_language: str) -> str:
+    """Builds the batch prompt. Segments travel as a JSON array so delimiters inside the text cannot break the framing."""
+    if not source_language or source_language.lower() == 'auto':
+        direction = f"to {target_language}"
+    else:
+        direction = f"from {source_language} to {target_language}"
+    return (
+        f"Translate each string in the following JSON array {direction}. "
+        "Respond ONLY with a JSON array of strings that has exactly the same number of elements, "
+        "holding the translations in the same order. Preserve Markdown formatting, line breaks and placeholders.\n\n"
+        f"{json.dumps(texts, ensure_ascii=False)}"
+    )
+
+def _parse_batch_translation(response_text: str, expected_count: int) -> Optional[List[str]]:
+    """Parses the JSON array returned for a batch. None if it is not a list of `expected_count` strings."""
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        response_text = response_text.split("\n", 1)[1] if "\n" in response_text else ""
+        response_text = response_text.rsplit("```", 1)[0].strip()
+    try:
+        translations = json.loads(response_text)
+    except ValueError:
+        return None
+    if not isinstance(translations, list) or len(translations) != expected_count:
+        return None
+    if not all(isinstance(item, str) for item in translations):
+        return None
+    return translations
+
+async def translate_batch(texts: List[str], target_language: str, source_language: str) -> List[str]:
+    """Translates several texts to the target language in a single LLM request.
+
+    Args:
+        texts: The texts to translate (e.g. the text blocks of one answer).
+        target_language: The target language code (ISO 639-1, e.g., 'ko', 'en').
+        source_language: The source language code (ISO 639-1, e.g., 'ko', 'en').
+
+    Returns:
+        The translations in the same order as `texts`. Texts that cannot be translated are returned unchanged.
+    """
+    results = list(texts)
+    pending = []
+    for index, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        remembered = lookup_translation(text, target_language, source_language)
+        if remembered is not None:
+            results[index] = remembered
+        else:
+            pending.append(index)
+
+    if not pending:
+        return results
+    if len(pending) == 1:
+        index = pending[0]
+        results[index] = await translate_text(texts[index], target_language, source_language)
+        return results
+
+    registry = get_llm_client_registry()
+    if not registry.get_client():
+        logging.error("genai.Client is not initialized. Cannot perform translation.")
+        return results
+
+    batch = [texts[index] for index in pending]
+    translations = None
+    try:
+        prompt = _build_batch_translation_prompt(batch, target_language, source_language)
+        logging.info(f"Sending batch translation request to LLM ({len(batch)} segments, target: {target_language}).")
+        response = await registry.generate_content(
+            TRANSLATION_MODEL_NAME,
+            contents=[Content(parts=[Part(text=prompt)])],
+            config=GenerateContentConfig(response_mime_type="application/json"),
+        )
+        response_text = response.text if response and getattr(response, 'text', None) else ""
+        translations = _parse_batch_translation(response_text, len(batch))
+        if translations is None:
+            logging.warning(f"Batch translation response did not match the request framing. Response: {response_text[:200]}...")
+    except Exception as e:
+        logging.error(f"Error during batch translation LLM call: {e}")
+
+    if translations is None:
+        # Fall back to one request per segment (each returns its original text on failure)
+        translations = await asyncio.gather(*(translate_text(text, target_language, source_language) for text in batch))
+    else:
+        for text, translated in zip(batch, translations):
+            remember_translation(text, target_language, source_language, translated)
+
+    for index, translated in zip(pending, translations):
+        results[index] = translated if translated else texts[index]
+    return results
+
 # Create the ADK Tool object using FunctionDeclaration.from_callable_with_api_option
 # Create the FunctionDeclaration first, specifying the API option
 func_decl = FunctionDeclaration.from_callable_with_api_option(callable=translate_text, api_option='GEMINI_API')
-# Then create the Tool object using the declaration
-translate_tool = Tool(function_declarations=[func_decl])
+batch_func_decl = FunctionDeclaration.from_callable_with_api_option(callable=translate_batch, api_option='GEMINI_API')
+# Then create the Tool object using the declarations
+translate_tool = Tool(function_declarations=[func_decl, batch_func_decl])
 
 # Example usage (for testing purposes)
 async def main():
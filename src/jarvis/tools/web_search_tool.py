@@ -1,12 +1,19 @@
 # src/jarvis/tools/web_search_tool.py
 import asyncio
+import json
 import logging
 import os # For API Key and Model Name
-import google.generativeai as genai # Import genai for summarization
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from google.genai.types import Content, Part # Summarization uses the shared google.genai client
 # from google.adk.tools import Tool # Previous attempt
 from google.adk.tools import FunctionTool # Correct import based on installed package structure
 from duckduckgo_search import DDGS # Correct import
 import dotenv # For loading .env
+from ..core.cache import BaseCache, LRUCache, SingleFlight, create_cache, hash_key
+from ..core.llm_client import get_llm_client_registry
 
 # Load .env file for API key and model name (if not already loaded globally)
 # Consider if this should be handled at a higher level (e.g., Dispatcher init)
@@ -17,24 +24,132 @@ dotenv.load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-# Configure genai (only if API_KEY is available)
-API_KEY = os.getenv("GEMINI_API_KEY")
+# Summarization uses the process-wide LLM client registry (created lazily, only if GEMINI_API_KEY is set)
 DEFAULT_MODEL_NAME = os.getenv("VERTEX_MODEL_NAME", "gemini-1.5-flash-latest")
-LLM_CLIENT_INITIALIZED = False
-if API_KEY:
+
+# Two-level search cache (backend: memory | tiered | sqlite | none). 'tiered' keeps an LRU in front of SQLite.
+# Raw results are keyed by the normalized query; summaries by the query plus a hash of the result set.
+WEB_SEARCH_CACHE_BACKEND = os.getenv("WEB_SEARCH_CACHE_BACKEND", "memory")
+WEB_SEARCH_CACHE_MAX_SIZE = int(os.getenv("WEB_SEARCH_CACHE_MAX_SIZE", "1024"))
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", ".cache/jarvis_cache.sqlite3")
+WEB_SEARCH_RESULTS_TTL = float(os.getenv("WEB_SEARCH_RESULTS_TTL", "900"))
+WEB_SEARCH_SUMMARY_TTL = float(os.getenv("WEB_SEARCH_SUMMARY_TTL", "3600"))
+# Empty result sets are often transient (rate limiting, a flaky backend), so they are kept only briefly (0: not cached)
+WEB_SEARCH_EMPTY_TTL = float(os.getenv("WEB_SEARCH_EMPTY_TTL", "60"))
+WEB_SEARCH_MAX_RESULTS = 7 # Fetch slightly more results to provide better context for summarization
+
+_QUERY_EDGE_PUNCTUATION = re.compile(r"^[\s\"'“”‘’.,!?;:¿¡]+|[\s\"'“”‘’.,!?;:¿¡]+$")
+
+def normalize_query(query: str) -> str:
+    """Normalizes a search query for cache keys: Unicode NFKC, case-folded, collapsed whitespace, no edge punctuation."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return _QUERY_EDGE_PUNCTUATION.sub("", " ".join(query.split()))
+
+def search_results_key(query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> str:
+    return hash_key("web_search", max_results, normalize_query(query))
+
+def search_summary_key(query: str, results: List[Dict[str, str]]) -> str:
+    results_hash = hash_key(json.dumps(results, sort_keys=True, ensure_ascii=False))
+    return hash_key("web_search_summary", DEFAULT_MODEL_NAME, normalize_query(query), results_hash)
+
+_result_cache: Optional[BaseCache] = None
+_summary_cache: Optional[BaseCache] = None
+_caches_initialized = False
+_caches_lock = threading.Lock()
+# Concurrent identical searches / summarizations share one in-flight call
+_search_flights = SingleFlight()
+_summary_flights = SingleFlight()
+
+def _create_web_search_cache(table: str, ttl: float) -> Optional[BaseCache]:
     try:
-        genai.configure(api_key=API_KEY)
-        LLM_CLIENT_INITIALIZED = True
-        logger.info("Genai configured successfully for web search summarization.")
+        return create_cache(
+            WEB_SEARCH_CACHE_BACKEND,
+            max_size=WEB_SEARCH_CACHE_MAX_SIZE,
+            default_ttl=ttl,
+            path=WEB_SEARCH_CACHE_PATH,
+            table=table,
+        )
     except Exception as e:
-        logger.error(f"Error configuring genai for summarization: {e}")
-else:
-    logger.warning("GEMINI_API_KEY not found. Web search summarization will be disabled.")
+        logger.warning(f"Could not create web search cache '{table}' ({WEB_SEARCH_CACHE_BACKEND}): {e}. Falling back to in-memory.")
+        return LRUCache(max_size=WEB_SEARCH_CACHE_MAX_SIZE, default_ttl=ttl)
+
+def get_web_search_caches() -> Tuple[Optional[BaseCache], Optional[BaseCache]]:
+    """Returns the process-wide (results, summaries) caches, creating them on first use. None if disabled."""
+    global _result_cache, _summary_cache, _caches_initialized
+    if _caches_initialized:
+        return _result_cache, _summary_cache
+    with _caches_lock:
+        if not _caches_initialized:
+            _result_cache = _create_web_search_cache("web_search_results", WEB_SEARCH_RESULTS_TTL)
+            _summary_cache = _create_web_search_cache("web_search_summaries", WEB_SEARCH_SUMMARY_TTL)
+            _caches_initialized = True
+    return _result_cache, _summary_cache
+
+def clear_web_search_cache() -> None:
+    """Removes every cached search result and summary."""
+    for cache in get_web_search_caches():
+        if cache is not None:
+            cache.clear()
+
+async def _fetch_search_results(query: str) -> List[Dict[str, str]]:
+    """Runs the DuckDuckGo search and stores the results in the cache."""
+    async with DDGS() as ddgs:
+        results = await ddgs.atext(query, max_results=WEB_SEARCH_MAX_RESULTS)
+    results = [
+        {'title': result.get('title', 'No Title'), 'href': result.get('href', 'No URL'), 'body': result.get('body', 'No Snippet')}
+        for result in results or []
+    ]
+    result_cache, _ = get_web_search_caches()
+    if result_cache is not None:
+        if results:
+            result_cache.set(search_results_key(query), results)
+        elif WEB_SEARCH_EMPTY_TTL > 0:
+            result_cache.set(search_results_key(query), results, ttl=WEB_SEARCH_EMPTY_TTL)
+    return results
+
+async def search_results(query: str) -> List[Dict[str, str]]:
+    """Search results for `query`: from the cache, from an identical in-flight search, or a new search."""
+    key = search_results_key(query)
+    result_cache, _ = get_web_search_caches()
+    if result_cache is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            logger.info(f"Web search results for '{query}' served from cache.")
+            return cached
+    return await _search_flights.do(key, lambda: _fetch_search_results(query))
+
+async def _summarize_results(query: str, full_raw_text: str, summary_key: str) -> Optional[str]:
+    """Summarizes the search results with the LLM and caches the summary. None if the call fails."""
+    registry = get_llm_client_registry()
+    try:
+        logger.info(f"Attempting to summarize web search results for query: '{query}'")
+        summary_prompt = (
+            f"Based on the following web search results for the query '{query}', "
+            f"provide a concise summary in English answering the query. "
+            f"Focus on the most relevant information and synthesize the findings. "
+            f"Do not just list the results. Aim for 2-4 sentences.\n\n"
+            f"Search Results Snippets:\n{full_raw_text}"
+        )
+        # The registry bounds per-model concurrency and waits for rate-limit quota
+        response = await registry.generate_content(
+            DEFAULT_MODEL_NAME,
+            contents=[Content(parts=[Part(text=summary_prompt)])]
+        )
+        summary = response.text
+        logger.info("Successfully summarized web search results.")
+    except Exception as e:
+        logger.error(f"Error during LLM summarization for query '{query}': {e}", exc_info=True)
+        return None # Proceed without summary if LLM fails
+    _, summary_cache = get_web_search_caches()
+    if summary and summary_cache is not None:
+        summary_cache.set(summary_key, summary)
+    return summary
 
 async def web_search(query: str) -> str:
     """
     Searches the web for the given query using DuckDuckGo, summarizes the results using an LLM,
     and returns the summary or raw results if summarization fails.
+    Results and summaries of recent identical queries are reused from a cache.
 
     Args:
         query: The search query string.
@@ -45,9 +160,7 @@ async def web_search(query: str) -> str:
     """
     logger.info(f"Performing web search for query: {query}")
     try:
-        async with DDGS() as ddgs:
-            # Fetch slightly more results to provide better context for summarization
-            results = await ddgs.atext(query, max_results=7)
+        results = await search_results(query)
 
         if not results:
             logger.info("No search results found.")
@@ -56,41 +169,33 @@ async def web_search(query: str) -> str:
         formatted_results = ""
         raw_content_for_summary = []
         for i, result in enumerate(results, 1):
-            title = result.get('title', 'No Title')
-            url = result.get('href', 'No URL')
-            body = result.get('body', 'No Snippet')
+            title = result['title']
+            url = result['href']
+            body = result['body']
             formatted_results += f"{i}. {title}\n   URL: {url}\n   Snippet: {body}\n\n"
             # Collect content for the summary prompt
             raw_content_for_summary.append(f"Title: {title}\nSnippet: {body}")
 
         # --- LLM Summarization ---
         summary = None
-        if LLM_CLIENT_INITIALIZED and raw_content_for_summary:
-            # Only summarize if there's enough content and LLM is ready
-            full_raw_text = "\n\n".join(raw_content_for_summary)
-            # Heuristic: Summarize only if the combined text is reasonably long
-            if len(full_raw_text) > 200: # Avoid summarizing very short results
-                try:
-                    logger.info(f"Attempting to summarize web search results for query: '{query}'")
-                    model = genai.GenerativeModel(DEFAULT_MODEL_NAME)
-                    summary_prompt = (
-                        f"Based on the following web search results for the query '{query}', "
-                        f"provide a concise summary in English answering the query. "
-                        f"Focus on the most relevant information and synthesize the findings. "
-                        f"Do not just list the results. Aim for 2-4 sentences.\n\n"
-                        f"Search Results Snippets:\n{full_raw_text}"
-                    )
-                    # Use generate_content_async for async operation
-                    response = await model.generate_content_async(summary_prompt)
-                    summary = response.text
-                    logger.info("Successfully summarized web search results.")
-                except Exception as e:
-                    logger.error(f"Error during LLM summarization for query '{query}': {e}", exc_info=True)
-                    # Proceed without summary if LLM fails
+        registry = get_llm_client_registry()
+        llm_available = registry.is_available()
+        full_raw_text = "\n\n".join(raw_content_for_summary)
+        # Heuristic: Summarize only if the combined text is reasonably long
+        should_summarize = len(full_raw_text) > 200 # Avoid summarizing very short results
+        if should_summarize:
+            summary_key = search_summary_key(query, results)
+            _, summary_cache = get_web_search_caches()
+            summary = summary_cache.get(summary_key) if summary_cache is not None else None
+            if summary is not None:
+                logger.info(f"Web search summary for '{query}' served from cache.")
+            elif llm_available:
+                # Only summarize if there's enough content and LLM is ready
+                summary = await _summary_flights.do(summary_key, lambda: _summarize_results(query, full_raw_text, summary_key))
             else:
-                logger.info("Search results too short, skipping summarization.")
-        elif not LLM_CLIENT_INITIALIZED:
-             logger.warning("LLM client not initialized, skipping summarization.")
+                logger.warning("LLM client not initialized, skipping summarization.")
+        else:
+            logger.info("Search results too short, skipping summarization.")
         # --- End LLM Summarization ---
 
         if summary:
@@ -106,7 +211,7 @@ async def web_search(query: str) -> str:
             logger.info(f"Web search successful (no summary). Returning raw results for query: '{query}'")
             # Add a note if summarization failed due to an error
             error_note = ""
-            if LLM_CLIENT_INITIALIZED and len(raw_content_for_summary) > 0 and len(full_raw_text) > 200 and summary is None : # Check if summary attempt was expected but failed
+            if llm_available and should_summarize and summary is None : # Check if summary attempt was expected but failed
                  error_note = "\n(Note: Summarization failed, showing raw results)"
             return f"Web Search Results for '{query}':{error_note}\n\n{formatted_results.strip()}"
 
@@ -1,7 +1,11 @@
 # tests/components/test_response_generator.py
+import asyncio
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
-from src.jarvis.components.response_generator import ResponseGenerator
+from src.jarvis.components.response_generator import (
+    ResponseGenerator, segment_text, segment_markdown, protect_inline_code, restore_inline_code,
+)
+from src.jarvis.core.request_context import RequestContext
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,15 +34,22 @@ async def test_generate_response_english_input(response_generator):
     final_response = await response_generator.generate_response(result, lang)
     assert final_response == result
 
+def _fake_translation_stream(*chunks):
+    """Builds a translate_text_stream stand-in that yields the given chunks."""
+    async def fake_stream(text, target_language, source_language):
+        for chunk in chunks:
+            yield chunk
+    return fake_stream
+
 @pytest.mark.asyncio
-async def test_generate_response_non_english_placeholder(response_generator):
-    """6: generate_response 기본 동작 (비영어 입력, Placeholder)"""
+async def test_generate_response_non_english_translated(response_generator):
+    """6: generate_response 기본 동작 (비영어 입력, 번역)"""
     result = "Test result string."
     lang = "ko"
-    final_response = await response_generator.generate_response(result, lang)
-    expected_prefix = "(In English, as translation is not yet implemented):"
-    assert final_response.startswith(expected_prefix)
-    assert result in final_response
+    with patch('src.jarvis.components.response_generator.translate_text_stream', side_effect=_fake_translation_stream("테스트 ", "결과 문자열.")) as mock_stream:
+        final_response = await response_generator.generate_response(result, lang)
+    assert final_response == "테스트 결과 문자열."
+    mock_stream.assert_called_once_with(result, target_language=lang, source_language='en')
 
 @pytest.mark.asyncio
 async def test_generate_response_none_input(response_generator):
@@ -151,15 +162,134 @@ async def test_generate_response_str_conversion_error(response_generator, caplog
     assert "Error converting agent result to string" in caplog.text
     assert "Cannot convert this object to string" in caplog.text
 
-# Test for placeholder translation note (can be removed/modified when translation is implemented)
 @pytest.mark.asyncio
-async def test_generate_response_translation_placeholder(response_generator):
-    """Tests that the placeholder translation note is added for non-English."""
+async def test_generate_response_stream_yields_translation_chunks(response_generator):
+    """Tests that translated chunks are streamed as they arrive for non-English."""
     english_result = "Test result"
     original_language = "ko" # Non-English
-    expected_prefix = "(In English, as translation is not yet implemented):"
-    
-    actual_response = await response_generator.generate_response(english_result, original_language)
-    
-    assert actual_response.startswith(expected_prefix)
-    assert english_result in actual_response 
\ No newline at end of file
+
+    with patch('src.jarvis.components.response_generator.translate_text_stream', side_effect=_fake_translation_stream("테스트", " 결과")):
+        chunks = [chunk async for chunk in response_generator.generate_response_stream(english_result, original_language)]
+
+    assert chunks == ["테스트", " 결과"]
+
+@pytest.mark.asyncio
+async def test_generate_response_stream_english_single_chunk(response_generator):
+    """Tests that English responses are streamed as one chunk without translation."""
+    with patch('src.jarvis.components.response_generator.translate_text_stream') as mock_stream:
+        chunks = [chunk async for chunk in response_generator.generate_response_stream("Test result", "en")]
+
+    assert chunks == ["Test result"]
+    mock_stream.assert_not_called() 
+@pytest.mark.asyncio
+async def test_generate_response_uses_request_context_language(response_generator):
+    """The original language falls back to the request context when not passed explicitly."""
+    request_context = RequestContext(user_input="q", original_language="en")
+
+    actual_response = await response_generator.generate_response("Test result", None, request_context=request_context)
+
+    assert actual_response == "Test result"
+
+def test_segment_text_splits_paragraphs_and_sentences():
+    """Segments break at sentence/paragraph boundaries and rejoin to the original text."""
+    text = "First sentence. Second one!\n\nNew paragraph? Yes.\n"
+
+    segments = segment_text(text, max_chars=10)
+
+    assert [segment for segment, _ in segments] == ["First sentence.", "Second one!", "New paragraph?", "Yes."]
+    assert "".join(segment + separator for segment, separator in segments) == text
+
+def test_segment_text_groups_short_sentences():
+    """Short sentences of one paragraph share a segment up to max_chars."""
+    segments = segment_text("One. Two. Three.\n\nFour.", max_chars=100)
+
+    assert segments == [("One. Two. Three.", "\n\n"), ("Four.", "")]
+
+@pytest.mark.asyncio
+async def test_generate_response_segments_translated_concurrently_in_order():
+    """Later segments are translated concurrently (bounded) and emitted in input order."""
+    generator = ResponseGenerator(max_concurrency=2, segment_max_chars=10)
+    english_result = "Alpha one. Bravo two. Charlie three. Delta four."
+    delays = {"Bravo two.": 0.03, "Charlie three.": 0.02, "Delta four.": 0.01}
+    in_flight = 0
+    peak = 0
+
+    async def fake_translate(text, target_language, source_language):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Earlier segments finish last, so completion order differs from input order
+        await asyncio.sleep(delays[text])
+        in_flight -= 1
+        return f"<{text}>"
+
+    with patch('src.jarvis.components.response_generator.translate_text_stream', side_effect=_fake_translation_stream("<Alpha one.>")) as mock_stream, \
+         patch('src.jarvis.components.response_generator.translate_text', side_effect=fake_translate) as mock_translate:
+        chunks = [chunk async for chunk in generator.generate_response_stream(english_result, "ko")]
+
+    assert "".join(chunks) == "<Alpha one.> <Bravo two.> <Charlie three.> <Delta four.>"
+    assert chunks[0] == "<Alpha one.>"
+    mock_stream.assert_called_once_with("Alpha one.", target_language="ko", source_language='en')
+    assert mock_translate.call_count == 3
+    assert peak <= 2
+
+@pytest.mark.asyncio
+async def test_generate_response_fixed_message_from_translation_memory(response_generator):
+    """Pre-seeded fixed messages are answered from the translation memory without an LLM call."""
+    with patch('src.jarvis.components.response_generator.translate_text_stream') as mock_stream, \
+         patch('src.jarvis.components.response_generator.translate_text') as mock_translate:
+        final_response = await response_generator.generate_response("Error: Failed to parse your input.", "ko")
+
+    assert final_response == "오류: 입력을 분석하지 못했습니다."
+    mock_stream.assert_not_called()
+    mock_translate.assert_not_called()
+
+CODING_ANSWER = """Use `os.path.join` to build paths.
+
+```python
+import os
+print(os.path.join("a", "b"))
+```
+
+See https://docs.python.org/3/library/os.path.html for details."""
+
+def test_segment_markdown_marks_code_untranslatable():
+    """Fenced code blocks and word-less segments are not translated; the text rejoins losslessly."""
+    segments = segment_markdown(CODING_ANSWER)
+
+    assert "".join(segment + separator for segment, separator, _ in segments) == CODING_ANSWER
+    assert [segment for segment, _, translatable in segments if translatable] == [
+        "Use `os.path.join` to build paths.",
+        "See https://docs.python.org/3/library/os.path.html for details.",
+    ]
+
+@pytest.mark.asyncio
+async def test_generate_response_translates_only_prose():
+    """Code blocks, inline code and URLs are never sent for translation and come back untouched."""
+    generator = ResponseGenerator()
+
+    async def fake_translate(text, target_language, source_language):
+        return text.replace("Use", "사용:").replace("See", "참고:")
+
+    with patch('src.jarvis.components.response_generator.translate_text_stream') as mock_stream, \
+         patch('src.jarvis.components.response_generator.translate_text', side_effect=fake_translate) as mock_translate:
+        final_response = await generator.generate_response(CODING_ANSWER, "ko")
+
+    sent = [call.args[0] for call in mock_translate.call_args_list]
+    assert all("import os" not in text and "os.path.join" not in text and "https://" not in text for text in sent)
+    mock_stream.assert_not_called() # The first prose segment holds inline code, so it is not streamed
+    assert final_response == CODING_ANSWER.replace("Use", "사용:").replace("See", "참고:")
+
+@pytest.mark.asyncio
+async def test_generate_response_keeps_english_when_placeholder_lost():
+    """A translation that drops an inline-code placeholder falls back to the English segment."""
+    with patch('src.jarvis.components.response_generator.translate_text', new=AsyncMock(return_value="번역됨")):
+        final_response = await ResponseGenerator().generate_response("Call `run()` now.", "ko")
+
+    assert final_response == "Call `run()` now."
+
+def test_protect_and_restore_inline_code():
+    masked, protected = protect_inline_code("Run `pip install x` from https://pypi.org/project/x.")
+    assert "`" not in masked and "https://" not in masked
+    assert protected == ["`pip install x`", "https://pypi.org/project/x"]
+    assert restore_inline_code(masked, protected) == "Run `pip install x` from https://pypi.org/project/x."
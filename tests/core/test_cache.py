@@ -0,0 +1,138 @@
+# tests/core/test_cache.py
+import asyncio
+import time
+import pytest
+from src.jarvis.core.cache import LRUCache, SQLiteCache, SingleFlight, TieredCache, create_cache, hash_key
+
+def test_hash_key_is_stable_and_separated():
+    """Keys are deterministic and part boundaries matter."""
+    assert hash_key("a", "b") == hash_key("a", "b")
+    assert hash_key("ab", "c") != hash_key("a", "bc")
+
+def test_lru_cache_hit_miss_counters():
+    """get() updates hit/miss counters."""
+    cache = LRUCache(max_size=10)
+    assert cache.get("missing") is None
+    cache.set("k", {"v": 1})
+    assert cache.get("k") == {"v": 1}
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.hit_rate == 0.5
+
+def test_lru_cache_evicts_least_recently_used():
+    """The least recently used entry is evicted once max_size is exceeded."""
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # 'b' is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+def test_lru_cache_ttl_expiry():
+    """Entries past their TTL are treated as misses."""
+    cache = LRUCache(max_size=10, default_ttl=0.05)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats.expirations == 1
+
+def test_sqlite_cache_persists_between_instances(tmp_path):
+    """Values written by one SQLiteCache are visible to another on the same file."""
+    path = str(tmp_path / "cache.sqlite3")
+    writer = SQLiteCache(path, table="test_cache")
+    writer.set("k", {"intent": "greeting"})
+    reader = SQLiteCache(path, table="test_cache")
+    assert reader.get("k") == {"intent": "greeting"}
+    assert reader.delete("k") is True
+    assert writer.get("k") is None
+
+def test_sqlite_cache_enforces_max_size(tmp_path):
+    """The oldest-accessed rows are pruned beyond max_size."""
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+
+def test_sqlite_cache_checks_size_periodically(tmp_path, monkeypatch):
+    """Rows are counted once per size_check_interval writes, not on every write; expired rows are pruned first."""
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_size=100, size_check_interval=10)
+    size_checks = []
+    enforce_max_size = cache._enforce_max_size
+
+    def counting_enforce_max_size():
+        size_checks.append(1)
+        enforce_max_size()
+
+    monkeypatch.setattr(cache, "_enforce_max_size", counting_enforce_max_size)
+    cache.set("expired", 0, ttl=0.01)
+    time.sleep(0.02)
+    for i in range(109):
+        cache.set(f"k{i}", i)
+
+    assert len(size_checks) == 11
+    assert len(cache) == 100 # 110 rows at the last check: the expired one and the 9 oldest are pruned
+    assert cache.stats.expirations == 1 and cache.stats.evictions == 9
+    assert cache.get("k0") is None and cache.get("k9") == 9
+
+def test_create_cache_backends(tmp_path):
+    """create_cache builds the configured backend."""
+    assert create_cache("none") is None
+    assert isinstance(create_cache("memory"), LRUCache)
+    assert isinstance(create_cache("sqlite", path=str(tmp_path / "c.sqlite3")), SQLiteCache)
+    with pytest.raises(ValueError):
+        create_cache("sqlite")
+    assert isinstance(create_cache("tiered", path=str(tmp_path / "t.sqlite3")), TieredCache)
+    with pytest.raises(ValueError):
+        create_cache("tiered")
+    with pytest.raises(ValueError):
+        create_cache("redis")
+
+def test_tiered_cache_promotes_persistent_hits(tmp_path):
+    """Entries written by one process are served from disk and then from memory."""
+    path = str(tmp_path / "tiered.sqlite3")
+    TieredCache(LRUCache(), SQLiteCache(path, table="tiered")).set("k", "v")
+
+    cache = TieredCache(LRUCache(), SQLiteCache(path, table="tiered"))
+    assert cache.get("k") == "v"
+    assert cache.memory.get("k") == "v"
+    assert cache.get("missing") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+def test_tiered_cache_promotion_keeps_remaining_ttl(tmp_path):
+    """A promoted entry expires from memory when its persistent copy does, not after a fresh TTL."""
+    path = str(tmp_path / "tiered.sqlite3")
+    TieredCache(LRUCache(), SQLiteCache(path, table="tiered")).set("k", "v", ttl=0.3)
+
+    cache = TieredCache(LRUCache(default_ttl=60), SQLiteCache(path, table="tiered"))
+    value, expires_at = cache.get_with_expiry("k")
+    assert value == "v"
+    assert expires_at - time.time() <= 0.3
+    assert cache.memory.get_with_expiry("k")[1] == pytest.approx(expires_at, abs=0.05)
+    time.sleep(0.35)
+    assert cache.memory.get("k") is None
+    assert cache.get("k") is None
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_in_flight_work():
+    """Concurrent calls with one key run the factory once; later calls run it again."""
+    flights = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flights.do("k", work) for _ in range(4)))
+    assert results == [1, 1, 1, 1]
+    assert flights.shared == 3
+    assert await flights.do("k", work) == 2
+    assert len(flights) == 0
@@ -1,7 +1,8 @@
 # tests/core/test_context_manager.py
+import asyncio
 import pytest
 from collections import deque
-from src.jarvis.core.context_manager import ContextManager
+from src.jarvis.core.context_manager import ContextManager, SessionHistory, message_nbytes
 
 @pytest.fixture
 def context_manager():
@@ -113,4 +114,177 @@ def test_clear_history_non_existent(context_manager, caplog):
     context_manager.clear_history("non_existent_session")
     assert "Attempted to clear history for non-existent session_id: non_existent_session" in caplog.text
     # Ensure no new entry was created
-    assert "non_existent_session" not in context_manager.session_histories 
\ No newline at end of file
+    assert "non_existent_session" not in context_manager.session_histories
+
+def test_session_store_evicts_least_recently_used_session():
+    """Beyond max_sessions the least recently used session is evicted."""
+    manager = ContextManager(max_sessions=2)
+    manager.add_message("s1", "Q1", "A1", "en")
+    manager.add_message("s2", "Q2", "A2", "en")
+    manager.get_formatted_context("s1")  # s2 is now least recently used
+    manager.add_message("s3", "Q3", "A3", "en")
+
+    assert list(manager.session_histories) == ["s1", "s3"]
+    assert manager.stats()["evictions"] == 1
+
+def test_session_store_enforces_byte_budget():
+    """Sessions are evicted until the resident bytes fit the budget; the writing session is kept."""
+    message_size = message_nbytes(("Q" * 100, "A" * 100, "en"))
+    manager = ContextManager(max_bytes=message_size * 2)
+    for session_id in ("s1", "s2", "s3"):
+        manager.add_message(session_id, "Q" * 100, "A" * 100, "en")
+
+    stats = manager.stats()
+    assert stats["sessions"] == 2
+    assert stats["resident_bytes"] == message_size * 2
+    assert "s1" not in manager.session_histories
+
+def test_session_store_tracks_bytes_when_turns_roll_over():
+    """Bytes of turns dropped by maxlen are subtracted from the gauge."""
+    manager = ContextManager(max_turns=2)
+    for i in range(5):
+        manager.add_message("s1", f"Q{i}", f"A{i}", "en")
+    history = manager.session_histories["s1"]
+    assert manager.stats()["resident_bytes"] == sum(message_nbytes(message) for message in history)
+
+    manager.clear_history("s1")
+    assert manager.stats()["resident_bytes"] == 0
+
+def test_session_store_expires_idle_sessions(monkeypatch):
+    """Sessions idle longer than idle_ttl are expired on access and by sweeps."""
+    clock = [1000.0]
+    monkeypatch.setattr("src.jarvis.core.context_manager.time.monotonic", lambda: clock[0])
+    manager = ContextManager(idle_ttl=60, sweep_interval=0)
+    manager.add_message("idle", "Q1", "A1", "en")
+    manager.add_message("active", "Q2", "A2", "en")
+
+    clock[0] += 45
+    manager.get_formatted_context("active")
+    clock[0] += 30  # 'idle' is now 75s idle, 'active' 30s
+
+    assert manager.sweep_sessions() == 1
+    assert "idle" not in manager.session_histories
+    assert manager.get_formatted_context("active") == "User: Q2\nAI: A2"
+
+    clock[0] += 120
+    assert manager.get_formatted_context("active") == ""
+    assert manager.stats()["expirations"] == 2
+
+def test_formatted_context_is_memoized():
+    """Repeated reads return the memoized rendering without rebuilding it."""
+    manager = ContextManager()
+    manager.add_message("s1", "Q1", "A1", "en")
+    manager.add_message("s1", "Q2", "A2", "en")
+
+    first = manager.get_formatted_context("s1", max_history=5)
+    assert manager.get_formatted_context("s1", max_history=5) is first
+
+def test_rendered_windows_update_incrementally_as_turns_roll_over():
+    """Memoized windows slide with every append, including turns dropped by maxlen."""
+    history = SessionHistory(maxlen=3)
+    history.append(("Q0", "A0", "en"))
+    assert history.render(2) == "User: Q0\nAI: A0"
+    assert history.render(10) == "User: Q0\nAI: A0"
+
+    for i in range(1, 5):
+        history.append((f"Q{i}", f"A{i}", "en"))
+
+    assert history.render(2) == "User: Q3\nAI: A3\nUser: Q4\nAI: A4"
+    assert history.render(10) == "User: Q2\nAI: A2\nUser: Q3\nAI: A3\nUser: Q4\nAI: A4"
+    history.clear()
+    assert history.render(2) == ""
+
+def test_formatted_context_respects_token_budget():
+    """Only the newest turns that fit the token budget are returned."""
+    manager = ContextManager(max_turn_tokens=0)
+    for i in range(4):
+        manager.add_message("s1", f"Q{i}" + "q" * 38, f"A{i}" + "a" * 38, "en")  # ~21 tokens per turn
+
+    formatted = manager.get_formatted_context("s1", max_history=5, token_budget=50)
+
+    assert formatted.count("User: ") == 2
+    assert "Q2" in formatted and "Q3" in formatted and "Q1" not in formatted
+    # Without a budget the turn count alone applies
+    assert manager.get_formatted_context("s1", max_history=5, token_budget=0).count("User: ") == 4
+
+def test_oversized_turn_is_truncated_with_marker():
+    """A huge turn is cut to max_turn_tokens at write time and marked as truncated."""
+    manager = ContextManager(max_turn_tokens=100, token_budget=0)
+    manager.add_message("s1", "Please review:\n" + "x = 1\n" * 2000, "Looks fine.", "en")
+
+    formatted = manager.get_formatted_context("s1")
+
+    assert "…[truncated" in formatted
+    assert "AI: Looks fine." in formatted
+    assert len(formatted) < 600
+    # The stored message itself is kept intact
+    assert len(manager.session_histories["s1"][0][0]) > 10000
+
+def test_newest_turn_larger_than_budget_is_truncated_to_fit():
+    manager = ContextManager(max_turn_tokens=0)
+    manager.add_message("s1", "Q" * 400, "A" * 400, "en")
+
+    formatted = manager.get_formatted_context("s1", token_budget=20)
+
+    assert formatted.startswith("User: ")
+    assert formatted.count("…[truncated") == 2
+
+class FakeSummarizer:
+    """Records calls and returns a summary naming the folded turns."""
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, previous_summary, turns):
+        self.calls.append((previous_summary, turns))
+        await self.release.wait()
+        folded = ",".join(turn.split("\n")[0][len("User: "):] for turn in turns)
+        return f"{previous_summary}+{folded}" if previous_summary else folded
+
+@pytest.mark.asyncio
+async def test_rolling_summary_replaces_older_turns():
+    """After N turns the older ones are summarized; context is summary plus recent raw turns."""
+    summarizer = FakeSummarizer()
+    manager = ContextManager(summarizer=summarizer, summarize_after=4, summary_keep_turns=2, token_budget=0)
+    for i in range(4):
+        manager.add_message("s1", f"Q{i}", f"A{i}", "en")
+    await manager.wait_for_summaries()
+
+    assert summarizer.calls == [(None, ["User: Q0\nAI: A0", "User: Q1\nAI: A1"])]
+    assert manager.get_formatted_context("s1") == (
+        "Summary of earlier conversation: Q0,Q1\nUser: Q2\nAI: A2\nUser: Q3\nAI: A3"
+    )
+
+    for i in range(4, 6):
+        manager.add_message("s1", f"Q{i}", f"A{i}", "en")
+    await manager.wait_for_summaries()
+
+    assert summarizer.calls[1] == ("Q0,Q1", ["User: Q2\nAI: A2", "User: Q3\nAI: A3"])
+    assert manager.get_formatted_context("s1").startswith("Summary of earlier conversation: Q0,Q1+Q2,Q3\nUser: Q4")
+
+@pytest.mark.asyncio
+async def test_summarization_runs_in_background():
+    """add_message returns immediately; the summary appears once the background task finishes."""
+    summarizer = FakeSummarizer()
+    summarizer.release.clear()
+    manager = ContextManager(summarizer=summarizer, summarize_after=2, summary_keep_turns=1, token_budget=0)
+    manager.add_message("s1", "Q0", "A0", "en")
+    manager.add_message("s1", "Q1", "A1", "en")
+    await asyncio.sleep(0)
+
+    assert len(summarizer.calls) == 1
+    assert manager.get_formatted_context("s1") == "User: Q0\nAI: A0\nUser: Q1\nAI: A1"
+
+    summarizer.release.set()
+    await manager.wait_for_summaries()
+    assert manager.get_formatted_context("s1") == "Summary of earlier conversation: Q0\nUser: Q1\nAI: A1"
+
+def test_no_summarization_without_event_loop():
+    """Synchronous callers never start summarization."""
+    summarizer = FakeSummarizer()
+    manager = ContextManager(summarizer=summarizer, summarize_after=2, summary_keep_turns=1)
+    for i in range(3):
+        manager.add_message("s1", f"Q{i}", f"A{i}", "en")
+    assert summarizer.calls == []
+
@@ -1,7 +1,7 @@
 import pytest
 import inspect # inspect 모듈 임포트
 import asyncio # 비동기 테스트를 위해 추가
-from unittest.mock import patch, MagicMock, AsyncMock # <<< Added for mocking LLM call
+from unittest.mock import patch, MagicMock, AsyncMock, ANY # <<< Added for mocking LLM call
 # Mock 사용 금지 - from unittest.mock import AsyncMock, MagicMock, patch
 import dotenv # For loading .env
 import uuid # For session IDs
@@ -28,9 +28,11 @@ from google.adk.tools import BaseTool # <<< Import BaseTool
 from google.adk.events import Event # <<< Import Event
 
 from src.jarvis.core.dispatcher import JarvisDispatcher, AGENT_HUB_DISCOVER_URL, DelegationInfo # <<< Import DelegationInfo
+from src.jarvis.core.request_context import RequestContext
 from src.jarvis.components.input_parser import InputParserAgent # 필요한 경우 임포트
 from src.jarvis.models.input import ParsedInput # ParsedInput 임포트
 from src.jarvis.core.context_manager import ContextManager # <<< Import ContextManager
+from src.jarvis.tools.code_execution_tool import SANDBOX_SESSION_STATE_KEY
 
 APP_NAME = "jarvis-test-no-mock"
 USER_ID = "test-user-no-mock"
@@ -381,15 +383,13 @@ class TestJarvisDispatcherReal:
             pytest.fail(f"Test failed due to exception during run_async: {execution_error}")
 
         if expect_delegation_to:
-            # Update the expected message format to match the actual system message
-            expected_delegation_message = f"[System] Delegating to {expect_delegation_to}. Runner should invoke.".lower()
-            actual_response_lower = final_response_text.lower()
-            print(f"[Test Assertion] Checking if '{actual_response_lower}' contains '{expected_delegation_message}'")
-            assert expected_delegation_message in actual_response_lower, (\
-                f"Expected final response to indicate delegation to '{expect_delegation_to}'. "
-                f"Expected substring: '{expected_delegation_message}', Actual response: '{final_response_text}'"
+            # The dispatcher runs the delegated agent itself, so its events appear in the stream
+            delegated_agent_invoked = any(getattr(event, 'author', None) == expect_delegation_to for event in events)
+            assert delegated_agent_invoked, (
+                f"Expected events from delegated agent '{expect_delegation_to}'. "
+                f"Events captured: {[(getattr(e, 'author', 'N/A'), type(e).__name__) for e in events]}"
             )
-            print(f"[Test Assertion] Successfully found delegation message for {expect_delegation_to} in response.")
+            print(f"[Test Assertion] Successfully found events from {expect_delegation_to}.")
 
         elif expect_no_delegation_reason:
             # Check if the final response text contains the expected reason
@@ -887,6 +887,170 @@ async def test_a2a_placeholder_return_message_mocked(mock_dispatcher_and_deps):
     assert final_response == expected_message, \
            f"Expected final message \'{expected_message}\', but got \'{final_response}\'"
 
+# --- Routing Cache Tests ---
+
+@pytest.mark.asyncio
+async def test_process_request_routing_cache_skips_llm(mock_dispatcher_and_deps):
+    """같은 (intent, domain)의 두 번째 요청은 위임 LLM 호출 없이 캐시된 결정을 사용하는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    mock_response = MagicMock(spec=GenerateContentResponse)
+    mock_response.text = "CodingAgent"
+    mock_llm_client.aio.models.generate_content.return_value = mock_response
+    mock_input_parser.process_input.return_value = ParsedInput(
+        original_text="q", original_language="en", english_text="write a sort function",
+        intent="custom_intent", domain="custom_domain"
+    )
+
+    first = await dispatcher.process_request("write a sort function")
+    second = await dispatcher.process_request("write a parser")
+
+    assert first["agent_name"] == second["agent_name"] == "CodingAgent"
+    assert mock_llm_client.aio.models.generate_content.call_count == 1
+    assert dispatcher.routing_cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_register_agent_invalidates_routing_cache(mock_dispatcher_and_deps):
+    """register_agent 호출 시 캐시된 위임 결정이 무효화되는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    mock_response = MagicMock(spec=GenerateContentResponse)
+    mock_response.text = "CodingAgent"
+    mock_llm_client.aio.models.generate_content.return_value = mock_response
+    mock_input_parser.process_input.return_value = ParsedInput(
+        original_text="q", original_language="en", english_text="q",
+        intent="custom_intent", domain="custom_domain"
+    )
+
+    await dispatcher.process_request("q")
+    dispatcher.register_agent(LlmAgent(name="ExtraAgent", model="mock-model"))
+    await dispatcher.process_request("q")
+
+    assert mock_llm_client.aio.models.generate_content.call_count == 2
+
+@pytest.mark.asyncio
+async def test_process_request_embedding_strategy_skips_llm(mock_dispatcher_and_deps):
+    """routing_strategy='embedding'이면 확신 가능한 요청은 위임 LLM 호출 없이 라우팅되는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    dispatcher.routing_strategy = "embedding"
+    mock_input_parser.process_input.return_value = ParsedInput(
+        original_text="q", original_language="en", english_text="Create a simple web server in python"
+    )
+
+    result = await dispatcher.process_request("Create a simple web server in python")
+
+    assert result["agent_name"] == "CodingAgent"
+    mock_llm_client.aio.models.generate_content.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_process_request_routing_table_skips_llm(mock_dispatcher_and_deps):
+    """라우팅 테이블 규칙과 일치하는 intent는 위임 LLM 호출 없이 라우팅되는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    dispatcher.intent_routing_table.load_rules([{"intent": "code_generation", "agent": "CodingAgent"}])
+    mock_input_parser.process_input.return_value = ParsedInput(
+        original_text="q", original_language="en", english_text="write a sort function",
+        intent="code_generation", domain="coding"
+    )
+
+    result = await dispatcher.process_request("write a sort function")
+
+    assert result["agent_name"] == "CodingAgent"
+    mock_llm_client.aio.models.generate_content.assert_not_called()
+    assert dispatcher.routing_stats()["routing_table"]["resolved"] == 1
+
+# --- Speculative Routing Pipeline Tests ---
+
+@pytest.mark.asyncio
+async def test_process_request_speculative_routing_overlaps_parsing(mock_dispatcher_and_deps):
+    """투기적 모드에서 위임 LLM 호출이 파싱과 동시에 원문으로 시작되고 그 결정이 사용되는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    dispatcher.speculative_routing = True
+    llm_started_before_parse_done = asyncio.Event()
+
+    async def slow_parse(user_input):
+        await asyncio.sleep(0.01)
+        assert mock_llm_client.aio.models.generate_content.called
+        llm_started_before_parse_done.set()
+        return ParsedInput(original_text=user_input, original_language="ko", english_text="write a sort function",
+                           intent="custom_intent", domain="custom_domain")
+
+    mock_input_parser.process_input.side_effect = slow_parse
+    mock_response = MagicMock(spec=GenerateContentResponse)
+    mock_response.text = "CodingAgent"
+    mock_llm_client.aio.models.generate_content.return_value = mock_response
+
+    result = await dispatcher.process_request("정렬 함수 작성해줘")
+
+    assert llm_started_before_parse_done.is_set()
+    assert result["agent_name"] == "CodingAgent"
+    assert mock_llm_client.aio.models.generate_content.call_count == 1
+    prompt = mock_llm_client.aio.models.generate_content.call_args.kwargs["contents"][0].parts[0].text
+    assert "정렬 함수 작성해줘" in prompt
+    assert dispatcher.speculation_stats["used"] == 1
+
+@pytest.mark.asyncio
+async def test_process_request_speculative_routing_cancelled_on_local_decision(mock_dispatcher_and_deps):
+    """로컬 라우팅(테이블)으로 결정되면 투기적 위임 호출이 취소되는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    dispatcher.speculative_routing = True
+    dispatcher.intent_routing_table.load_rules([{"intent": "code_generation", "agent": "CodingAgent"}])
+    llm_cancelled = asyncio.Event()
+
+    async def never_finishing_llm(*args, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            llm_cancelled.set()
+            raise
+
+    mock_llm_client.aio.models.generate_content.side_effect = never_finishing_llm
+    parsed = ParsedInput(
+        original_text="q", original_language="en", english_text="write a sort function",
+        intent="code_generation", domain="coding"
+    )
+
+    async def parse_after_yield(*args, **kwargs):
+        await asyncio.sleep(0) # 투기적 위임 호출이 실제로 시작되도록 이벤트 루프에 양보
+        return parsed
+
+    mock_input_parser.process_input.side_effect = parse_after_yield
+
+    result = await dispatcher.process_request("write a sort function")
+    await asyncio.sleep(0)
+
+    assert result["agent_name"] == "CodingAgent"
+    assert llm_cancelled.is_set()
+    assert dispatcher.routing_stats()["speculation"]["cancelled"] == 1
+
+@pytest.mark.asyncio
+async def test_process_request_speculative_history_overlaps_parsing(mock_dispatcher_and_deps, mocker):
+    """투기적 모드에서 대화 이력 조회가 파싱과 동시에 비동기 작업으로 시작되는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    dispatcher.speculative_routing = True
+    history_started = asyncio.Event()
+
+    async def history_lookup(session_id):
+        history_started.set()
+        return "User: Hi\nAI: Hello"
+
+    mock_context_manager = MagicMock(spec=ContextManager)
+    mock_context_manager.get_formatted_context_async = AsyncMock(side_effect=history_lookup)
+    mocker.patch.object(dispatcher, 'context_manager', mock_context_manager)
+
+    async def parse_after_history(user_input):
+        await asyncio.wait_for(history_started.wait(), timeout=1) # 이력 조회가 파싱 완료 전에 시작되어야 함
+        return ParsedInput(original_text=user_input, original_language="en", english_text="write a sort function",
+                           intent="custom_intent", domain="custom_domain")
+
+    mock_input_parser.process_input.side_effect = parse_after_history
+    mock_response = MagicMock(spec=GenerateContentResponse)
+    mock_response.text = "CodingAgent"
+    mock_llm_client.aio.models.generate_content.return_value = mock_response
+
+    result = await dispatcher.process_request("write a sort function", session_id="sid-spec")
+
+    assert result["conversation_history"] == "User: Hi\nAI: Hello"
+    mock_context_manager.get_formatted_context_async.assert_awaited_once_with("sid-spec")
+    mock_context_manager.get_formatted_context.assert_not_called()
+
 # --- Tests for Step 3.4: Context/Tool Injection (Mocking 방식 수정) ---
 
 @pytest.mark.asyncio
@@ -922,12 +1086,19 @@ async def test_process_request_returns_delegation_info(mock_dispatcher_and_deps,
     mock_context_manager.get_formatted_context.assert_called_once_with("sid-123")
 
 @pytest.mark.asyncio
-async def test_run_async_yields_delegation_event(mock_dispatcher_and_deps, mocker):
-    """3.4: _run_async_impl이 DelegationInfo 수신 시 위임 이벤트를 yield하는지 확인."""
+async def test_run_async_runs_delegated_agent(mock_dispatcher_and_deps, mocker):
+    """3.4: _run_async_impl이 DelegationInfo 수신 시 하위 에이전트를 직접 실행하고, 별도의 시스템 메시지 없이 그 답변을 반환하는지 확인."""
     dispatcher, _, _, _ = mock_dispatcher_and_deps
-    mock_agent = MagicMock(spec=LlmAgent, name="DelegateAgent", tools=[])
+    mock_agent = MagicMock(spec=LlmAgent, tools=[])
+    mock_agent.name = "DelegateAgent"
     mock_tool = MagicMock(spec=BaseTool, name="delegate_tool")
     dispatcher.sub_agents = {"DelegateAgent": mock_agent}
+    sub_event = Event(author="DelegateAgent", content=Content(parts=[Part(text="delegated answer")]))
+
+    async def sub_agent_events(ctx):
+        yield sub_event
+
+    mock_agent.model_copy.return_value.run_async = sub_agent_events
 
     delegation_info = DelegationInfo(
         agent_name="DelegateAgent",
@@ -941,6 +1112,7 @@ async def test_run_async_yields_delegation_event(mock_dispatcher_and_deps, mocke
     mock_ctx = MagicMock(spec=InvocationContext)
     mock_session = MagicMock()
     mock_session.id = "s-delegate"
+    mock_session.state = {}
     mock_ctx.session = mock_session
     mock_ctx.user_content = Content(parts=[Part(text="user asks delegate")])
 
@@ -949,27 +1121,23 @@ async def test_run_async_yields_delegation_event(mock_dispatcher_and_deps, mocke
         events.append(event)
 
     assert len(events) == 1
-    event = events[0]
-    assert isinstance(event, Event)
-    assert event.author == dispatcher.name
-    # Check the content string for delegation info instead of metadata
-    expected_content_substring = "[System] Delegating to DelegateAgent"
-    assert expected_content_substring in event.content.parts[0].text
-    # Remove metadata assertions as metadata field was removed from Event creation
-    # assert event.metadata["delegation_target"] == "DelegateAgent"
-    # assert event.metadata["input_text"] == "delegate input"
-    # assert event.metadata["original_language"] == "ko"
-    # assert event.metadata["required_tools"] == [getattr(mock_tool, 'name', 'Unnamed Tool')]
+    assert events[0].author == dispatcher.name # The sub-agent's answer goes out through the dispatcher's response path
+    assert events[0].content.parts[0].text == "delegated answer"
+    assert "[System]" not in events[0].content.parts[0].text
 
 @pytest.mark.asyncio
-async def test_run_async_temporary_tool_injection(mock_dispatcher_and_deps, mocker):
-    """3.4: _run_async_impl 실행 시 하위 에이전트 툴이 임시 변경 및 복구되는지 확인."""
+async def test_run_async_per_invocation_tool_injection(mock_dispatcher_and_deps, mocker):
+    """3.4: _run_async_impl이 공유 하위 에이전트를 변경하지 않고 필요한 툴을 가진 호출 단위 복사본을 사용하는지 확인."""
     dispatcher, _, _, _ = mock_dispatcher_and_deps
     original_tool = MagicMock(spec=BaseTool, name="original_tool")
     required_tool = MagicMock(spec=BaseTool, name="required_tool")
-    mock_agent = MagicMock(spec=LlmAgent, name="ToolAgent")
+    mock_agent = MagicMock(spec=LlmAgent)
+    mock_agent.name = "ToolAgent"
     mock_agent.tools = [original_tool]
     dispatcher.sub_agents = {"ToolAgent": mock_agent}
+    mock_agent.model_copy.return_value.run_async.return_value.__aiter__.return_value = [
+        Event(author="ToolAgent", content=Content(parts=[Part(text="done")]))
+    ]
 
     delegation_info = DelegationInfo(
         agent_name="ToolAgent", input_text="in", original_language="en",
@@ -977,30 +1145,35 @@ async def test_run_async_temporary_tool_injection(mock_dispatcher_and_deps, mock
     )
     mocker.patch('src.jarvis.core.dispatcher.JarvisDispatcher.process_request', new_callable=AsyncMock, return_value=delegation_info)
     mock_ctx = MagicMock(spec=InvocationContext)
-    mock_session = MagicMock(); mock_session.id = "s-tool"
+    mock_session = MagicMock(); mock_session.id = "s-tool"; mock_session.state = {}
     mock_ctx.session = mock_session
     mock_ctx.user_content=Content(parts=[Part(text="u")])
 
-    original_tools_before = mock_agent.tools[:]
-
     events = []
     async for event in dispatcher._run_async_impl(mock_ctx):
         events.append(event)
-        assert mock_agent.tools == [required_tool], "Tools should be temporarily changed"
+        assert mock_agent.tools == [original_tool], "Shared agent tools must not be mutated"
 
     assert len(events) > 0
-    assert mock_agent.tools == original_tools_before, "Tools should be restored"
-    assert mock_agent.tools == [original_tool], "Restored tools should match original"
+    assert mock_agent.tools == [original_tool]
+    update = mock_agent.model_copy.call_args.kwargs["update"]
+    assert update["tools"] == [required_tool], "Per-invocation copy should receive the required tools"
+    mock_agent.model_copy.return_value.run_async.assert_called_once_with(mock_ctx)
+    assert mock_session.state[SANDBOX_SESSION_STATE_KEY] == "s-tool", "Code execution tool finds the session's sandbox state by this key"
 
 
 @pytest.mark.asyncio
-async def test_run_async_temporary_instruction_update(mock_dispatcher_and_deps, mocker):
-    """3.4: _run_async_impl 실행 시 instruction이 임시 변경 및 복구되는지 확인."""
+async def test_run_async_per_invocation_instruction(mock_dispatcher_and_deps, mocker):
+    """3.4: _run_async_impl이 공유 instruction을 변경하지 않고 복사본에 컨텍스트를 추가하는지 확인."""
     dispatcher, _, _, _ = mock_dispatcher_and_deps
     original_instruction = "Base instruction."
-    mock_agent = MagicMock(spec=LlmAgent, name="InstructionAgent", instruction=original_instruction)
+    mock_agent = MagicMock(spec=LlmAgent, instruction=original_instruction)
+    mock_agent.name = "InstructionAgent"
     mock_agent.tools = []
     dispatcher.sub_agents = {"InstructionAgent": mock_agent}
+    mock_agent.model_copy.return_value.run_async.return_value.__aiter__.return_value = [
+        Event(author="InstructionAgent", content=Content(parts=[Part(text="done")]))
+    ]
 
     delegation_info = DelegationInfo(
         agent_name="InstructionAgent", input_text="in", original_language="fr",
@@ -1015,12 +1188,39 @@ async def test_run_async_temporary_instruction_update(mock_dispatcher_and_deps,
     events = []
     async for event in dispatcher._run_async_impl(mock_ctx):
         events.append(event)
-        expected_addition = "\n\n---\nContext:\nConversation History:\nHistory exists\nOriginal Language: fr\n---"
-        assert hasattr(mock_agent, 'instruction'), "Agent must have instruction attribute"
-        assert mock_agent.instruction == original_instruction + expected_addition, "Instruction should be temporarily updated"
+        assert mock_agent.instruction == original_instruction, "Shared instruction must not be mutated"
 
     assert len(events) > 0
-    assert mock_agent.instruction == original_instruction, "Instruction should be restored"
+    expected_addition = "\n\n---\nContext:\nConversation History:\nHistory exists\nOriginal Language: fr\n---"
+    update = mock_agent.model_copy.call_args.kwargs["update"]
+    assert update["instruction"] == original_instruction + expected_addition
+
+@pytest.mark.asyncio
+async def test_process_request_concurrent_requests_are_isolated(mock_dispatcher_and_deps):
+    """동시 요청의 파싱 결과/원본 언어가 각 RequestContext에 독립적으로 기록되는지 확인 (Mock)"""
+    dispatcher, mock_input_parser, mock_llm_client, _ = mock_dispatcher_and_deps
+    mock_response = MagicMock(spec=GenerateContentResponse)
+    mock_response.text = "CodingAgent"
+    mock_llm_client.aio.models.generate_content.return_value = mock_response
+
+    async def parse(user_input):
+        language, delay = {"ko-input": ("ko", 0.02), "fr-input": ("fr", 0.0)}[user_input]
+        await asyncio.sleep(delay)
+        return ParsedInput(original_text=user_input, original_language=language, english_text=user_input,
+                           intent="custom_intent", domain=language)
+
+    mock_input_parser.process_input.side_effect = parse
+    ko_context = RequestContext(user_input="ko-input")
+    fr_context = RequestContext(user_input="fr-input")
+
+    ko_result, fr_result = await asyncio.gather(
+        dispatcher.process_request("ko-input", request_context=ko_context),
+        dispatcher.process_request("fr-input", request_context=fr_context),
+    )
+
+    assert ko_result["original_language"] == ko_context.original_language == "ko"
+    assert fr_result["original_language"] == fr_context.original_language == "fr"
+    assert ko_context.routing_decision == fr_context.routing_decision == "CodingAgent"
 
 @pytest.mark.asyncio
 async def test_run_async_calls_context_manager(mock_dispatcher_and_deps, mocker):
@@ -1040,7 +1240,7 @@ async def test_run_async_calls_context_manager(mock_dispatcher_and_deps, mocker)
     async for _ in dispatcher._run_async_impl(mock_ctx):
         pass
 
-    mock_process_request.assert_called_once_with("user query", session_id="session-for-context")
+    mock_process_request.assert_called_once_with("user query", session_id="session-for-context", request_context=ANY)
 
 # ... (기존 A2A 연동 테스트 수정 (이 함수들도 Mock 정의 다음에 위치) ...
 
@@ -12,6 +12,7 @@ from google.adk.agents.invocation_context import InvocationContext
 from src.jarvis.core.dispatcher import JarvisDispatcher, DelegationInfo
 from src.jarvis.components.response_generator import ResponseGenerator
 from src.jarvis.core.context_manager import ContextManager # Import ContextManager
+from src.jarvis.core.request_context import RequestContext
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,11 +24,14 @@ class TestDispatcherBase(JarvisDispatcher):
         super().__init__(*args, **kwargs)
         # Replace response_generator with a simple pass-through mock
         mock_response_generator = MagicMock(spec=ResponseGenerator)
-        mock_response_generator.generate_response = AsyncMock(side_effect=lambda text, lang: text)
+        mock_response_generator.generate_response = AsyncMock(side_effect=lambda text, lang, request_context=None: text)
         self.response_generator = mock_response_generator
         self._mock_process_request_return = None
+        self._mock_original_language = None
 
-    async def process_request(self, user_input: str, session_id: Optional[str] = None) -> Union[DelegationInfo, str]:
+    async def process_request(self, user_input: str, session_id: Optional[str] = None, request_context: Optional[RequestContext] = None) -> Union[DelegationInfo, str]:
+        # Simulate setting language which normally happens in process_request
+        request_context.original_language = self._mock_original_language
         return self._mock_process_request_return
 
 
@@ -71,8 +75,8 @@ class TestDispatcherContextSaving:
 
         # Configure mocks
         test_dispatcher._mock_process_request_return = ai_response # Simulate direct response
-        # Simulate setting language which normally happens in process_request
-        test_dispatcher.current_original_language = original_lang
+        # Language that process_request records on the request context
+        test_dispatcher._mock_original_language = original_lang
 
         # Run the implementation
         generator = test_dispatcher._run_async_impl(mock_invocation_context)
@@ -99,7 +103,7 @@ class TestDispatcherContextSaving:
 
         # Configure mocks
         test_dispatcher._mock_process_request_return = ai_response
-        test_dispatcher.current_original_language = original_lang
+        test_dispatcher._mock_original_language = original_lang
         # Make add_message raise an error
         test_dispatcher.context_manager.add_message.side_effect = Exception("DB connection failed")
 
@@ -125,7 +129,7 @@ class TestDispatcherContextSaving:
 
         # Configure mocks
         test_dispatcher._mock_process_request_return = "This should fail to generate" # Input to response_generator
-        test_dispatcher.current_original_language = original_lang
+        test_dispatcher._mock_original_language = original_lang
         # Patch the specific instance's generate_response to raise an error
         test_dispatcher.response_generator.generate_response = AsyncMock(side_effect=Exception("Simulated generation error"))
 
@@ -157,7 +161,7 @@ class TestDispatcherContextSaving:
 
         # Configure mocks
         test_dispatcher._mock_process_request_return = direct_response
-        test_dispatcher.current_original_language = original_lang
+        test_dispatcher._mock_original_language = original_lang
         # Mock the generate_response method on the *instance* to check its call
         test_dispatcher.response_generator.generate_response = AsyncMock(return_value="Mocked Final Response")
 
@@ -172,7 +176,8 @@ class TestDispatcherContextSaving:
         # Verify the call to generate_response
         test_dispatcher.response_generator.generate_response.assert_called_once_with(
             direct_response, # Should be called with the result from process_request
-            original_lang
+            original_lang,
+            request_context=mock.ANY
         )
         # Also verify context saving happened (implicitly tests that response generation was attempted)
         test_dispatcher.context_manager.add_message.assert_called_once()
@@ -186,7 +191,7 @@ class TestDispatcherContextSaving:
 
         # Configure mocks
         test_dispatcher._mock_process_request_return = "Raw result from agent"
-        test_dispatcher.current_original_language = original_lang
+        test_dispatcher._mock_original_language = original_lang
         # Mock generate_response to return a specific value
         test_dispatcher.response_generator.generate_response = AsyncMock(return_value=processed_by_generator)
 
@@ -202,7 +207,8 @@ class TestDispatcherContextSaving:
         # Verify generate_response was called (as a prerequisite)
         test_dispatcher.response_generator.generate_response.assert_called_once_with(
             "Raw result from agent",
-            original_lang
+            original_lang,
+            request_context=mock.ANY
         )
         # Verify context was saved with the final response text
         test_dispatcher.context_manager.add_message.assert_called_once_with(
@@ -210,4 +216,26 @@ class TestDispatcherContextSaving:
             user_input=user_input,
             ai_response=processed_by_generator, # Should save the text that was yielded
             original_language=original_lang
-        ) 
\ No newline at end of file
+        ) 
+    @pytest.mark.asyncio
+    async def test_streaming_yields_partial_events_then_final(self, test_dispatcher, mock_invocation_context):
+        """Tests that streaming mode yields partial events per chunk, then the full text, and saves it."""
+        test_dispatcher.stream_responses = True
+        test_dispatcher._mock_process_request_return = "Raw result from agent"
+        test_dispatcher._mock_original_language = "ko"
+
+        async def fake_stream(text, lang, request_context=None):
+            for chunk in ["안녕", "하세요"]:
+                yield chunk
+        test_dispatcher.response_generator.generate_response_stream = fake_stream
+
+        events = [event async for event in test_dispatcher._run_async_impl(mock_invocation_context)]
+
+        assert [event.partial for event in events] == [True, True, None]
+        assert [event.content.parts[0].text for event in events] == ["안녕", "하세요", "안녕하세요"]
+        test_dispatcher.context_manager.add_message.assert_called_once_with(
+            session_id=mock_invocation_context.session.id,
+            user_input=mock_invocation_context.user_input,
+            ai_response="안녕하세요",
+            original_language="ko"
+        )
@@ -1,9 +1,10 @@
 """Tests for the integration between JarvisDispatcher and ResponseGenerator."""
 
 import pytest
-from unittest.mock import MagicMock, AsyncMock, patch
+from unittest.mock import MagicMock, AsyncMock, patch, ANY
 from src.jarvis.core.dispatcher import JarvisDispatcher
 from src.jarvis.components.response_generator import ResponseGenerator
+from src.jarvis.core.request_context import RequestContext
 from src.jarvis.models.input import ParsedInput # For mocking parser result
 from google.genai.types import GenerateContentResponse # For mocking LLM response
 from google.adk.agents import BaseAgent as Agent
@@ -41,7 +42,7 @@ def mock_dispatcher_with_mock_resp_gen(mocker):
     # Mock the response_generator instance *after* dispatcher initialization
     mock_response_gen = AsyncMock(spec=ResponseGenerator)
     # Configure its behavior using return_value or side_effect on the AsyncMock itself
-    async def mock_generate_side_effect(result, lang):
+    async def mock_generate_side_effect(result, lang, request_context=None):
         return f"Processed: {result} (Lang: {lang})"
     mock_response_gen.generate_response.side_effect = mock_generate_side_effect
     # mock_response_gen.generate_response = mock_generate # Don't assign the function directly
@@ -62,6 +63,13 @@ def mock_dispatcher_with_mock_resp_gen(mocker):
 
     return dispatcher, mock_response_gen, mock_input_parser, mock_llm_client
 
+def _process_request_returning(result, original_language):
+    """Builds a process_request stand-in that records the language on the request context, like the real one."""
+    async def fake_process_request(user_input, session_id=None, request_context=None):
+        request_context.original_language = original_language
+        return result
+    return fake_process_request
+
 # --- Test Case from markdown/testcase.md Section 6 ---
 
 @pytest.mark.asyncio
@@ -80,10 +88,7 @@ async def test_dispatcher_calls_response_generator_on_direct_response(
     # Mock process_request to return the direct string
     # Patch the class method as done previously
     with patch('src.jarvis.core.dispatcher.JarvisDispatcher.process_request',
-               new_callable=AsyncMock, return_value=direct_response_string) as mock_process_req:
-
-        # Set the original language that process_request would have set
-        dispatcher.current_original_language = original_lang
+               new_callable=AsyncMock, side_effect=_process_request_returning(direct_response_string, original_lang)) as mock_process_req:
 
         # Mock the invocation context passed to _run_async_impl
         mock_ctx = MagicMock()
@@ -101,13 +106,50 @@ async def test_dispatcher_calls_response_generator_on_direct_response(
 
         # Assert response_generator.generate_response was called correctly
         mock_response_gen.generate_response.assert_called_once_with(
-            direct_response_string, original_lang
+            direct_response_string, original_lang, request_context=ANY
         )
 
         # Assert the final event contains the processed response
         assert final_event is not None
         assert final_event.content.parts[0].text == f"Processed: {direct_response_string} (Lang: {original_lang})"
 
+@pytest.mark.asyncio
+async def test_delegated_agent_response_goes_through_response_generator(mock_dispatcher_with_mock_resp_gen):
+    """The sub-agent's final English answer is translated like the dispatcher's own; its tool events pass through."""
+    dispatcher, mock_response_gen, _, _ = mock_dispatcher_with_mock_resp_gen
+    tool_event = Event(author="KnowledgeQA_Agent", content=Content(parts=[Part.from_function_call(name="web_search", args={"query": "q"})]))
+    partial_event = Event(author="KnowledgeQA_Agent", partial=True, content=Content(parts=[Part(text="The ans")]))
+    final_event = Event(author="KnowledgeQA_Agent", content=Content(parts=[Part(text="The answer")]))
+
+    async def sub_agent_events(ctx):
+        for event in (tool_event, partial_event, final_event):
+            yield event
+
+    delegated_copy = MagicMock()
+    delegated_copy.run_async = sub_agent_events
+    delegation_info = {
+        "agent_name": "KnowledgeQA_Agent",
+        "input_text": "question",
+        "original_language": "ko",
+        "required_tools": [],
+        "conversation_history": None,
+    }
+    with patch('src.jarvis.core.dispatcher.JarvisDispatcher.process_request',
+               new_callable=AsyncMock, side_effect=_process_request_returning(delegation_info, "ko")), \
+         patch.object(JarvisDispatcher, '_configure_sub_agent', return_value=delegated_copy):
+        mock_ctx = MagicMock()
+        mock_ctx.user_content.parts[0].text = "질문"
+        mock_session = MagicMock(); mock_session.id = "delegation-session"
+        mock_ctx.session = mock_session
+
+        events = [event async for event in dispatcher._run_async_impl(mock_ctx)]
+
+    assert events[0] is tool_event
+    assert partial_event not in events and final_event not in events # Untranslated text is not shown
+    mock_response_gen.generate_response.assert_called_once_with("The answer", "ko", request_context=ANY)
+    assert events[-1].author == dispatcher.name
+    assert events[-1].content.parts[0].text == "Processed: The answer (Lang: ko)"
+
 # --- Test Cases from markdown/testcase.md Section 3.6 (Error Handling) ---
 
 @pytest.mark.asyncio
@@ -196,9 +238,7 @@ async def test_error_sub_agent_access(mock_dispatcher_with_mock_resp_gen):
 
     # Mock process_request to return info for an invalid agent
     with patch('src.jarvis.core.dispatcher.JarvisDispatcher.process_request',
-               new_callable=AsyncMock, return_value=delegation_info):
-
-        dispatcher.current_original_language = "en" # Set language for ResponseGenerator
+               new_callable=AsyncMock, side_effect=_process_request_returning(delegation_info, "en")):
         mock_ctx = MagicMock()
         mock_ctx.user_content.parts[0].text = "some query"
         mock_session = MagicMock(); mock_session.id = "error-session"
@@ -211,7 +251,7 @@ async def test_error_sub_agent_access(mock_dispatcher_with_mock_resp_gen):
         assert final_event is not None
         expected_error_msg = f"Error: Could not find agent {invalid_agent_name} to delegate to."
         # Check that ResponseGenerator was called with the specific error
-        mock_response_gen.generate_response.assert_called_once_with(expected_error_msg, "en")
+        mock_response_gen.generate_response.assert_called_once_with(expected_error_msg, "en", request_context=ANY)
         # Check the final event content (processed by the mock ResponseGenerator)
         assert final_event.content.parts[0].text == f"Processed: {expected_error_msg} (Lang: en)"
 
@@ -226,9 +266,7 @@ async def test_error_response_generator(mock_dispatcher_with_mock_resp_gen):
     # Trigger a scenario where ResponseGenerator is called (e.g., direct response)
     direct_response = "Some direct message"
     with patch('src.jarvis.core.dispatcher.JarvisDispatcher.process_request',
-               new_callable=AsyncMock, return_value=direct_response):
-
-        dispatcher.current_original_language = "fr"
+               new_callable=AsyncMock, side_effect=_process_request_returning(direct_response, "fr")):
         mock_ctx = MagicMock()
         mock_ctx.user_content.parts[0].text = "some query"
         mock_session = MagicMock(); mock_session.id = "gen-error-session"
@@ -242,7 +280,7 @@ async def test_error_response_generator(mock_dispatcher_with_mock_resp_gen):
         # Check that the raw fallback error message is in the event
         assert final_event.content.parts[0].text == "Error: Failed to generate final response."
         # Verify ResponseGenerator was called (even though it failed)
-        mock_response_gen.generate_response.assert_called_once_with(direct_response, "fr")
+        mock_response_gen.generate_response.assert_called_once_with(direct_response, "fr", request_context=ANY)
 
 @pytest.mark.asyncio
 async def test_error_process_request_unexpected(mock_dispatcher_with_mock_resp_gen):
@@ -268,9 +306,11 @@ async def test_error_run_async_impl_unexpected(mock_dispatcher_with_mock_resp_ge
     # Mock process_request itself to raise an unexpected error
     # Use patch to mock the method on the class level to avoid Pydantic validation error
     with patch.object(JarvisDispatcher, 'process_request', new_callable=AsyncMock) as mock_process_req:
-        mock_process_req.side_effect = Exception("Run impl unexpected error!")
+        async def failing_process_request(user_input, session_id=None, request_context=None):
+            request_context.original_language = "es"
+            raise Exception("Run impl unexpected error!")
+        mock_process_req.side_effect = failing_process_request
 
-        dispatcher.current_original_language = "es"
         mock_ctx = MagicMock()
         mock_ctx.user_content.parts[0].text = "some query"
         mock_session = MagicMock(); mock_session.id = "run-impl-error-session"
@@ -283,7 +323,7 @@ async def test_error_run_async_impl_unexpected(mock_dispatcher_with_mock_resp_ge
         assert final_event is not None
         expected_error_msg = "Error: An unexpected error occurred."
         # Check ResponseGenerator was called with the default fallback message
-        mock_response_gen.generate_response.assert_called_once_with(expected_error_msg, "es")
+        mock_response_gen.generate_response.assert_called_once_with(expected_error_msg, "es", request_context=ANY)
         # Check the final event content (processed by the mock ResponseGenerator)
         assert final_event.content.parts[0].text == f"Processed: {expected_error_msg} (Lang: es)"
 
@@ -365,4 +405,4 @@ async def test_process_request_includes_correct_tools(mock_dispatcher_with_mock_
     assert actual_tool_names_qa == expected_tool_names_qa
     # Check for tool presence using the extracted names list
     assert web_search_tool.name in actual_tool_names_qa # Check by name
-    assert "translate_text" in actual_tool_names_qa # Check by function name 
\ No newline at end of file
+    assert "translate_text" in actual_tool_names_qa # Check by function name 
@@ -0,0 +1,153 @@
+# tests/core/test_history_backend.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.jarvis.core.context_manager import ContextManager
+from src.jarvis.core.history_backend import SQLiteHistoryBackend, create_history_backend
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "context.sqlite3")
+
+def test_sqlite_backend_group_commits_writes(db_path):
+    """Queued writes are committed in batches rather than one transaction per message."""
+    backend = SQLiteHistoryBackend(db_path, flush_interval=0.2)
+    for i in range(50):
+        backend.append("s1", (f"Q{i}", f"A{i}", "en"))
+    backend.flush()
+
+    assert backend.written == 50
+    assert backend.commits < 50
+    assert backend.load("s1", 2) == [("Q48", "A48", "en"), ("Q49", "A49", "en")]
+    backend.close()
+
+def test_sqlite_backend_keeps_max_turns_per_session(db_path):
+    backend = SQLiteHistoryBackend(db_path, max_turns=3)
+    for i in range(10):
+        backend.append("s1", (f"Q{i}", f"A{i}", None))
+    backend.flush()
+
+    assert [message[0] for message in backend.load("s1", 100)] == ["Q7", "Q8", "Q9"]
+    backend.close()
+
+def test_load_serves_pending_writes_without_waiting_for_commit(db_path):
+    """Turns still in the write-behind buffer are read back without blocking on the writer thread."""
+    backend = SQLiteHistoryBackend(db_path)
+    backend.append("s1", ("Q1", "A1", "en"))
+    backend.flush()
+    backend.flush_interval = 30  # keep the next batch open so its writes stay pending
+    backend.append("s1", ("Q2", "A2", "en"))
+
+    start = time.monotonic()
+    assert backend.load("s1", 10) == [("Q1", "A1", "en"), ("Q2", "A2", "en")]
+    assert time.monotonic() - start < 1
+    assert backend.written == 1
+
+    backend.delete("s1")
+    backend.append("s1", ("Q3", "A3", "en"))
+    assert backend.load("s1", 10) == [("Q3", "A3", "en")]
+    backend.close()  # commits the open batch
+
+    reopened = SQLiteHistoryBackend(db_path)
+    assert reopened.load("s1", 10) == [("Q3", "A3", "en")]
+    reopened.close()
+
+def test_history_survives_restart(db_path):
+    """A new ContextManager on the same database sees the previous process's history."""
+    first = ContextManager(backend=SQLiteHistoryBackend(db_path))
+    first.add_message("s1", "Q1", "A1", "en")
+    first.add_message("s1", "Q2", "A2", "en")
+    first.close()
+
+    second = ContextManager(backend=SQLiteHistoryBackend(db_path))
+    assert second.get_formatted_context("s1") == "User: Q1\nAI: A1\nUser: Q2\nAI: A2"
+    second.add_message("s1", "Q3", "A3", "en")
+    assert second.get_formatted_context("s1", max_history=2) == "User: Q2\nAI: A2\nUser: Q3\nAI: A3"
+    second.close()
+
+def test_other_process_writes_invalidate_hot_cache(db_path):
+    """Sessions written through another connection are reloaded instead of served stale."""
+    worker_a = ContextManager(backend=SQLiteHistoryBackend(db_path))
+    worker_b = ContextManager(backend=SQLiteHistoryBackend(db_path))
+    worker_a.add_message("shared", "Q1", "A1", "en")
+    worker_a.backend.flush()
+    assert worker_b.get_formatted_context("shared") == "User: Q1\nAI: A1"
+
+    worker_a.add_message("shared", "Q2", "A2", "en")
+    worker_a.backend.flush()
+    assert worker_b.get_formatted_context("shared") == "User: Q1\nAI: A1\nUser: Q2\nAI: A2"
+    # Own writes do not invalidate the writer's cache
+    assert worker_a.backend.changed_sessions() == set()
+    worker_a.close()
+    worker_b.close()
+
+@pytest.mark.asyncio
+async def test_async_context_reads_backend_off_the_event_loop(db_path):
+    """get_formatted_context_async loads from SQLite in a worker thread and caches the session in memory."""
+    first = ContextManager(backend=SQLiteHistoryBackend(db_path))
+    first.add_message("s1", "Q1", "A1", "en")
+    first.close()
+
+    manager = ContextManager(backend=SQLiteHistoryBackend(db_path))
+    load = manager.backend.load
+    load_threads = []
+
+    def recording_load(session_id, limit):
+        load_threads.append(threading.current_thread())
+        return load(session_id, limit)
+
+    manager.backend.load = recording_load
+    assert await manager.get_formatted_context_async("s1") == "User: Q1\nAI: A1"
+    assert load_threads and threading.main_thread() not in load_threads
+    assert "s1" in manager.session_histories
+    assert await manager.get_formatted_context_async("s1") == "User: Q1\nAI: A1"
+    assert len(load_threads) == 1 # Served from memory the second time
+    manager.close()
+
+@pytest.mark.asyncio
+async def test_rolling_summary_survives_restart(db_path):
+    """The summary and the turn it covers are stored with the session and restored when it is loaded again."""
+    async def summarizer(previous_summary, turns):
+        folded = ",".join(turn.split("\n")[0][len("User: "):] for turn in turns)
+        return f"{previous_summary}+{folded}" if previous_summary else folded
+
+    first = ContextManager(backend=SQLiteHistoryBackend(db_path, max_turns=4), max_turns=4,
+                           summarizer=summarizer, summarize_after=4, summary_keep_turns=2, token_budget=0)
+    for i in range(6):
+        first.add_message("s1", f"Q{i}", f"A{i}", "en")
+        await first.wait_for_summaries()
+    expected = "Summary of earlier conversation: Q0,Q1+Q2,Q3\nUser: Q4\nAI: A4\nUser: Q5\nAI: A5"
+    assert first.get_formatted_context("s1") == expected
+    first.close()
+
+    second = ContextManager(backend=SQLiteHistoryBackend(db_path, max_turns=4), max_turns=4,
+                            summarizer=summarizer, summarize_after=4, summary_keep_turns=2, token_budget=0)
+    assert second.get_formatted_context("s1") == expected
+    assert second.backend.load_summary("s1") == ("Q0,Q1+Q2,Q3", 4, 6)
+    second.add_message("s1", "Q6", "A6", "en")
+    assert second.get_formatted_context("s1").endswith("User: Q4\nAI: A4\nUser: Q5\nAI: A5\nUser: Q6\nAI: A6")
+    second.clear_history("s1")
+    assert second.backend.load_summary("s1") == (None, 0, 0)
+    second.close()
+
+def test_clear_history_removes_persisted_turns(db_path):
+    manager = ContextManager(backend=SQLiteHistoryBackend(db_path))
+    manager.add_message("s1", "Q1", "A1", "en")
+    manager.clear_history("s1")
+    manager.backend.flush()
+
+    assert manager.backend.load("s1", 10) == []
+    manager.close()
+
+def test_create_history_backend(db_path):
+    assert create_history_backend("memory") is None
+    backend = create_history_backend("sqlite", path=db_path)
+    assert isinstance(backend, SQLiteHistoryBackend)
+    backend.close()
+    with pytest.raises(ValueError):
+        create_history_backend("sqlite")
+    with pytest.raises(ValueError):
+        create_history_backend("redis")
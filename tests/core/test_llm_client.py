@@ -0,0 +1,100 @@
+# tests/core/test_llm_client.py
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from google.genai.types import Content, Part
+
+from src.jarvis.core.llm_client import LLMClientRegistry, contents_text, get_llm_client_registry
+
+def _contents(text="hello"):
+    return [Content(parts=[Part(text=text)])]
+
+def test_get_client_is_lazy_and_shared():
+    """The client is created on first use only, then reused."""
+    with patch("src.jarvis.core.llm_client.genai.Client") as mock_client_class:
+        registry = LLMClientRegistry(api_key="test-key")
+        mock_client_class.assert_not_called()
+
+        first = registry.get_client()
+        second = registry.get_client()
+
+    assert first is second
+    mock_client_class.assert_called_once()
+    assert mock_client_class.call_args.kwargs["api_key"] == "test-key"
+
+def test_get_client_without_api_key(monkeypatch):
+    """Without an API key no client is created."""
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    registry = LLMClientRegistry()
+    assert registry.is_available() is False
+    assert registry.get_client() is None
+
+@pytest.mark.asyncio
+async def test_generate_content_raises_without_client(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        await LLMClientRegistry().generate_content("mock-model", _contents())
+
+@pytest.mark.asyncio
+async def test_generate_content_bounds_concurrency_per_model():
+    """At most `limit` calls per model are in flight at once."""
+    registry = LLMClientRegistry(concurrency_limits={"limited-model": 2})
+    in_flight = 0
+    peak = 0
+
+    async def slow_generate(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock(usage_metadata=None)
+
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content = AsyncMock(side_effect=slow_generate)
+    registry.set_client(mock_client)
+
+    await asyncio.gather(*(registry.generate_content("limited-model", _contents()) for _ in range(5)))
+
+    assert peak == 2
+    stats = registry.stats()["limited-model"]
+    assert stats["calls"] == 5
+    assert stats["peak_in_flight"] == 2
+    assert stats["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_generate_content_prefers_explicit_client():
+    """An explicitly passed client is used instead of the shared one."""
+    registry = LLMClientRegistry()
+    explicit_client = MagicMock()
+    explicit_client.aio.models.generate_content = AsyncMock(return_value="response")
+
+    result = await registry.generate_content("mock-model", _contents("hi"), client=explicit_client)
+
+    assert result == "response"
+    explicit_client.aio.models.generate_content.assert_called_once_with(model="mock-model", contents=_contents("hi"), config=None)
+
+def test_contents_text():
+    assert contents_text(_contents("a") + _contents("b")) == "a\nb"
+    assert contents_text([]) == ""
+
+def test_get_llm_client_registry_is_singleton():
+    assert get_llm_client_registry() is get_llm_client_registry()
+
+@pytest.mark.asyncio
+async def test_generate_content_stream_yields_text_chunks():
+    """Streaming yields each chunk's text as it arrives and releases the slot afterwards."""
+    registry = LLMClientRegistry()
+
+    async def fake_stream():
+        for text in ["Hel", "", "lo"]:
+            yield MagicMock(text=text, usage_metadata=None)
+
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content_stream = AsyncMock(return_value=fake_stream())
+
+    chunks = [chunk async for chunk in registry.generate_content_stream("stream-model", _contents(), client=mock_client)]
+
+    assert chunks == ["Hel", "lo"]
+    assert registry.stats()["stream-model"]["in_flight"] == 0
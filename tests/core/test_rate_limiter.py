@@ -0,0 +1,71 @@
+# tests/core/test_rate_limiter.py
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.jarvis.core.rate_limiter import (
+    LLMRateLimiter,
+    TokenBucket,
+    estimate_tokens,
+    get_rate_limiter,
+)
+
+def test_estimate_tokens():
+    """Token estimate is roughly one token per four characters, never zero."""
+    assert estimate_tokens("") == 1
+    assert estimate_tokens(None) == 1
+    assert estimate_tokens("a" * 400) == 100
+
+def test_token_bucket_wait_time():
+    """A drained bucket reports the time needed to refill the requested amount."""
+    bucket = TokenBucket(per_minute=60)  # 1 token per second
+    now = bucket.updated_at
+    assert bucket.wait_time(1, now) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(2, now) == pytest.approx(2.0)
+
+def test_token_bucket_disabled_when_limit_is_zero():
+    """A non-positive limit never throttles."""
+    bucket = TokenBucket(per_minute=0)
+    assert bucket.wait_time(1_000_000, time.monotonic()) == 0.0
+
+@pytest.mark.asyncio
+async def test_acquire_does_not_wait_under_quota():
+    """Requests within quota are not delayed."""
+    limiter = LLMRateLimiter(default_rpm=100, default_tpm=100_000)
+    start = time.monotonic()
+    await asyncio.gather(*[limiter.acquire("model-a", 10) for _ in range(50)])
+    assert time.monotonic() - start < 0.1
+    assert limiter.stats()["model-a"]["throttled_requests"] == 0
+
+@pytest.mark.asyncio
+async def test_acquire_waits_when_quota_exhausted():
+    """Requests beyond the per-minute quota wait for the bucket to refill."""
+    limiter = LLMRateLimiter(default_rpm=600, default_tpm=0)  # 10 requests per second
+    start = time.monotonic()
+    await asyncio.gather(*[limiter.acquire("model-b") for _ in range(602)])
+    elapsed = time.monotonic() - start
+    assert 0.1 <= elapsed < 1.0
+    assert limiter.stats()["model-b"]["throttled_requests"] == 2
+
+@pytest.mark.asyncio
+async def test_limits_are_per_model():
+    """Exhausting one model's quota does not throttle another model."""
+    limiter = LLMRateLimiter(default_rpm=60, default_tpm=0)
+    limiter.set_limits("slow-model", requests_per_minute=1, tokens_per_minute=0)
+    await limiter.acquire("slow-model")
+    start = time.monotonic()
+    await limiter.acquire("fast-model")
+    assert time.monotonic() - start < 0.05
+
+def test_record_usage_charges_underestimate():
+    """Actual usage above the estimate is deducted from the token bucket."""
+    limiter = LLMRateLimiter(default_rpm=60, default_tpm=1000)
+    response = MagicMock()
+    response.usage_metadata.total_token_count = 600
+    limiter.record_usage("model-c", 100, response)
+    assert limiter.get_limiter("model-c").tokens.tokens == pytest.approx(500, abs=1)
+
+def test_get_rate_limiter_is_singleton():
+    """The process-wide limiter is shared between call sites."""
+    assert get_rate_limiter() is get_rate_limiter()
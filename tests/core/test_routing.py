@@ -0,0 +1,161 @@
+# tests/core/test_routing.py
+import json
+import os
+
+from src.jarvis.core.routing import RoutingCache, EmbeddingRouter, IntentRoutingTable, NO_AGENT, text_fingerprint
+from src.jarvis.models.input import ParsedInput
+
+def _parsed(text="write a function", intent="code_generation", domain="coding"):
+    return ParsedInput(original_text=text, original_language="en", english_text=text, intent=intent, domain=domain)
+
+def test_routing_cache_hit_on_same_intent_and_domain():
+    """Decisions are shared by inputs with the same (intent, domain)."""
+    cache = RoutingCache()
+    cache.set(_parsed("write a sort function"), "CodingAgent")
+    assert cache.get(_parsed("write a parser")) == "CodingAgent"
+    assert cache.get(_parsed(intent="question_answering", domain="general")) is None
+
+def test_routing_cache_requires_intent_and_domain():
+    """Inputs without intent/domain are not cached unless fingerprinting is enabled."""
+    cache = RoutingCache()
+    cache.set(_parsed(intent=None), NO_AGENT)
+    assert cache.get(_parsed(intent=None)) is None
+    assert cache.stats()["size"] == 0
+
+def test_routing_cache_text_fingerprint():
+    """With fingerprinting, different texts under the same intent/domain do not collide."""
+    cache = RoutingCache(use_text_fingerprint=True)
+    cache.set(_parsed("write a sort function"), "CodingAgent")
+    assert cache.get(_parsed("function sort a write")) == "CodingAgent"
+    assert cache.get(_parsed("write a parser")) is None
+    assert text_fingerprint("A b") == text_fingerprint("b a")
+
+def test_routing_cache_invalidate():
+    """invalidate() drops all decisions and bumps the generation."""
+    cache = RoutingCache()
+    cache.set(_parsed(), "CodingAgent")
+    cache.invalidate()
+    assert cache.get(_parsed()) is None
+    assert cache.stats()["generation"] == 1
+
+def test_routing_cache_discards_decision_from_before_invalidate():
+    """A decision started before invalidate() is not stored under the new generation."""
+    cache = RoutingCache()
+    generation = cache.generation
+    cache.invalidate() # e.g. an agent registered while the delegation LLM call was in flight
+    cache.set(_parsed(), "CodingAgent", generation=generation)
+    assert cache.get(_parsed()) is None
+    cache.set(_parsed(), "CodingAgent", generation=cache.generation)
+    assert cache.get(_parsed()) == "CodingAgent"
+
+# --- EmbeddingRouter ---
+
+class _StubAgent:
+    def __init__(self, description):
+        self.description = description
+
+def _build_router(**kwargs):
+    router = EmbeddingRouter(**kwargs)
+    router.build({
+        "CodingAgent": _StubAgent("Generates, analyzes, debugs, and optimizes code based on user requests in English."),
+        "KnowledgeQA_Agent": _StubAgent("Answers general knowledge questions in English. Can use web search for up-to-date information."),
+    })
+    return router
+
+def test_embedding_router_routes_clear_requests():
+    """Clearly coding or knowledge requests are routed without an LLM."""
+    router = _build_router()
+    assert router.route("Create a simple web server in python")[0] == "CodingAgent"
+    assert router.route("What is the capital of South Korea?")[0] == "KnowledgeQA_Agent"
+
+def test_embedding_router_falls_back_when_not_confident():
+    """Requests unrelated to any agent return None so the LLM decides."""
+    router = _build_router()
+    agent_name, score = router.route("I am a student")
+    assert agent_name is None
+    assert score < router.threshold
+
+def test_embedding_router_is_deterministic():
+    """The same text always yields the same scores."""
+    router = _build_router()
+    assert router.scores("Fix the bug in my script") == router.scores("Fix the bug in my script")
+
+def test_embedding_router_uses_agent_cards(tmp_path):
+    """Skills and examples from agent cards contribute prototypes."""
+    card_dir = tmp_path / "cards"
+    card_dir.mkdir()
+    (card_dir / "weather.json").write_text(
+        '{"name": "WeatherAgent", "description": "Weather forecasts", '
+        '"skills": [{"name": "Forecast", "description": "Daily forecast", "tags": ["rain", "temperature"], '
+        '"examples": ["Will it rain in Seoul tomorrow?"]}]}'
+    )
+    router = EmbeddingRouter(cards_dir=str(card_dir))
+    router.build({"WeatherAgent": _StubAgent("Weather agent"), "CodingAgent": _StubAgent("Writes code")})
+    assert router.route("will it rain tomorrow in Busan")[0] == "WeatherAgent"
+
+def test_embedding_router_invalidate():
+    """invalidate() marks the prototypes for rebuild."""
+    router = _build_router()
+    assert router.is_built
+    router.invalidate()
+    assert not router.is_built
+
+# --- IntentRoutingTable ---
+
+AGENTS = {"CodingAgent": object(), "KnowledgeQA_Agent": object()}
+
+def _write_table(path, rules):
+    path.write_text(json.dumps({"rules": rules}), encoding="utf-8")
+
+def test_routing_table_first_match_wins(tmp_path):
+    """Rules are evaluated in order and omitted fields match anything."""
+    table_path = tmp_path / "routing_table.json"
+    _write_table(table_path, [
+        {"intent": "question_answering", "domain": "coding", "agent": "CodingAgent"},
+        {"intent": "question_answering", "agent": "KnowledgeQA_Agent"},
+        {"domain": "a2a", "agent": NO_AGENT},
+    ])
+    table = IntentRoutingTable(path=str(table_path))
+    assert table.resolve(_parsed(intent="question_answering", domain="coding"), AGENTS) == "CodingAgent"
+    assert table.resolve(_parsed(intent="Question_Answering", domain="general"), AGENTS) == "KnowledgeQA_Agent"
+    assert table.resolve(_parsed(intent="other", domain="a2a"), AGENTS) == NO_AGENT
+    assert table.resolve(_parsed(intent="other", domain="general"), AGENTS) is None
+    assert table.stats()["lookups"] == 4
+    assert table.stats()["resolved"] == 3
+
+def test_routing_table_skips_unregistered_agents(tmp_path):
+    """Rules pointing at agents that are not registered are ignored."""
+    table = IntentRoutingTable(path=None)
+    table.load_rules([{"intent": "code_generation", "agent": "MissingAgent"}, {"agent": "CodingAgent"}])
+    assert table.stats()["rules"] == 1  # rule without intent/domain is rejected
+    assert table.resolve(_parsed(), AGENTS) is None
+
+def test_routing_table_hot_reload(tmp_path):
+    """Edits to the table file are picked up without recreating the table."""
+    table_path = tmp_path / "routing_table.json"
+    _write_table(table_path, [{"intent": "code_generation", "agent": "CodingAgent"}])
+    table = IntentRoutingTable(path=str(table_path), reload_interval=0)
+    assert table.resolve(_parsed(), AGENTS) == "CodingAgent"
+
+    _write_table(table_path, [{"intent": "code_generation", "agent": "KnowledgeQA_Agent"}])
+    stat = os.stat(table_path)
+    os.utime(table_path, (stat.st_atime, stat.st_mtime + 10))
+    assert table.resolve(_parsed(), AGENTS) == "KnowledgeQA_Agent"
+    assert table.stats()["reloads"] == 2
+
+def test_routing_table_keeps_rules_on_invalid_file(tmp_path):
+    """A malformed table file does not wipe the previously loaded rules."""
+    table_path = tmp_path / "routing_table.json"
+    _write_table(table_path, [{"intent": "code_generation", "agent": "CodingAgent"}])
+    table = IntentRoutingTable(path=str(table_path), reload_interval=0)
+
+    table_path.write_text("{not json", encoding="utf-8")
+    stat = os.stat(table_path)
+    os.utime(table_path, (stat.st_atime, stat.st_mtime + 10))
+    assert table.resolve(_parsed(), AGENTS) == "CodingAgent"
+
+def test_default_routing_table_targets_known_agents():
+    """The shipped config/routing_table.json only references the built-in agents."""
+    table = IntentRoutingTable()
+    assert table.stats()["rules"] > 0
+    assert table.resolve(_parsed(intent="code_generation", domain="coding"), AGENTS) == "CodingAgent"
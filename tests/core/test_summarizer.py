@@ -0,0 +1,32 @@
+# tests/core/test_summarizer.py
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.jarvis.core.summarizer import CONTEXT_SUMMARY_MODEL, build_summary_prompt, summarize_conversation
+
+def test_build_summary_prompt_includes_previous_summary_and_turns():
+    prompt = build_summary_prompt("User likes Python.", ["User: Q1\nAI: A1"])
+    assert "Current summary:\nUser likes Python." in prompt
+    assert "New turns:\nUser: Q1\nAI: A1" in prompt
+
+@pytest.mark.asyncio
+@patch("src.jarvis.core.summarizer.get_llm_client_registry")
+async def test_summarize_conversation_returns_model_text(mock_get_registry):
+    mock_registry = mock_get_registry.return_value
+    mock_registry.is_available.return_value = True
+    mock_registry.generate_content = AsyncMock(return_value=MagicMock(text="  New summary.  "))
+
+    summary = await summarize_conversation(None, ["User: Q1\nAI: A1"])
+
+    assert summary == "New summary."
+    assert mock_registry.generate_content.call_args.args[0] == CONTEXT_SUMMARY_MODEL
+
+@pytest.mark.asyncio
+@patch("src.jarvis.core.summarizer.get_llm_client_registry")
+async def test_summarize_conversation_failure_returns_none(mock_get_registry):
+    mock_registry = mock_get_registry.return_value
+    mock_registry.is_available.return_value = True
+    mock_registry.generate_content = AsyncMock(side_effect=Exception("API error"))
+
+    assert await summarize_conversation("old", ["User: Q\nAI: A"]) is None
@@ -30,7 +30,7 @@ except ImportError:
     print("python-dotenv not installed, relying on environment variables.")
     pass # python-dotenv가 설치되지 않아도 테스트는 진행 가능
 
-from jarvis.components.input_parser import InputParserAgent
+from jarvis.components.input_parser import InputParserAgent, PARSE_MODE_MULTI_CALL, normalize_input_text
 from jarvis.models.input import ParsedInput
 # from unittest.mock import AsyncMock, MagicMock # 제거
 
@@ -167,6 +167,8 @@ async def test_process_input_analysis_api_error(agent: InputParserAgent, mocker)
                  결과 필드들이 None으로 유지되는지 확인합니다.
     """
     user_input = "Analyze this text."
+    agent.parse_mode = PARSE_MODE_MULTI_CALL # 단계별 호출 경로 테스트
+    agent.local_language_detection = False # LLM 언어 감지 호출 경로 테스트
 
     # Mock API 호출 (언어 감지, 번역은 정상 응답, 분석은 예외 발생)
     mock_llm_client = AsyncMock()
@@ -214,6 +216,8 @@ async def test_process_input_analysis_json_error(agent: InputParserAgent, mocker
                  결과 필드들이 None으로 유지되는지 확인합니다.
     """
     user_input = "Analyze this text."
+    agent.parse_mode = PARSE_MODE_MULTI_CALL # 단계별 호출 경로 테스트
+    agent.local_language_detection = False # LLM 언어 감지 호출 경로 테스트
     invalid_json_string = "this is not json{"
 
     # Mock API 호출 (언어 감지, 번역은 정상, 분석은 잘못된 JSON 반환)
@@ -255,6 +259,139 @@ async def test_process_input_analysis_json_error(agent: InputParserAgent, mocker
     except AttributeError:
          pytest.fail("Patching agent.llm failed. Check the internal LLM client attribute name in InputParserAgent.")
 
+# --- Fused Parse Mode Tests ---
+
+@pytest.mark.asyncio
+async def test_process_input_fused_single_call(agent: InputParserAgent):
+    """
+    테스트 목적: fused 모드에서 단일 LLM 호출로 언어/번역/의도/엔티티/도메인이 모두 채워지는지 확인합니다.
+    """
+    user_input = "파이썬으로 간단한 웹 서버 만드는 코드 짜줘"
+    fused_response = (
+        '{"language": "ko", "english_text": "Write code for a simple web server in Python", '
+        '"intent": "code_generation", "entities": {"language": "python"}, "domain": "coding"}'
+    )
+    with patch.object(InputParserAgent, '_call_llm', new_callable=AsyncMock) as mock_call_llm:
+        mock_call_llm.return_value = fused_response
+        result = await agent.process_input(user_input)
+
+    assert mock_call_llm.await_count == 1
+    assert result.original_text == user_input
+    assert result.original_language == "ko"
+    assert result.english_text == "Write code for a simple web server in Python"
+    assert result.intent == "code_generation"
+    assert result.entities == {"language": "python"}
+    assert result.domain == "coding"
+
+@pytest.mark.asyncio
+async def test_process_input_fused_falls_back_to_multi_call(agent: InputParserAgent):
+    """
+    테스트 목적: fused 응답이 유효한 JSON이 아니면 기존 multi_call 경로로 폴백하는지 확인합니다.
+    """
+    user_input = "안녕하세요"
+    agent.local_language_detection = False
+    with patch.object(InputParserAgent, '_call_llm', new_callable=AsyncMock) as mock_call_llm:
+        mock_call_llm.side_effect = [
+            "Error during LLM call: simulated", # fused 호출 실패
+            "ko",                               # 언어 감지
+            "Hello",                            # 번역
+            '{"intent": "greeting", "entities": null, "domain": "general"}', # 분석
+        ]
+        result = await agent.process_input(user_input)
+
+    assert mock_call_llm.await_count == 4
+    assert result.original_language == "ko"
+    assert result.english_text == "Hello"
+    assert result.intent == "greeting"
+    assert result.domain == "general"
+
+# --- Local Language Detection Tests ---
+
+@pytest.mark.asyncio
+async def test_process_input_local_english_skips_translation(agent: InputParserAgent):
+    """
+    테스트 목적: 로컬 감지기가 영어로 확신하면 언어 감지/번역 호출 없이 분석 호출만 수행하는지 확인합니다.
+    """
+    user_input = "What is the capital of France?"
+    with patch.object(InputParserAgent, '_detect_language_locally', return_value="en"), \
+         patch.object(InputParserAgent, '_call_llm', new_callable=AsyncMock) as mock_call_llm:
+        mock_call_llm.return_value = '{"intent": "question_answering", "entities": null, "domain": "geography"}'
+        result = await agent.process_input(user_input)
+
+    assert mock_call_llm.await_count == 1
+    assert result.original_language == "en"
+    assert result.english_text == user_input
+    assert result.intent == "question_answering"
+    assert result.domain == "geography"
+
+@pytest.mark.asyncio
+async def test_process_input_local_detection_skips_llm_detection(agent: InputParserAgent):
+    """
+    테스트 목적: multi_call 모드에서 로컬 감지 결과가 있으면 LLM 언어 감지 호출을 건너뛰는지 확인합니다.
+    """
+    agent.parse_mode = PARSE_MODE_MULTI_CALL
+    with patch.object(InputParserAgent, '_detect_language_locally', return_value="ko"), \
+         patch.object(InputParserAgent, '_call_llm', new_callable=AsyncMock) as mock_call_llm:
+        mock_call_llm.side_effect = [
+            "I am a student.", # 번역
+            '{"intent": "self_description", "entities": null, "domain": "general"}', # 분석
+        ]
+        result = await agent.process_input("나는 학생입니다.")
+
+    assert mock_call_llm.await_count == 2
+    assert result.original_language == "ko"
+    assert result.english_text == "I am a student."
+    assert result.intent == "self_description"
+
+def test_detect_language_locally_short_input_returns_none(agent: InputParserAgent):
+    """
+    테스트 목적: 너무 짧은 입력은 로컬 감지를 신뢰하지 않고 None(LLM 폴백)을 반환하는지 확인합니다.
+    """
+    assert agent._detect_language_locally("hi") is None
+
+# --- ParsedInput Cache Tests ---
+
+def test_normalize_input_text():
+    """
+    테스트 목적: 유니코드 표기와 공백 차이만 같은 캐시 키로 정규화되고, 대소문자/문장부호는 구분되는지 확인합니다.
+    """
+    assert normalize_input_text("  Hello   World!! ") == normalize_input_text("Hello World!!")
+    assert normalize_input_text("ＡＢＣ") == normalize_input_text("ABC") # NFKC: 전각 -> 반각
+    assert normalize_input_text("Turkey") != normalize_input_text("turkey")
+    assert normalize_input_text("It is done?") != normalize_input_text("It is done.")
+
+@pytest.mark.asyncio
+async def test_process_input_cache_hit_skips_llm(agent: InputParserAgent):
+    """
+    테스트 목적: 동일(정규화 기준) 입력의 두 번째 호출은 LLM 호출 없이 캐시 결과를 반환하는지 확인합니다.
+    """
+    with patch.object(InputParserAgent, '_detect_language_locally', return_value="en"), \
+         patch.object(InputParserAgent, '_call_llm', new_callable=AsyncMock) as mock_call_llm:
+        mock_call_llm.return_value = '{"intent": "request_help", "entities": null, "domain": "general"}'
+        first = await agent.process_input("Help me")
+        second = await agent.process_input(" Help  me ")
+
+    assert mock_call_llm.await_count == 1
+    assert second.original_text == " Help  me "
+    assert second.english_text == " Help  me "
+    assert second.intent == first.intent == "request_help"
+    stats = agent.cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_process_input_failed_analysis_not_cached(agent: InputParserAgent):
+    """
+    테스트 목적: 분석에 실패한 결과(intent 없음)는 캐시되지 않는지 확인합니다.
+    """
+    with patch.object(InputParserAgent, '_detect_language_locally', return_value="en"), \
+         patch.object(InputParserAgent, '_call_llm', new_callable=AsyncMock) as mock_call_llm:
+        mock_call_llm.return_value = "not json"
+        await agent.process_input("Analyze this text.")
+        await agent.process_input("Analyze this text.")
+
+    assert mock_call_llm.await_count == 2
+
 # # 비정상 응답 및 예외 테스트는 실제 API 호출로는 안정적으로 테스트하기 어려움
 # @pytest.mark.asyncio
 # async def test_process_input_language_detection_unexpected_format(agent, mocker, capsys):
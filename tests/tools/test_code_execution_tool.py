@@ -1,7 +1,8 @@
 # tests/tools/test_code_execution_tool.py
 import pytest
+from types import SimpleNamespace
 from google.adk.tools import FunctionTool
-from src.jarvis.tools.code_execution_tool import execute_python_code, code_execution_tool
+from src.jarvis.tools.code_execution_tool import SANDBOX_SESSION_STATE_KEY, execute_python_code, stream_python_code, code_execution_tool
 # Import types needed for schema verification
 from google.genai.types import FunctionDeclaration, Schema as GenaiSchema, Type as GenaiType
 
@@ -12,51 +13,96 @@ def test_code_execution_tool_definition():
     assert code_execution_tool.name == "execute_python_code"
     assert code_execution_tool.description is not None and len(code_execution_tool.description) > 0
     assert "RestrictedPython" in code_execution_tool.description
-    assert "print) is disabled" in code_execution_tool.description
+    assert "stdout" in code_execution_tool.description
     from src.jarvis.tools import available_tools
     assert code_execution_tool in available_tools
 
 @pytest.mark.asyncio
-async def test_execute_simple_print_disabled():
-    """print문이 포함된 코드 실행 시 출력이 없고 성공 메시지를 반환하는지 테스트합니다."""
-    code = "print('hello world')" # print is now disabled
+async def test_execute_simple_print():
+    """print문 출력이 stdout으로 수집되어 반환되는지 테스트합니다."""
+    code = "print('hello world')"
     result = await execute_python_code(code)
-    # Should now return the success message as print does nothing or raises NameError handled internally
-    # Let's check for the success message OR the specific NameError for _print_
-    assert result == "Code executed successfully (no stderr output)." or \
-           "Error during restricted execution: NameError: name '_print_' is not defined" in result
+    assert result["status"] == "success"
+    assert result["stdout"] == "hello world\n"
+    assert result["error"] is None
 
 @pytest.mark.asyncio
-async def test_execute_calculation_print_disabled():
-    """계산 및 print문 실행 시 출력이 없고 성공 메시지를 반환하는지 테스트합니다."""
-    code = "x = 10\ny = 20\nprint(x * y)" # print is now disabled
+async def test_execute_calculation_print():
+    """계산 결과의 print 출력과 최종 변수 값이 함께 반환되는지 테스트합니다."""
+    code = "x = 10\ny = 20\nprint(x * y)"
     result = await execute_python_code(code)
-    assert result == "Code executed successfully (no stderr output)." or \
-           "Error during restricted execution: NameError: name '_print_' is not defined" in result
+    assert result["stdout"] == "200\n"
+    assert result["variables"] == {"x": "10", "y": "20"}
 
 @pytest.mark.asyncio
 async def test_execute_stderr():
-    """표준 에러(stderr) 출력을 올바르게 캡처하는지 테스트합니다."""
-    code_raise = "raise ValueError('test error')"
+    """코드에서 발생한 예외의 타입, 메시지, 줄 번호가 구조화되어 반환되는지 테스트합니다."""
+    code_raise = "a = 1\nraise ValueError('test error')"
     result = await execute_python_code(code_raise)
-    assert "Error during restricted execution: ValueError: test error" in result
-    assert "Traceback" in result
-    assert "Stderr:" not in result # Stderr capture was removed/repurposed
+    assert result["status"] == "error"
+    assert result["error"]["type"] == "ValueError"
+    assert result["error"]["message"] == "test error"
+    assert result["error"]["line"] == 2
+    assert "Traceback" in result["error"]["traceback"]
+    assert result["variables"] == {"a": "1"} # Variables assigned before the error are still reported
 
 @pytest.mark.asyncio
 async def test_execute_exception():
     """ZeroDivisionError 발생 시 에러와 traceback을 올바르게 반환하는지 테스트합니다."""
-    code = "result = 1 / 0"
+    code = "print('before')\nresult = 1 / 0"
     result = await execute_python_code(code)
-    assert "Error during restricted execution: ZeroDivisionError: division by zero" in result
-    assert "Traceback" in result
+    assert result["error"]["type"] == "ZeroDivisionError"
+    assert result["error"]["message"] == "division by zero"
+    assert "Traceback" in result["error"]["traceback"]
+    assert result["stdout"] == "before\n" # Output printed before the error is kept
 
 @pytest.mark.asyncio
 async def test_execute_no_output():
-    """출력이 없는 코드 실행 시 성공 메시지를 반환하는지 테스트합니다."""
+    """출력이 없는 코드 실행 시 성공 상태와 변수 값, 실행 시간/메모리를 반환하는지 테스트합니다."""
     code = "a = 1 + 2"
     result = await execute_python_code(code)
-    assert result == "Code executed successfully (no stderr output)."
+    assert result["status"] == "success"
+    assert result["stdout"] == ""
+    assert result["variables"] == {"a": "3"}
+    assert result["execution_time_ms"] >= 0
+    assert result["peak_memory_bytes"] >= 0
+
+@pytest.mark.asyncio
+async def test_execute_caps_output_and_variables():
+    """긴 출력과 큰 변수 값은 크기가 제한되어 반환되는지 테스트합니다."""
+    code = "for i in range(5000):\n    print('line', i)\nbig = 'x' * 100000"
+    result = await execute_python_code(code)
+    assert result["stdout_truncated"] is True
+    assert len(result["stdout"]) <= 10000
+    assert len(result["variables"]["big"]) <= 200
+
+@pytest.mark.asyncio
+async def test_execute_keeps_session_state():
+    """같은 ADK 세션의 연속 호출은 이전 호출에서 정의한 변수를 그대로 사용할 수 있는지 테스트합니다."""
+    tool_context = SimpleNamespace(state={SANDBOX_SESSION_STATE_KEY: "session-1"})
+    await execute_python_code("data = [3, 1, 2]", tool_context=tool_context)
+    result = await execute_python_code("data.sort()\nprint(data)", tool_context=tool_context)
+    assert result["stdout"] == "[1, 2, 3]\n"
+    assert result["session"]["id"] == "session-1"
+    assert result["session"]["new"] is False
+
+@pytest.mark.asyncio
+async def test_execute_assigns_session_when_state_has_none():
+    """세션 상태에 키가 없으면 새 샌드박스 세션 ID를 상태에 저장하고 이후 호출에서 재사용하는지 테스트합니다."""
+    tool_context = SimpleNamespace(state={})
+    first = await execute_python_code("total = 40", tool_context=tool_context)
+    second = await execute_python_code("total += 2", tool_context=tool_context)
+    assert first["session"]["id"] == tool_context.state[SANDBOX_SESSION_STATE_KEY]
+    assert second["session"]["new"] is False
+    assert second["variables"] == {"total": "42"}
+
+@pytest.mark.asyncio
+async def test_stream_python_code_yields_output_then_result():
+    """stream_python_code가 출력 조각을 먼저, 구조화된 결과를 마지막으로 yield하는지 테스트합니다."""
+    items = [item async for item in stream_python_code("print('a')\nx = 1")]
+    assert "".join(item for item in items[:-1]) == "a\n"
+    assert items[-1]["status"] == "success"
+    assert items[-1]["variables"] == {"x": "1"}
 
 @pytest.mark.asyncio
 @pytest.mark.skip(reason="Current implementation with exec allows this. Needs sandboxing.")
@@ -82,7 +128,9 @@ async def test_restricted_disallowed_builtin():
     """5.4: 제한된 빌트인 함수 테스트 (RestrictedPython) - open()"""
     code = "f = open('forbidden.txt', 'w')\nf.write('test')\nf.close()"
     result = await execute_python_code(code)
-    assert "Error during restricted execution: NameError: name 'open' is not defined" in result
+    assert result["error"]["type"] == "NameError"
+    assert result["error"]["message"] == "name 'open' is not defined"
+    assert result["error"]["line"] == 1
 
 @pytest.mark.asyncio
 async def test_restricted_disallowed_import():
@@ -90,13 +138,15 @@ async def test_restricted_disallowed_import():
     code = "import os\na = os.listdir('.')" # Removed print
     result = await execute_python_code(code)
     # Check for the runtime ImportError because __import__ is blocked
-    assert "Error during restricted execution: ImportError: __import__ not found" in result
+    assert result["error"]["type"] == "ImportError"
+    assert result["error"]["message"] == "__import__ not found"
 
 @pytest.mark.asyncio
 async def test_restricted_disallowed_attribute_access():
     """5.4: 속성 접근 제한 테스트 (RestrictedPython) - __class__"""
     code = "a = (1).__class__" # Removed print
     result = await execute_python_code(code)
-    assert "Error during restricted execution: SyntaxError:" in result
-    assert "invalid attribute name because it starts with \"_\"" in result
+    assert result["error"]["type"] == "SyntaxError"
+    assert "invalid attribute name because it starts with \"_\"" in result["error"]["message"]
+    assert result["error"]["line"] == 1
  
\ No newline at end of file
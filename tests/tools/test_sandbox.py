@@ -0,0 +1,205 @@
+# tests/tools/test_sandbox.py
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.jarvis.tools.sandbox import SandboxPool, run_restricted
+
+@pytest.fixture
+def pool():
+    sandbox = SandboxPool(size=1, timeout=1, cpu_seconds=5, memory_mb=64)
+    yield sandbox
+    sandbox.close()
+
+def test_run_restricted_reports_exception():
+    result = run_restricted("a = 1 / 0")
+    assert result["status"] == "error"
+    assert (result["error"]["type"], result["error"]["message"], result["error"]["line"]) == ("ZeroDivisionError", "division by zero", 1)
+    assert "Traceback" in result["error"]["traceback"]
+
+def test_pool_runs_code(pool):
+    result = pool.run("a = 1 + 2")
+    assert result["status"] == "success"
+    assert result["variables"] == {"a": "3"}
+
+def test_pool_wall_clock_timeout_respawns_worker(pool):
+    result = pool.run("print('started')\nwhile True:\n    pass", timeout=0.5)
+
+    assert result["error"]["type"] == "TimeoutError"
+    assert result["stdout"] == "started\n" # Output streamed before the timeout is kept
+    assert pool.stats()["respawns"] == 1
+    assert pool.run("a = 1")["status"] == "success" # The replacement worker is usable
+
+def test_pool_cpu_limit_kills_worker():
+    sandbox = SandboxPool(size=1, timeout=10, cpu_seconds=1, memory_mb=0)
+    try:
+        result = sandbox.run("while True:\n    pass")
+        assert result["error"]["type"] == "TimeoutError"
+        assert result["error"]["message"] == "execution exceeded the CPU time limit"
+        assert sandbox.run("a = 1")["status"] == "success"
+    finally:
+        sandbox.close()
+
+def test_pool_memory_limit(pool):
+    result = pool.run("a = 'x' * (512 * 1024 * 1024)")
+
+    assert result["error"]["type"] == "MemoryError"
+    assert pool.run("a = 1")["status"] == "success"
+
+def test_pool_streams_under_tight_memory_limit():
+    """The stdout flusher starts before RLIMIT_AS, so a small limit does not kill the worker."""
+    sandbox = SandboxPool(size=1, timeout=5, memory_mb=16)
+    try:
+        result = sandbox.run("print(1)")
+        assert result["status"] == "success" and result["stdout"] == "1\n"
+        assert sandbox.stats()["respawns"] == 0
+    finally:
+        sandbox.close()
+
+def test_worker_module_does_not_import_agent_stack():
+    """Only the worker module is preloaded into the fork server; it must not pull in ADK or the dispatcher."""
+    probe = (
+        "import sys, src.jarvis.core.sandbox_worker\n"
+        "print(sorted(m for m in sys.modules if m.startswith(('google.adk', 'google.genai', 'vertexai', 'src.jarvis.tools', 'src.jarvis.core.dispatcher'))))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=Path(__file__).parents[2], capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.strip() == "[]"
+
+@pytest.mark.asyncio
+async def test_pool_does_not_block_event_loop(pool):
+    """The event loop keeps running while a worker is busy."""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    result = await pool.execute("while True:\n    pass", timeout=0.5)
+    ticker_task.cancel()
+
+    assert result["error"]["type"] == "TimeoutError"
+    assert ticks >= 10
+
+@pytest.mark.asyncio
+async def test_pool_async_runs_use_dedicated_threads(pool, monkeypatch):
+    """execute() waits on the pool's own bounded thread pool, not the loop's default executor."""
+    thread_names = []
+    run_on_worker = pool._run_on_worker
+
+    def recording_run(*args):
+        thread_names.append(threading.current_thread().name)
+        return run_on_worker(*args)
+
+    monkeypatch.setattr(pool, "_run_on_worker", recording_run)
+    assert (await pool.execute("a = 1"))["status"] == "success"
+    assert thread_names[0].startswith("sandbox")
+
+    pool.close()
+    assert (await pool.execute("a = 1"))["error"]["message"] == "sandbox pool is closed"
+
+@pytest.mark.asyncio
+async def test_pool_busy_session_does_not_block_other_sessions():
+    """Runs queued behind a session's busy worker hold no thread, so other sessions still get the idle worker."""
+    sandbox = SandboxPool(size=2, timeout=5, memory_mb=0)
+    try:
+        await sandbox.execute("x = 1", session_id="busy")
+        slow = asyncio.create_task(sandbox.execute("i = 0\nwhile i < 3000000:\n    i += 1", session_id="busy"))
+        await asyncio.sleep(0.1)
+        queued = [asyncio.create_task(sandbox.execute("y = x", session_id="busy")) for _ in range(3)]
+        await asyncio.sleep(0.1)
+
+        other = await asyncio.wait_for(sandbox.execute("z = 1", session_id="other"), timeout=2)
+        assert other["status"] == "success"
+        assert not slow.done() # The other session ran while the busy one was still running
+        assert all(result["variables"]["y"] == "1" for result in await asyncio.gather(*queued))
+        await slow
+    finally:
+        sandbox.close()
+
+def test_pool_caches_compiled_code(pool):
+    """Repeated snippets are compiled once per worker; compile errors are cached as well."""
+    assert pool.run("a = 1 + 2")["status"] == "success"
+    assert pool.run("a = 1 + 2")["status"] == "success"
+    first_error = pool.run("a = (1).__class__")
+    second_error = pool.run("a = (1).__class__")
+
+    assert first_error["error"]["type"] == "SyntaxError"
+    assert second_error == first_error
+    stats = pool.stats()["code_cache"]
+    assert stats["size"] == 2
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+def test_pool_rejects_oversized_source():
+    sandbox = SandboxPool(size=1, timeout=1, max_source_chars=20)
+    try:
+        result = sandbox.run("a = 1\n" * 10)
+        assert result["error"]["type"] == "SandboxError"
+        assert result["error"]["message"] == "code exceeds the 20 character limit"
+        assert sandbox.stats()["code_cache"]["misses"] == 0 # Never sent to a worker
+        assert sandbox.run("a = 1")["status"] == "success"
+    finally:
+        sandbox.close()
+
+@pytest.mark.asyncio
+async def test_pool_streams_output_while_running(pool):
+    """Printed text is sent in batches while the code runs; the result comes last."""
+    code = "for i in range(3):\n    print('x' * 2000)"
+    items = [item async for item in pool.stream(code, timeout=10)]
+
+    assert len(items) > 2 # Full batches are sent as soon as they fill up
+    assert "".join(items[:-1]) == ("x" * 2000 + "\n") * 3
+    assert items[-1]["stdout"] == ("x" * 2000 + "\n") * 3
+    assert items[-1]["variables"] == {"i": "2"}
+
+def test_pool_session_keeps_state_between_runs(pool):
+    """Variables and functions of a session survive between runs; other runs start empty."""
+    first = pool.run("def square(n):\n    return n * n\nbase = 3", session_id="s1")
+    second = pool.run("answer = square(base)", session_id="s1")
+    isolated = pool.run("answer = base", session_id="s2")
+    sessionless = pool.run("answer = base")
+
+    assert first["session"]["new"] is True
+    assert second["session"]["new"] is False
+    assert second["variables"] == {"base": "3", "answer": "9"}
+    assert isolated["error"]["type"] == "NameError"
+    assert sessionless["error"]["type"] == "NameError" and sessionless["session"] is None
+    assert pool.stats()["sessions"] == 2
+
+def test_pool_session_idle_expiry():
+    sandbox = SandboxPool(size=1, timeout=5, memory_mb=0, session_idle_ttl=0.2)
+    try:
+        sandbox.run("x = 1", session_id="s1")
+        time.sleep(0.3)
+        result = sandbox.run("y = 2", session_id="s1")
+        assert result["session"]["new"] is True
+        assert result["variables"] == {"y": "2"}
+    finally:
+        sandbox.close()
+
+def test_pool_session_memory_cap():
+    sandbox = SandboxPool(size=1, timeout=5, memory_mb=0, session_memory_mb=1)
+    try:
+        result = sandbox.run("big = 'x' * (2 * 1024 * 1024)", session_id="s1")
+        assert result["status"] == "success"
+        assert result["session"]["evicted"] == "memory"
+        assert sandbox.run("y = 1", session_id="s1")["session"]["new"] is True
+    finally:
+        sandbox.close()
+
+def test_pool_session_lost_on_worker_restart(pool):
+    pool.run("x = 1", session_id="s1")
+    timed_out = pool.run("while True:\n    pass", timeout=0.5, session_id="s1")
+    after = pool.run("y = 2", session_id="s1")
+
+    assert timed_out["session"]["evicted"] == "worker_restart"
+    assert after["session"]["new"] is True
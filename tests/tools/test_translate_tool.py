@@ -2,10 +2,14 @@
 
 import pytest
 import asyncio
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
 # Import the tool and function to be tested
-from src.jarvis.tools.translate_tool import translate_tool, translate_text
+from src.jarvis.tools.translate_tool import (
+    translate_tool, translate_text, translate_text_stream, translate_batch, seed_translation_memory,
+    translation_memory_key, get_translation_memory, TRANSLATION_MEMORY_SEED_PATH,
+)
+from src.jarvis.core.cache import LRUCache
 # Import the list of available tools
 from src.jarvis.tools import available_tools
 # Use google.ai.generativelanguage for protos replacement
@@ -32,7 +36,7 @@ def test_translate_tool_object_definition():
 
     # Check that function_declarations exist and contain the expected function
     assert translate_tool.function_declarations is not None
-    assert len(translate_tool.function_declarations) == 1 # Should contain exactly one
+    assert len(translate_tool.function_declarations) == 2 # translate_text and translate_batch
 
     # Get the declaration
     func_decl = translate_tool.function_declarations[0]
@@ -100,8 +104,10 @@ async def test_translate_text_llm_error_returns_original():
     target_language = "es"
 
     # Mock the async LLM call using the correct path for the client method
-    with patch('src.jarvis.tools.translate_tool.client.aio.models.generate_content', new_callable=AsyncMock) as mock_generate:
-        mock_generate.side_effect = Exception("Simulated API error")
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content = AsyncMock(side_effect=Exception("Simulated API error"))
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        mock_generate = mock_client.aio.models.generate_content
 
         result_text = await translate_text(original_text, target_language, 'en')
 
@@ -123,7 +129,10 @@ async def test_translate_text_llm_empty_response_returns_original():
     mock_response.text = None
     mock_response.parts = [] # Assuming parts might be checked
 
-    with patch('src.jarvis.tools.translate_tool.client.aio.models.generate_content', new_callable=AsyncMock, return_value=mock_response) as mock_generate:
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        mock_generate = mock_client.aio.models.generate_content
 
         result_text = await translate_text(original_text, target_language, 'en')
 
@@ -131,6 +140,136 @@ async def test_translate_text_llm_empty_response_returns_original():
         assert result_text == original_text
         mock_generate.assert_called_once()
 
+def test_translate_tool_exposes_translate_batch():
+    """The batch API is declared alongside translate_text."""
+    batch_decl = translate_tool.function_declarations[1]
+    assert batch_decl.name == "translate_batch"
+    assert "texts" in batch_decl.parameters.properties
+    assert "target_language" in batch_decl.parameters.properties
+    assert "texts" in batch_decl.parameters.required
+
+# --- Test translate_batch Function (Mock) ---
+
+@pytest.mark.asyncio
+async def test_translate_batch_single_request():
+    """Several segments are translated with one LLM call and split back out in order."""
+    mock_response = MagicMock()
+    mock_response.text = '["Primero", "Segundo | con \\"comillas\\"", "Tercero"]'
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+    texts = ["Batch first", 'Batch second | with "quotes"', "", "Batch third"]
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        result = await translate_batch(texts, 'es', 'en')
+
+    assert result == ["Primero", 'Segundo | con "comillas"', "", "Tercero"]
+    mock_client.aio.models.generate_content.assert_called_once()
+    prompt = mock_client.aio.models.generate_content.call_args.kwargs["contents"][0].parts[0].text
+    assert '["Batch first", "Batch second | with \\"quotes\\"", "Batch third"]' in prompt
+
+@pytest.mark.asyncio
+async def test_translate_batch_falls_back_on_mismatched_response():
+    """A response with the wrong number of elements falls back to per-segment translation."""
+    batch_response = MagicMock()
+    batch_response.text = '["Only one"]'
+    single_response = MagicMock()
+    single_response.text = "Einzeln"
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content = AsyncMock(side_effect=[batch_response, single_response, single_response])
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        result = await translate_batch(["Mismatch one", "Mismatch two"], 'de', 'en')
+
+    assert result == ["Einzeln", "Einzeln"]
+    assert mock_client.aio.models.generate_content.call_count == 3
+
+@pytest.mark.asyncio
+async def test_translate_batch_uses_translation_memory():
+    """Segments already in the translation memory are not sent to the LLM."""
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content = AsyncMock()
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        result = await translate_batch(["Error: Failed to parse your input.", "Error: An unexpected error occurred."], 'ko', 'en')
+
+    assert result == ["오류: 입력을 분석하지 못했습니다.", "오류: 예기치 않은 오류가 발생했습니다."]
+    mock_client.aio.models.generate_content.assert_not_called()
+
+# --- Test Translation Memory ---
+
+@pytest.mark.asyncio
+async def test_translate_text_served_from_translation_memory():
+    """A repeated translation is answered from the translation memory without a second LLM call."""
+    mock_response = MagicMock()
+    mock_response.text = "Memoria de traducción"
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        first = await translate_text("Translation memory test", 'es', 'en')
+        second = await translate_text("  Translation memory test\n", 'es', 'en') # Same text after normalization
+
+    assert first == second == "Memoria de traducción"
+    mock_client.aio.models.generate_content.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_translate_text_seeded_message_needs_no_client():
+    """The dispatcher's fixed messages are pre-seeded for supported languages."""
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=None):
+        result = await translate_text("Error: Failed to parse your input.", 'ko', 'en')
+    assert result == "오류: 입력을 분석하지 못했습니다."
+
+@pytest.mark.asyncio
+async def test_translate_text_stream_remembers_complete_translation():
+    """A completed streaming translation is stored and replayed as a single chunk."""
+    async def fake_stream():
+        for text in ["Bonjour", " le monde"]:
+            yield MagicMock(text=text, usage_metadata=None)
+
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content_stream = AsyncMock(return_value=fake_stream())
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        first = [chunk async for chunk in translate_text_stream("Hello stream world", 'fr', 'en')]
+        second = [chunk async for chunk in translate_text_stream("Hello stream world", 'fr', 'en')]
+
+    assert first == ["Bonjour", " le monde"]
+    assert second == ["Bonjour le monde"]
+    mock_client.aio.models.generate_content_stream.assert_called_once()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fallback_text, expected_tail", [
+    ("Bonjour le monde cassé", [" le monde cassé"]), # Continues the emitted prefix: only the rest is added
+    ("Salut le monde cassé", ["\n\nSalut le monde cassé"]), # Diverges: the full translation follows
+])
+async def test_translate_text_stream_completes_after_mid_stream_failure(fallback_text, expected_tail):
+    """A stream that fails after partial output is completed from a full translation; the partial text is not remembered."""
+    async def failing_stream():
+        yield MagicMock(text="Bonjour", usage_metadata=None)
+        raise ConnectionError("stream dropped")
+
+    fallback_response = MagicMock()
+    fallback_response.text = fallback_text
+    mock_client = MagicMock()
+    mock_client.aio.models.generate_content_stream = AsyncMock(return_value=failing_stream())
+    mock_client.aio.models.generate_content = AsyncMock(return_value=fallback_response)
+    with patch('src.jarvis.core.llm_client.LLMClientRegistry.get_client', return_value=mock_client):
+        chunks = [chunk async for chunk in translate_text_stream("Hello broken " + fallback_text, 'fr', 'en')]
+
+    assert chunks == ["Bonjour"] + expected_tail
+    assert get_translation_memory().get(translation_memory_key("Hello broken " + fallback_text, 'fr', 'en')) == fallback_text
+
+def test_translation_memory_key_keeps_inner_whitespace():
+    """Only outer whitespace and Unicode composition are normalized; layout inside the text is significant."""
+    key = translation_memory_key("café\n    indented", 'fr', 'en')
+    assert translation_memory_key("  cafe\u0301\n    indented \n", 'fr', 'en') == key
+    assert translation_memory_key("café\n indented", 'fr', 'en') != key
+    assert translation_memory_key("café    indented", 'fr', 'en') != key
+
+def test_seed_translation_memory(tmp_path):
+    """The seed file covers every supported language; a missing file seeds nothing."""
+    memory = LRUCache(max_size=1000)
+    assert seed_translation_memory(memory, TRANSLATION_MEMORY_SEED_PATH) > 0
+    for language in ("ko", "ja", "zh", "es", "fr", "de"):
+        key = translation_memory_key("I cannot find a suitable agent to handle your request at this time.", language, 'en')
+        assert memory.get(key)
+    assert seed_translation_memory(memory, str(tmp_path / "missing.json")) == 0
+
 # --- Test Tool Registration ---
 
 def test_translate_tool_registration():
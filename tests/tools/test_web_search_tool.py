@@ -1,9 +1,14 @@
 # tests/tools/test_web_search_tool.py
+import asyncio
+import time
 import pytest
 import logging
 from unittest.mock import patch, AsyncMock, MagicMock
 
-from src.jarvis.tools.web_search_tool import web_search, web_search_tool
+from src.jarvis.tools.web_search_tool import (
+    web_search, web_search_tool, DEFAULT_MODEL_NAME, WEB_SEARCH_EMPTY_TTL, clear_web_search_cache, get_web_search_caches,
+    normalize_query, search_results_key,
+)
 from google.adk.tools import FunctionTool
 # Import types needed for schema verification
 from google.genai.types import FunctionDeclaration, Schema as GenaiSchema, Type as GenaiType, Tool
@@ -11,6 +16,13 @@ from google.genai.types import FunctionDeclaration, Schema as GenaiSchema, Type
 # Configure logging for tests
 logging.basicConfig(level=logging.INFO)
 
+@pytest.fixture(autouse=True)
+def empty_web_search_cache():
+    """Every test starts without cached search results or summaries."""
+    clear_web_search_cache()
+    yield
+    clear_web_search_cache()
+
 # Mock data for AsyncDDGS
 MOCK_SEARCH_RESULTS = [
     {'title': 'Result 1', 'href': 'http://example.com/1', 'body': 'Snippet 1...'},
@@ -100,32 +112,33 @@ def test_web_search_tool_registration():
 
 @pytest.mark.asyncio
 @patch('src.jarvis.tools.web_search_tool.DDGS')
-@patch('src.jarvis.tools.web_search_tool.genai.GenerativeModel')
-@patch('src.jarvis.tools.web_search_tool.LLM_CLIENT_INITIALIZED', True) # Assume LLM is initialized
-async def test_web_search_summary_success(mock_genai_model, mock_ddgs):
+@patch('src.jarvis.tools.web_search_tool.get_llm_client_registry')
+async def test_web_search_summary_success(mock_get_registry, mock_ddgs):
     """5.3: 요약 성공 테스트 (Mock LLM)"""
     # Mock DDGS().atext behavior
     mock_ddgs_instance = mock_ddgs.return_value.__aenter__.return_value
     mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_SEARCH_RESULTS_LONG)
 
-    # Mock GenerativeModel behavior
-    mock_model_instance = mock_genai_model.return_value
+    # Mock the shared LLM client registry (LLM available)
+    mock_registry = mock_get_registry.return_value
+    mock_registry.is_available.return_value = True
     mock_llm_response = MagicMock()
     mock_llm_response.text = MOCK_LLM_SUMMARY
-    mock_model_instance.generate_content_async = AsyncMock(return_value=mock_llm_response)
+    mock_registry.generate_content = AsyncMock(return_value=mock_llm_response)
 
     query = "benefits of async programming"
     result = await web_search(query)
 
     # Assertions
     mock_ddgs_instance.atext.assert_called_once_with(query, max_results=7)
-    mock_genai_model.assert_called_once() # Check model was instantiated
-    mock_model_instance.generate_content_async.assert_called_once() # Check LLM was called
+    mock_registry.generate_content.assert_called_once() # Check LLM was called
     # Check if the correct prompt structure was passed (simplified check)
-    call_args, _ = mock_model_instance.generate_content_async.call_args
-    assert f"query '{query}'" in call_args[0]
-    assert "Search Results Snippets:" in call_args[0]
-    assert MOCK_SEARCH_RESULTS_LONG[0]['body'] in call_args[0] # Check if content is in prompt
+    call_args, call_kwargs = mock_registry.generate_content.call_args
+    assert call_args[0] == DEFAULT_MODEL_NAME
+    prompt = call_kwargs["contents"][0].parts[0].text
+    assert f"query '{query}'" in prompt
+    assert "Search Results Snippets:" in prompt
+    assert MOCK_SEARCH_RESULTS_LONG[0]['body'] in prompt # Check if content is in prompt
 
     assert f"Summary based on web search results for '{query}':" in result
     assert MOCK_LLM_SUMMARY in result
@@ -133,25 +146,24 @@ async def test_web_search_summary_success(mock_genai_model, mock_ddgs):
 
 @pytest.mark.asyncio
 @patch('src.jarvis.tools.web_search_tool.DDGS')
-@patch('src.jarvis.tools.web_search_tool.genai.GenerativeModel')
-@patch('src.jarvis.tools.web_search_tool.LLM_CLIENT_INITIALIZED', True) # Assume LLM is initialized
-async def test_web_search_summary_skipped_short_results(mock_genai_model, mock_ddgs):
+@patch('src.jarvis.tools.web_search_tool.get_llm_client_registry')
+async def test_web_search_summary_skipped_short_results(mock_get_registry, mock_ddgs):
     """5.3: 요약 건너뛰기 테스트 (짧은 결과)"""
     # Mock DDGS().atext behavior
     mock_ddgs_instance = mock_ddgs.return_value.__aenter__.return_value
     mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_SEARCH_RESULTS_SHORT)
 
-    # Mock GenerativeModel (though it shouldn't be called)
-    mock_model_instance = mock_genai_model.return_value
-    mock_model_instance.generate_content_async = AsyncMock()
+    # Mock the shared LLM client registry (LLM available, but it shouldn't be called)
+    mock_registry = mock_get_registry.return_value
+    mock_registry.is_available.return_value = True
+    mock_registry.generate_content = AsyncMock()
 
     query = "ddgs library"
     result = await web_search(query)
 
     # Assertions
     mock_ddgs_instance.atext.assert_called_once_with(query, max_results=7)
-    mock_genai_model.assert_not_called() # Check model was NOT instantiated
-    mock_model_instance.generate_content_async.assert_not_called() # Check LLM was NOT called
+    mock_registry.generate_content.assert_not_called() # Check LLM was NOT called
 
     assert "Web Search Results for" in result
     assert "(Note: Summarization failed" not in result # Ensure no failure note
@@ -160,25 +172,24 @@ async def test_web_search_summary_skipped_short_results(mock_genai_model, mock_d
 
 @pytest.mark.asyncio
 @patch('src.jarvis.tools.web_search_tool.DDGS')
-@patch('src.jarvis.tools.web_search_tool.genai.GenerativeModel')
-@patch('src.jarvis.tools.web_search_tool.LLM_CLIENT_INITIALIZED', False) # *** Mock LLM as NOT initialized ***
-async def test_web_search_summary_skipped_llm_not_initialized(mock_genai_model, mock_ddgs):
+@patch('src.jarvis.tools.web_search_tool.get_llm_client_registry')
+async def test_web_search_summary_skipped_llm_not_initialized(mock_get_registry, mock_ddgs):
     """5.3: 요약 건너뛰기 테스트 (LLM 미초기화)"""
     # Mock DDGS().atext behavior (use long results to ensure length isn't the skip reason)
     mock_ddgs_instance = mock_ddgs.return_value.__aenter__.return_value
     mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_SEARCH_RESULTS_LONG)
 
-    # Mock GenerativeModel (though it shouldn't be called)
-    mock_model_instance = mock_genai_model.return_value
-    mock_model_instance.generate_content_async = AsyncMock()
+    # Mock the shared LLM client registry as NOT available
+    mock_registry = mock_get_registry.return_value
+    mock_registry.is_available.return_value = False
+    mock_registry.generate_content = AsyncMock()
 
     query = "long query but no llm"
     result = await web_search(query)
 
     # Assertions
     mock_ddgs_instance.atext.assert_called_once_with(query, max_results=7)
-    mock_genai_model.assert_not_called() # Check model was NOT instantiated
-    mock_model_instance.generate_content_async.assert_not_called() # Check LLM was NOT called
+    mock_registry.generate_content.assert_not_called() # Check LLM was NOT called
 
     assert "Web Search Results for" in result
     assert "(Note: Summarization failed" not in result # Ensure no failure note
@@ -187,26 +198,99 @@ async def test_web_search_summary_skipped_llm_not_initialized(mock_genai_model,
 
 @pytest.mark.asyncio
 @patch('src.jarvis.tools.web_search_tool.DDGS')
-@patch('src.jarvis.tools.web_search_tool.genai.GenerativeModel')
-@patch('src.jarvis.tools.web_search_tool.LLM_CLIENT_INITIALIZED', True) # Assume LLM is initialized
-async def test_web_search_summary_failure_llm_error(mock_genai_model, mock_ddgs):
+@patch('src.jarvis.tools.web_search_tool.get_llm_client_registry')
+async def test_web_search_summary_failure_llm_error(mock_get_registry, mock_ddgs):
     """5.3: 요약 실패 테스트 (Mock LLM 에러)"""
     # Mock DDGS().atext behavior
     mock_ddgs_instance = mock_ddgs.return_value.__aenter__.return_value
     mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_SEARCH_RESULTS_LONG)
 
-    # Mock GenerativeModel to raise an error
-    mock_model_instance = mock_genai_model.return_value
-    mock_model_instance.generate_content_async = AsyncMock(side_effect=Exception("LLM API Error!"))
+    # Mock the shared LLM client registry to raise an error
+    mock_registry = mock_get_registry.return_value
+    mock_registry.is_available.return_value = True
+    mock_registry.generate_content = AsyncMock(side_effect=Exception("LLM API Error!"))
 
     query = "summarization error test"
     result = await web_search(query)
 
     # Assertions
     mock_ddgs_instance.atext.assert_called_once_with(query, max_results=7)
-    mock_genai_model.assert_called_once() # Model was instantiated
-    mock_model_instance.generate_content_async.assert_called_once() # LLM call was attempted
+    mock_registry.generate_content.assert_called_once() # LLM call was attempted
 
     assert "Web Search Results for" in result
     assert "(Note: Summarization failed, showing raw results)" in result # Check for failure note
-    assert MOCK_SEARCH_RESULTS_LONG[0]['title'] in result # Check raw results are present 
\ No newline at end of file
+    assert MOCK_SEARCH_RESULTS_LONG[0]['title'] in result # Check raw results are present
+
+def test_normalize_query():
+    assert normalize_query("  What is   Python?  ") == normalize_query("what is python") == "what is python"
+
+@pytest.mark.asyncio
+@patch('src.jarvis.tools.web_search_tool.DDGS', new_callable=MagicMock)
+async def test_web_search_results_cached_by_normalized_query(mock_ddgs_class):
+    """같은 의미의 검색어(대소문자/공백/문장부호 차이)는 캐시된 검색 결과를 재사용하는지 테스트합니다."""
+    mock_ddgs_instance = AsyncMock()
+    mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_SEARCH_RESULTS_SHORT)
+    mock_ddgs_class.return_value.__aenter__.return_value = mock_ddgs_instance
+
+    first = await web_search("DDGS library")
+    second = await web_search("  ddgs   library? ")
+
+    mock_ddgs_instance.atext.assert_awaited_once_with("DDGS library", max_results=7)
+    assert MOCK_SEARCH_RESULTS_SHORT[0]['title'] in first
+    assert "Web Search Results for '  ddgs   library? ':" in second
+
+@pytest.mark.asyncio
+@patch('src.jarvis.tools.web_search_tool.DDGS', new_callable=MagicMock)
+async def test_web_search_empty_results_cached_briefly(mock_ddgs_class):
+    """빈 검색 결과는 짧은 TTL로만 캐시되고, TTL이 0이면 캐시되지 않는지 테스트합니다."""
+    mock_ddgs_instance = AsyncMock()
+    mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_EMPTY_RESULTS)
+    mock_ddgs_class.return_value.__aenter__.return_value = mock_ddgs_instance
+
+    await web_search("nothing out there")
+    cached, expires_at = get_web_search_caches()[0].get_with_expiry(search_results_key("nothing out there"))
+    assert cached == []
+    assert expires_at - time.time() <= WEB_SEARCH_EMPTY_TTL
+
+    with patch('src.jarvis.tools.web_search_tool.WEB_SEARCH_EMPTY_TTL', 0):
+        await web_search("still nothing")
+        await web_search("still nothing")
+    assert mock_ddgs_instance.atext.await_count == 3
+
+@pytest.mark.asyncio
+@patch('src.jarvis.tools.web_search_tool.DDGS', new_callable=MagicMock)
+async def test_web_search_concurrent_identical_queries_single_flight(mock_ddgs_class):
+    """동시에 들어온 같은 검색어는 검색을 한 번만 수행하는지 테스트합니다."""
+    async def slow_search(query, max_results):
+        await asyncio.sleep(0.05)
+        return MOCK_SEARCH_RESULTS_SHORT
+    mock_ddgs_instance = AsyncMock()
+    mock_ddgs_instance.atext = AsyncMock(side_effect=slow_search)
+    mock_ddgs_class.return_value.__aenter__.return_value = mock_ddgs_instance
+
+    results = await asyncio.gather(*(web_search("popular question") for _ in range(5)))
+
+    assert mock_ddgs_instance.atext.await_count == 1
+    assert all(MOCK_SEARCH_RESULTS_SHORT[0]['title'] in result for result in results)
+
+@pytest.mark.asyncio
+@patch('src.jarvis.tools.web_search_tool.DDGS')
+@patch('src.jarvis.tools.web_search_tool.get_llm_client_registry')
+async def test_web_search_summary_cached_per_result_set(mock_get_registry, mock_ddgs):
+    """요약은 검색어와 검색 결과 집합이 같을 때만 재사용되는지 테스트합니다."""
+    mock_ddgs_instance = mock_ddgs.return_value.__aenter__.return_value
+    mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_SEARCH_RESULTS_LONG)
+    mock_registry = mock_get_registry.return_value
+    mock_registry.is_available.return_value = True
+    mock_registry.generate_content = AsyncMock(return_value=MagicMock(text=MOCK_LLM_SUMMARY))
+
+    await web_search("benefits of async programming")
+    repeated = await web_search("Benefits of async programming")
+    assert mock_registry.generate_content.await_count == 1
+    assert MOCK_LLM_SUMMARY in repeated
+
+    # A new result set for the same query (e.g. after the results TTL) is summarized again
+    get_web_search_caches()[0].clear()
+    mock_ddgs_instance.atext = AsyncMock(return_value=MOCK_SEARCH_RESULTS_LONG[:1])
+    await web_search("benefits of async programming")
+    assert mock_registry.generate_content.await_count == 2